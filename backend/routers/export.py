@@ -133,10 +133,14 @@ def process_export(
     
     # Log timeline info
     layers = timeline_data.get("layers", [])
-    logger.info(f"   Timeline has {len(layers)} layers")
-    for i, layer in enumerate(layers):
-        clips = layer.get("clips", [])
-        logger.info(f"   Layer {i} ({layer.get('type', 'unknown')}): {len(clips)} clips, visible={layer.get('visible', True)}, muted={layer.get('muted', False)}")
+    logger.info("   Timeline has %d layers", len(layers))
+    if logger.isEnabledFor(logging.INFO):
+        for i, layer in enumerate(layers):
+            logger.info(
+                "   Layer %d (%s): %d clips, visible=%s, muted=%s",
+                i, layer.get('type', 'unknown'), len(layer.get("clips", [])),
+                layer.get('visible', True), layer.get('muted', False)
+            )
     
     try:
         # Update status to processing
@@ -147,7 +151,7 @@ def process_export(
         # Progress callback
         def progress_callback(progress: float):
             update_task_progress(task_id, progress)
-            logger.debug(f"   Export {task_id} progress: {progress*100:.1f}%")
+            logger.debug("   Export %s progress: %.1f%%", task_id, progress * 100)
         
         # Perform export with explicit dimensions if available
         logger.info("📹 Calling export_service.export_timeline...")
@@ -253,21 +257,23 @@ async def start_export(
         
         logger.info(f"   Output filename: {output_filename}")
         
-        # Log detailed timeline information
+        # Log detailed timeline information. Walking every clip is skipped
+        # entirely when INFO is off, and arguments are only formatted for
+        # records that are emitted
         layers = timeline_data.get("layers", [])
-        logger.info(f"   Timeline has {len(layers)} layers:")
-        for i, layer in enumerate(layers):
-            layer_type = layer.get("type", "unknown")
-            clips = layer.get("clips", [])
-            logger.info(f"      Layer {i}: type='{layer_type}', clips={len(clips)}")
-            for j, clip in enumerate(clips):
-                clip_id = clip.get("id", "unknown")
-                clip_data = clip.get("data", {})
-                clip_data_type = clip_data.get("type", "none")
-                logger.info(f"         Clip {j}: id={clip_id}, data.type='{clip_data_type}'")
-                if layer_type == "text" or clip_data_type == "text":
-                    logger.info(f"            Text content: '{clip_data.get('text', 'NO TEXT')}'")
-                    logger.info(f"            Position: {clip.get('position', 'NO POSITION')}")
+        logger.info("   Timeline has %d layers:", len(layers))
+        if logger.isEnabledFor(logging.INFO):
+            for i, layer in enumerate(layers):
+                layer_type = layer.get("type", "unknown")
+                clips = layer.get("clips", [])
+                logger.info("      Layer %d: type='%s', clips=%d", i, layer_type, len(clips))
+                for j, clip in enumerate(clips):
+                    clip_data = clip.get("data", {})
+                    clip_data_type = clip_data.get("type", "none")
+                    logger.info("         Clip %d: id=%s, data.type='%s'", j, clip.get("id", "unknown"), clip_data_type)
+                    if layer_type == "text" or clip_data_type == "text":
+                        logger.info("            Text content: '%s'", clip_data.get('text', 'NO TEXT'))
+                        logger.info("            Position: %s", clip.get('position', 'NO POSITION'))
         
         # Create task entry
         with tasks_lock:
@@ -21,6 +21,11 @@ media_service = MediaService(upload_dir="uploads", thumbnail_dir="thumbnails")
 # Structure: { project_id: { media_id: MediaResource } }
 media_store: Dict[str, Dict[str, MediaResource]] = {}
 
+# Upload extensions by media type
+_VIDEO_EXTENSIONS = frozenset({'.mp4', '.avi', '.mov', '.mkv', '.wmv', '.flv', '.webm'})
+_AUDIO_EXTENSIONS = frozenset({'.mp3', '.wav', '.aac', '.ogg', '.flac', '.m4a'})
+_IMAGE_EXTENSIONS = frozenset({'.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp', '.svg'})
+
 
 def get_media_from_store(project_id: str, media_id: str) -> MediaResource:
     """Helper function to get media from the store"""
@@ -44,15 +49,11 @@ def determine_media_type(filename: str) -> Literal["video", "audio", "image"]:
     """Determine media type from file extension"""
     ext = Path(filename).suffix.lower()
 
-    video_extensions = {'.mp4', '.avi', '.mov', '.mkv', '.wmv', '.flv', '.webm'}
-    audio_extensions = {'.mp3', '.wav', '.aac', '.ogg', '.flac', '.m4a'}
-    image_extensions = {'.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp', '.svg'}
-
-    if ext in video_extensions:
+    if ext in _VIDEO_EXTENSIONS:
         return "video"
-    elif ext in audio_extensions:
+    elif ext in _AUDIO_EXTENSIONS:
         return "audio"
-    elif ext in image_extensions:
+    elif ext in _IMAGE_EXTENSIONS:
         return "image"
     else:
         raise ValueError(f"Unsupported file type: {ext}")
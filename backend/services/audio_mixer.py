@@ -3,12 +3,26 @@ Audio Mixer Service for mixing multiple audio tracks with volume
 adjustments and effects using ffmpeg-python.
 """
 import subprocess
+import json
+import math
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Optional
-import uuid
+from typing import List, Optional, Union
+import tempfile
 import os
+import shutil
 import ffmpeg
 
+from services.audio_service import read_header_duration
+
+
+# Encoder settings per output tier. Intermediates that are re-encoded
+# downstream (e.g. muxed into a video export) don't need full quality.
+QUALITY = {
+    'intermediate': {'sample_rate': 22050, 'bitrate': '96k'},
+    'final': {'sample_rate': 44100, 'bitrate': '192k'},
+}
+
 
 class AudioClipConfig:
     """Configuration for an audio clip in the mix."""
@@ -57,9 +71,101 @@ class AudioMixer:
         self.temp_dir = Path(temp_dir)
         self.temp_dir.mkdir(exist_ok=True)
     
+    def _make_temp_path(self, prefix: str, suffix: str) -> str:
+        """
+        Atomically reserve a unique file path in the temp directory.
+        
+        Args:
+            prefix: Filename prefix
+            suffix: Filename suffix including the extension
+            
+        Returns:
+            Path to the reserved (empty) file
+        """
+        fd, path = tempfile.mkstemp(prefix=prefix, suffix=suffix, dir=self.temp_dir)
+        os.close(fd)
+        return path
+    
+    def _codec_args(self, encode: bool = True, quality: str = 'final') -> List[str]:
+        """
+        Get FFmpeg audio codec arguments for an output file.
+        
+        Args:
+            encode: True for the final MP3 encode, False for a lossless
+                PCM WAV intermediate meant to be chained into another step
+            quality: Key into QUALITY selecting sample rate and bitrate
+            
+        Returns:
+            List of FFmpeg output arguments
+            
+        Raises:
+            ValueError: If quality is not a known tier
+        """
+        if quality not in QUALITY:
+            raise ValueError(f"Unknown quality tier: {quality}")
+        
+        tier = QUALITY[quality]
+        if encode:
+            return ['-c:a', 'libmp3lame', '-b:a', tier['bitrate'], '-ar', str(tier['sample_rate'])]
+        return ['-c:a', 'pcm_s16le', '-ar', str(tier['sample_rate'])]
+    
+    def _run_output(
+        self,
+        cmd: List[str],
+        output_path: Optional[str],
+        prefix: str,
+        encode: bool = True,
+        quality: str = 'final',
+        return_bytes: bool = False
+    ) -> Union[str, bytes]:
+        """
+        Append the codec and output arguments to an FFmpeg command and run it.
+        
+        Args:
+            cmd: FFmpeg command up to (not including) the output arguments
+            output_path: Path for the output file. If None, generates temp
+            prefix: Filename prefix for a generated temp file
+            encode: If False, write a PCM WAV intermediate instead of MP3
+            quality: Key into QUALITY selecting sample rate and bitrate
+            return_bytes: If True, stream the result through stdout and
+                return it in memory instead of writing a file
+            
+        Returns:
+            Path to the output file, or the encoded bytes if return_bytes
+            
+        Raises:
+            Exception: If FFmpeg fails
+        """
+        cmd = cmd + self._codec_args(encode, quality)
+        
+        if return_bytes:
+            cmd.extend(['-f', 'mp3' if encode else 'wav', 'pipe:1'])
+            result = subprocess.run(cmd, capture_output=True)
+            if result.returncode != 0:
+                raise Exception(f"FFmpeg error: {result.stderr.decode(errors='replace')}")
+            return result.stdout
+        
+        # Generate output path if not provided
+        if output_path is None:
+            output_path = self._make_temp_path(prefix, '.mp3' if encode else '.wav')
+        
+        # Ensure output directory exists
+        Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+        
+        cmd.append(output_path)
+        
+        result = subprocess.run(cmd, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise Exception(f"FFmpeg error: {result.stderr}")
+        
+        return output_path
+    
     def _get_audio_duration(self, audio_path: str) -> float:
         """
-        Get the duration of an audio file using ffprobe.
+        Get the duration of an audio file.
+        
+        The container header is read in-process when possible; ffprobe is
+        only forked for formats the header readers don't understand.
         
         Args:
             audio_path: Path to the audio file
@@ -67,6 +173,10 @@ class AudioMixer:
         Returns:
             Duration in seconds
         """
+        duration = read_header_duration(audio_path)
+        if duration is not None:
+            return duration
+        
         try:
             probe = ffmpeg.probe(audio_path)
             duration = float(probe['format'].get('duration', 0))
@@ -91,12 +201,110 @@ class AudioMixer:
         except Exception:
             return False
     
+    def _effective_duration(self, clip_config: AudioClipConfig) -> float:
+        """
+        Get the duration a clip contributes to the mix after trimming.
+        
+        Args:
+            clip_config: Clip configuration
+            
+        Returns:
+            Trimmed duration in seconds
+            
+        Raises:
+            FileNotFoundError: If the clip's audio file doesn't exist
+        """
+        # Validation rides along with the probe so callers walk clips once
+        if not os.path.exists(clip_config.audio_path):
+            raise FileNotFoundError(f"Audio file not found: {clip_config.audio_path}")
+        
+        if clip_config.trim_end is not None:
+            return clip_config.trim_end - clip_config.trim_start
+        return self._get_audio_duration(clip_config.audio_path) - clip_config.trim_start
+    
+    def _effective_durations(self, audio_clips: List[AudioClipConfig]) -> List[float]:
+        """
+        Get trimmed durations for several clips, probing files concurrently.
+        
+        Args:
+            audio_clips: Clip configurations
+            
+        Returns:
+            Trimmed duration of each clip, in input order
+            
+        Raises:
+            FileNotFoundError: If any clip's audio file doesn't exist
+        """
+        needs_probe = sum(1 for clip_config in audio_clips if clip_config.trim_end is None)
+        if needs_probe <= 1:
+            return [self._effective_duration(clip_config) for clip_config in audio_clips]
+        
+        # Each probe is a separate ffprobe process, so threads overlap them fully
+        max_workers = min(needs_probe, os.cpu_count() or 1)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(self._effective_duration, audio_clips))
+    
+    def _is_passthrough(self, clip_config: AudioClipConfig) -> bool:
+        """
+        Check whether a clip is placed on the mix unmodified.
+        
+        Args:
+            clip_config: Clip configuration
+            
+        Returns:
+            True if the clip has no volume change, trim, fade or offset
+        """
+        return (
+            clip_config.volume == 1.0
+            and clip_config.trim_start == 0
+            and clip_config.trim_end is None
+            and clip_config.fade_in == 0
+            and clip_config.fade_out == 0
+            and clip_config.start_time == 0
+        )
+    
+    def _clip_filters(self, clip_config: AudioClipConfig, effective_duration: float) -> List[str]:
+        """
+        Build the per-clip audio filter chain (volume, fades, start delay).
+        
+        Args:
+            clip_config: Clip configuration
+            effective_duration: Trimmed clip duration in seconds
+            
+        Returns:
+            List of FFmpeg audio filters, applied after trimming
+        """
+        filters: List[str] = []
+        
+        # Volume adjustment
+        if clip_config.volume != 1.0:
+            filters.append('volume=%s' % clip_config.volume)
+        
+        # Fade in
+        if clip_config.fade_in > 0:
+            filters.append('afade=t=in:st=0:d=%s' % clip_config.fade_in)
+        
+        # Fade out
+        if clip_config.fade_out > 0:
+            fade_out_start = effective_duration - clip_config.fade_out
+            filters.append('afade=t=out:st=%s:d=%s' % (fade_out_start, clip_config.fade_out))
+        
+        # Position the clip on the mix timeline; clips at 0 need no delay node
+        delay_ms = int(clip_config.start_time * 1000)
+        if delay_ms > 0:
+            filters.append('adelay=%d|%d' % (delay_ms, delay_ms))
+        
+        return filters
+    
     def mix_audio_tracks(
         self,
         audio_clips: List[AudioClipConfig],
         output_path: Optional[str] = None,
-        duration: Optional[float] = None
-    ) -> str:
+        duration: Optional[float] = None,
+        encode: bool = True,
+        quality: str = 'final',
+        return_bytes: bool = False
+    ) -> Union[str, bytes]:
         """
         Mix multiple audio tracks into a single output file.
         
@@ -104,9 +312,15 @@ class AudioMixer:
             audio_clips: List of AudioClipConfig objects defining clips
             output_path: Path for output audio. If None, generates temp
             duration: Total duration (seconds). If None, uses max end time
+            encode: If False, write a PCM WAV intermediate instead of MP3
+                (output_path should then use a .wav extension)
+            quality: 'final' (192k, 44.1 kHz) or 'intermediate' (96k,
+                22.05 kHz) for output that will be re-encoded downstream
+            return_bytes: If True, return the encoded audio in memory
+                instead of writing output_path
             
         Returns:
-            Path to the mixed audio file
+            Path to the mixed audio file, or its bytes if return_bytes
             
         Raises:
             FileNotFoundError: If any audio file doesn't exist
@@ -116,195 +330,220 @@ class AudioMixer:
         if not audio_clips:
             raise ValueError("audio_clips list cannot be empty")
         
-        # Validate all audio files exist
-        for clip_config in audio_clips:
-            if not os.path.exists(clip_config.audio_path):
-                raise FileNotFoundError(
-                    f"Audio file not found: {clip_config.audio_path}"
-                )
+        # A lone untouched clip already in the target container is just copied;
+        # an intermediate tier still needs the downsampling encode
+        if (
+            len(audio_clips) == 1
+            and duration is None
+            and quality == 'final'
+            and self._is_passthrough(audio_clips[0])
+        ):
+            source_path = audio_clips[0].audio_path
+            suffix = '.mp3' if encode else '.wav'
+            if Path(source_path).suffix.lower() == suffix:
+                if not os.path.exists(source_path):
+                    raise FileNotFoundError(f"Audio file not found: {source_path}")
+                try:
+                    if return_bytes:
+                        return Path(source_path).read_bytes()
+                    if output_path is None:
+                        output_path = self._make_temp_path('mixed_audio_', suffix)
+                    Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+                    shutil.copyfile(source_path, output_path)
+                    return output_path
+                except Exception as e:
+                    raise Exception(f"Failed to mix audio tracks: {str(e)}")
+        
+        # Also validates that every audio file exists
+        effective_durations = self._effective_durations(audio_clips)
         
         try:
-            # Generate output path if not provided
-            if output_path is None:
-                output_filename = f"mixed_audio_{uuid.uuid4()}.mp3"
-                output_path = str(self.temp_dir / output_filename)
+            # Build one graph: each clip is its own (seek-trimmed) input with
+            # its filters, all mixed and encoded in a single ffmpeg pass
+            max_end_time = 0.0
+            input_args: List[str] = []
+            filter_parts: List[str] = []
             
-            # Ensure output directory exists
-            Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+            for idx, (clip_config, effective_duration) in enumerate(zip(audio_clips, effective_durations)):
+                
+                # Track max end time
+                clip_end_time = clip_config.start_time + effective_duration
+                max_end_time = max(max_end_time, clip_end_time)
+                
+                # Input with trimming
+                if clip_config.trim_start > 0:
+                    input_args.extend(('-ss', str(clip_config.trim_start)))
+                
+                input_args.extend(('-i', clip_config.audio_path))
+                
+                if clip_config.trim_end is not None:
+                    input_args.extend(('-t', str(effective_duration)))
+                
+                filters = self._clip_filters(clip_config, effective_duration)
+                filter_parts.append('[%d:a]%s[a%d]' % (idx, ','.join(filters) or 'anull', idx))
             
-            # Calculate max end time and process clips
-            max_end_time = 0.0
-            temp_files = []
+            # Determine final duration
+            final_duration = duration if duration is not None else max_end_time
+            
+            # Build mix filter
+            mix_inputs = ''.join('[a%d]' % i for i in range(len(audio_clips)))
+            if len(audio_clips) > 1:
+                mix_filter = 'amix=inputs=%d:duration=longest' % len(audio_clips)
+            else:
+                mix_filter = 'anull'
+            
+            # If duration is specified and longer than longest clip, pad to reach it
+            if duration is not None and duration > max_end_time:
+                mix_filter += ',apad=whole_dur=%s' % final_duration
+            
+            filter_parts.append('%s%s[aout]' % (mix_inputs, mix_filter))
+            
+            cmd = ['ffmpeg', '-y']
+            cmd.extend(input_args)
+            cmd.extend(['-filter_complex', ';'.join(filter_parts)])
+            cmd.extend(['-map', '[aout]'])
+            
+            if duration is not None:
+                cmd.extend(['-t', str(final_duration)])
             
-            try:
-                processed_clips = []
+            return self._run_output(cmd, output_path, 'mixed_audio_', encode, quality, return_bytes)
+            
+        except Exception as e:
+            raise Exception(f"Failed to mix audio tracks: {str(e)}")
+    
+    def batch_mix(
+        self,
+        jobs: List[List[AudioClipConfig]],
+        outputs: List[str],
+        quality: str = 'final'
+    ) -> List[str]:
+        """
+        Mix several independent clip lists in a single FFmpeg invocation.
+        
+        Every distinct source file is opened once and fanned out with
+        ``asplit``; each job gets its own ``amix`` chain and output mapping,
+        so FFmpeg starts once and demuxes shared inputs only once.
+        
+        Args:
+            jobs: One list of AudioClipConfig objects per output
+            outputs: Output path for each job, in the same order as jobs
+            quality: Key into QUALITY used for every output
+            
+        Returns:
+            List of paths to the mixed audio files
+            
+        Raises:
+            FileNotFoundError: If any audio file doesn't exist
+            ValueError: If jobs is empty, a job is empty, or the number of
+                jobs and outputs differ
+            Exception: If audio processing fails
+        """
+        if not jobs:
+            raise ValueError("jobs list cannot be empty")
+        
+        if len(jobs) != len(outputs):
+            raise ValueError("jobs and outputs must have the same length")
+        
+        if not all(jobs):
+            raise ValueError("each job must contain at least one clip")
+        
+        # Also validates that every audio file exists
+        all_clips = [clip_config for job in jobs for clip_config in job]
+        durations = iter(self._effective_durations(all_clips))
+        
+        try:
+            # One input per distinct source file, fanned out with asplit
+            input_indices = {}
+            use_counts: List[int] = []
+            for job in jobs:
+                for clip_config in job:
+                    if clip_config.audio_path not in input_indices:
+                        input_indices[clip_config.audio_path] = len(use_counts)
+                        use_counts.append(0)
+                    use_counts[input_indices[clip_config.audio_path]] += 1
+            
+            input_args: List[str] = []
+            filter_parts: List[str] = []
+            for audio_path, input_idx in input_indices.items():
+                input_args.extend(('-i', audio_path))
+                count = use_counts[input_idx]
+                if count > 1:
+                    split_outputs = ''.join('[s%d_%d]' % (input_idx, n) for n in range(count))
+                    filter_parts.append('[%d:a]asplit=%d%s' % (input_idx, count, split_outputs))
+            
+            next_use = [0] * len(use_counts)
+            output_args: List[str] = []
+            
+            for job_idx, (job, job_output) in enumerate(zip(jobs, outputs)):
+                Path(job_output).parent.mkdir(parents=True, exist_ok=True)
                 
-                for idx, clip_config in enumerate(audio_clips):
-                    # Get original duration
-                    original_duration = self._get_audio_duration(clip_config.audio_path)
-                    
-                    # Calculate effective duration after trimming
-                    if clip_config.trim_end is not None:
-                        effective_duration = clip_config.trim_end - clip_config.trim_start
+                for clip_idx, clip_config in enumerate(job):
+                    input_idx = input_indices[clip_config.audio_path]
+                    if use_counts[input_idx] > 1:
+                        source = '[s%d_%d]' % (input_idx, next_use[input_idx])
+                        next_use[input_idx] += 1
                     else:
-                        effective_duration = original_duration - clip_config.trim_start
-                    
-                    # Track max end time
-                    clip_end_time = clip_config.start_time + effective_duration
-                    max_end_time = max(max_end_time, clip_end_time)
-                    
-                    # Create temp file for processed clip
-                    temp_clip = str(self.temp_dir / f"temp_clip_{idx}_{uuid.uuid4()}.mp3")
-                    temp_files.append(temp_clip)
-                    
-                    # Build FFmpeg command for this clip
-                    cmd = ['ffmpeg', '-y']
-                    
-                    # Input with trimming
-                    if clip_config.trim_start > 0:
-                        cmd.extend(['-ss', str(clip_config.trim_start)])
-                    
-                    cmd.extend(['-i', clip_config.audio_path])
+                        source = '[%d:a]' % input_idx
                     
+                    # Trimming happens in the graph since inputs are shared
+                    effective_duration = next(durations)
                     if clip_config.trim_end is not None:
-                        trim_duration = clip_config.trim_end - clip_config.trim_start
-                        cmd.extend(['-t', str(trim_duration)])
-                    
-                    # Build audio filter chain
-                    filters = []
-                    
-                    # Volume adjustment
-                    if clip_config.volume != 1.0:
-                        filters.append(f"volume={clip_config.volume}")
-                    
-                    # Fade in
-                    if clip_config.fade_in > 0:
-                        filters.append(f"afade=t=in:st=0:d={clip_config.fade_in}")
-                    
-                    # Fade out
-                    if clip_config.fade_out > 0:
-                        fade_out_start = effective_duration - clip_config.fade_out
-                        filters.append(f"afade=t=out:st={fade_out_start}:d={clip_config.fade_out}")
-                    
-                    if filters:
-                        cmd.extend(['-af', ','.join(filters)])
-                    
-                    cmd.extend([
-                        '-c:a', 'libmp3lame',
-                        '-b:a', '192k',
-                        '-ar', '44100',
-                        temp_clip
-                    ])
-                    
-                    result = subprocess.run(cmd, capture_output=True, text=True)
-                    if result.returncode != 0:
-                        raise Exception(f"FFmpeg error processing clip: {result.stderr}")
-                    
-                    processed_clips.append({
-                        'path': temp_clip,
-                        'start_time': clip_config.start_time,
-                        'duration': effective_duration
-                    })
-                
-                # Determine final duration
-                final_duration = duration if duration is not None else max_end_time
-                
-                # Mix all clips together
-                if len(processed_clips) == 1:
-                    # Single clip - just apply delay if needed and output
-                    clip_info = processed_clips[0]
-                    delay_ms = int(clip_info['start_time'] * 1000)
-                    
-                    cmd = ['ffmpeg', '-y', '-i', clip_info['path']]
-                    
-                    filters = []
-                    if delay_ms > 0:
-                        filters.append(f"adelay={delay_ms}|{delay_ms}")
-                    
-                    # Pad to final duration if specified
-                    if duration is not None:
-                        filters.append(f"apad=whole_dur={final_duration}")
-                    
-                    if filters:
-                        cmd.extend(['-af', ','.join(filters)])
-                    
-                    if duration is not None:
-                        cmd.extend(['-t', str(final_duration)])
-                    
-                    cmd.extend([
-                        '-c:a', 'libmp3lame',
-                        '-b:a', '192k',
-                        '-ar', '44100',
-                        output_path
-                    ])
-                    
-                    result = subprocess.run(cmd, capture_output=True, text=True)
-                    if result.returncode != 0:
-                        raise Exception(f"FFmpeg error: {result.stderr}")
-                else:
-                    # Multiple clips - mix with delays
-                    input_args = []
-                    filter_parts = []
-                    
-                    for idx, clip_info in enumerate(processed_clips):
-                        input_args.extend(['-i', clip_info['path']])
-                        delay_ms = int(clip_info['start_time'] * 1000)
-                        filter_parts.append(f"[{idx}:a]adelay={delay_ms}|{delay_ms}[a{idx}]")
-                    
-                    # Build mix filter
-                    mix_inputs = "".join([f"[a{i}]" for i in range(len(processed_clips))])
-                    
-                    # If duration is specified and longer than longest clip, pad to reach it
-                    if duration is not None and duration > max_end_time:
-                        filter_parts.append(f"{mix_inputs}amix=inputs={len(processed_clips)}:duration=longest,apad=whole_dur={final_duration}[aout]")
+                        filters = ['atrim=start=%s:end=%s' % (clip_config.trim_start, clip_config.trim_end)]
                     else:
-                        filter_parts.append(f"{mix_inputs}amix=inputs={len(processed_clips)}:duration=longest[aout]")
+                        filters = ['atrim=start=%s' % clip_config.trim_start]
+                    filters.append('asetpts=PTS-STARTPTS')
+                    filters.extend(self._clip_filters(clip_config, effective_duration))
                     
-                    cmd = ['ffmpeg', '-y']
-                    cmd.extend(input_args)
-                    cmd.extend(['-filter_complex', ';'.join(filter_parts)])
-                    cmd.extend(['-map', '[aout]'])
-                    
-                    if duration is not None:
-                        cmd.extend(['-t', str(final_duration)])
-                    
-                    cmd.extend([
-                        '-c:a', 'libmp3lame',
-                        '-b:a', '192k',
-                        '-ar', '44100',
-                        output_path
-                    ])
-                    
-                    result = subprocess.run(cmd, capture_output=True, text=True)
-                    if result.returncode != 0:
-                        raise Exception(f"FFmpeg error: {result.stderr}")
+                    filter_parts.append('%s%s[j%d_%d]' % (source, ','.join(filters), job_idx, clip_idx))
                 
-                return output_path
+                mix_inputs = ''.join('[j%d_%d]' % (job_idx, n) for n in range(len(job)))
+                if len(job) > 1:
+                    filter_parts.append(
+                        '%samix=inputs=%d:duration=longest[aout_%d]' % (mix_inputs, len(job), job_idx)
+                    )
+                else:
+                    filter_parts.append('%sanull[aout_%d]' % (mix_inputs, job_idx))
                 
-            finally:
-                # Cleanup temp files
-                for temp_file in temp_files:
-                    try:
-                        if os.path.exists(temp_file):
-                            os.unlink(temp_file)
-                    except OSError:
-                        pass
+                output_args.extend(('-map', '[aout_%d]' % job_idx))
+                output_args.extend(self._codec_args(quality=quality))
+                output_args.append(job_output)
+            
+            cmd = ['ffmpeg', '-y']
+            cmd.extend(input_args)
+            cmd.extend(['-filter_complex', ';'.join(filter_parts)])
+            cmd.extend(output_args)
+            
+            result = subprocess.run(cmd, capture_output=True, text=True)
+            if result.returncode != 0:
+                raise Exception(f"FFmpeg error: {result.stderr}")
+            
+            return list(outputs)
             
         except Exception as e:
-            raise Exception(f"Failed to mix audio tracks: {str(e)}")
+            raise Exception(f"Failed to batch mix audio tracks: {str(e)}")
     
     def extract_audio(
-        self, video_path: str, output_path: Optional[str] = None
-    ) -> str:
+        self,
+        video_path: str,
+        output_path: Optional[str] = None,
+        encode: bool = True,
+        quality: str = 'final',
+        return_bytes: bool = False
+    ) -> Union[str, bytes]:
         """
         Extract audio from a video file.
         
         Args:
             video_path: Path to the video file
             output_path: Path for extracted audio. If None, generates temp
+            encode: If False, write a PCM WAV intermediate instead of MP3
+            quality: 'final' (192k, 44.1 kHz) or 'intermediate' (96k,
+                22.05 kHz) for output that will be re-encoded downstream
+            return_bytes: If True, return the encoded audio in memory
+                instead of writing output_path
             
         Returns:
-            Path to the extracted audio file
+            Path to the extracted audio file, or its bytes if return_bytes
             
         Raises:
             FileNotFoundError: If video file doesn't exist
@@ -319,30 +558,13 @@ class AudioMixer:
             raise ValueError(f"Video file has no audio track: {video_path}")
         
         try:
-            # Generate output path if not provided
-            if output_path is None:
-                output_filename = f"extracted_audio_{uuid.uuid4()}.mp3"
-                output_path = str(self.temp_dir / output_filename)
-            
-            # Ensure output directory exists
-            Path(output_path).parent.mkdir(parents=True, exist_ok=True)
-            
             # Extract audio using FFmpeg
             cmd = [
                 'ffmpeg', '-y',
                 '-i', video_path,
-                '-vn',  # No video
-                '-c:a', 'libmp3lame',
-                '-b:a', '192k',
-                '-ar', '44100',
-                output_path
+                '-vn'  # No video
             ]
-            
-            result = subprocess.run(cmd, capture_output=True, text=True)
-            if result.returncode != 0:
-                raise Exception(f"FFmpeg error: {result.stderr}")
-            
-            return output_path
+            return self._run_output(cmd, output_path, 'extracted_audio_', encode, quality, return_bytes)
             
         except ValueError:
             raise
@@ -354,19 +576,30 @@ class AudioMixer:
         audio_path: str,
         fade_in: float = 0.0,
         fade_out: float = 0.0,
-        output_path: Optional[str] = None
-    ) -> str:
+        output_path: Optional[str] = None,
+        encode: bool = True,
+        quality: str = 'final',
+        return_bytes: bool = False
+    ) -> Union[str, bytes]:
         """
         Apply fade in and/or fade out effects to an audio file.
         
+        Both fades run as ffmpeg afade filters in a single decode/encode pass.
+        When no fade is requested the input path is returned untouched.
+        
         Args:
             audio_path: Path to the audio file
             fade_in: Fade in duration in seconds (0 for no fade in)
             fade_out: Fade out duration in seconds (0 for no fade out)
             output_path: Path for output file. If None, generates temp
+            encode: If False, write a PCM WAV intermediate instead of MP3
+            quality: 'final' (192k, 44.1 kHz) or 'intermediate' (96k,
+                22.05 kHz) for output that will be re-encoded downstream
+            return_bytes: If True, return the encoded audio in memory
+                instead of writing output_path
             
         Returns:
-            Path to the processed audio file
+            Path to the processed audio file, or its bytes if return_bytes
             
         Raises:
             FileNotFoundError: If audio file doesn't exist
@@ -381,7 +614,7 @@ class AudioMixer:
         
         # If no fades requested, just return the original path
         if fade_in == 0.0 and fade_out == 0.0:
-            return audio_path
+            return Path(audio_path).read_bytes() if return_bytes else audio_path
         
         # Get audio duration
         audio_duration = self._get_audio_duration(audio_path)
@@ -394,14 +627,6 @@ class AudioMixer:
             )
         
         try:
-            # Generate output path if not provided
-            if output_path is None:
-                output_filename = f"faded_audio_{uuid.uuid4()}.mp3"
-                output_path = str(self.temp_dir / output_filename)
-            
-            # Ensure output directory exists
-            Path(output_path).parent.mkdir(parents=True, exist_ok=True)
-            
             # Build filter chain
             filters = []
             
@@ -415,18 +640,9 @@ class AudioMixer:
             cmd = [
                 'ffmpeg', '-y',
                 '-i', audio_path,
-                '-af', ','.join(filters),
-                '-c:a', 'libmp3lame',
-                '-b:a', '192k',
-                '-ar', '44100',
-                output_path
+                '-af', ','.join(filters)
             ]
-            
-            result = subprocess.run(cmd, capture_output=True, text=True)
-            if result.returncode != 0:
-                raise Exception(f"FFmpeg error: {result.stderr}")
-            
-            return output_path
+            return self._run_output(cmd, output_path, 'faded_audio_', encode, quality, return_bytes)
             
         except ValueError:
             raise
@@ -437,8 +653,11 @@ class AudioMixer:
         self,
         audio_path: str,
         target_volume: float = 1.0,
-        output_path: Optional[str] = None
-    ) -> str:
+        output_path: Optional[str] = None,
+        encode: bool = True,
+        quality: str = 'final',
+        return_bytes: bool = False
+    ) -> Union[str, bytes]:
         """
         Normalize audio volume.
         
@@ -447,9 +666,14 @@ class AudioMixer:
             target_volume: Target volume level (0.0 to 1.0+)
             output_path: Path for the output file. 
             If None, generates a temp file
+            encode: If False, write a PCM WAV intermediate instead of MP3
+            quality: 'final' (192k, 44.1 kHz) or 'intermediate' (96k,
+                22.05 kHz) for output that will be re-encoded downstream
+            return_bytes: If True, return the encoded audio in memory
+                instead of writing output_path
             
         Returns:
-            Path to the normalized audio file
+            Path to the normalized audio file, or its bytes if return_bytes
             
         Raises:
             FileNotFoundError: If audio file doesn't exist
@@ -462,11 +686,140 @@ class AudioMixer:
         if target_volume <= 0:
             raise ValueError("Target volume must be positive")
         
+        try:
+            cmd = [
+                'ffmpeg', '-y',
+                '-i', audio_path,
+                '-af', f'volume={target_volume}'
+            ]
+            return self._run_output(cmd, output_path, 'normalized_audio_', encode, quality, return_bytes)
+            
+        except ValueError:
+            raise
+        except Exception as e:
+            raise Exception(f"Failed to normalize audio: {str(e)}")
+    
+    def normalize_loudness(
+        self,
+        audio_path: str,
+        target_lufs: float = -16.0,
+        true_peak: float = -1.5,
+        loudness_range: float = 11.0,
+        output_path: Optional[str] = None,
+        encode: bool = True,
+        quality: str = 'final',
+        return_bytes: bool = False
+    ) -> Union[str, bytes]:
+        """
+        Normalize perceived loudness with ffmpeg's two-pass loudnorm filter.
+        
+        Unlike normalize_audio, which applies a fixed gain, this measures
+        the integrated loudness first and then applies a linear correction
+        to reach the EBU R128 target.
+        
+        Args:
+            audio_path: Path to the audio file
+            target_lufs: Integrated loudness target in LUFS (-70 to -5)
+            true_peak: Maximum true peak in dBTP (-9 to 0)
+            loudness_range: Loudness range target in LU (1 to 50)
+            output_path: Path for the output file. If None, generates temp
+            encode: If False, write a PCM WAV intermediate instead of MP3
+            quality: 'final' (192k, 44.1 kHz) or 'intermediate' (96k,
+                22.05 kHz) for output that will be re-encoded downstream
+            return_bytes: If True, return the encoded audio in memory
+                instead of writing output_path
+            
+        Returns:
+            Path to the normalized audio file, or its bytes if return_bytes
+            
+        Raises:
+            FileNotFoundError: If audio file doesn't exist
+            ValueError: If a target is out of range
+            Exception: If audio processing fails
+        """
+        if not os.path.exists(audio_path):
+            raise FileNotFoundError(f"Audio file not found: {audio_path}")
+        
+        if not -70.0 <= target_lufs <= -5.0:
+            raise ValueError("target_lufs must be between -70 and -5")
+        if not -9.0 <= true_peak <= 0.0:
+            raise ValueError("true_peak must be between -9 and 0")
+        if not 1.0 <= loudness_range <= 50.0:
+            raise ValueError("loudness_range must be between 1 and 50")
+        
+        try:
+            target = f"loudnorm=I={target_lufs}:TP={true_peak}:LRA={loudness_range}"
+            
+            # Pass 1: measure, stats are printed as JSON at the end of stderr
+            cmd = [
+                'ffmpeg', '-hide_banner', '-nostats',
+                '-i', audio_path,
+                '-af', f"{target}:print_format=json",
+                '-f', 'null', '-'
+            ]
+            result = subprocess.run(cmd, capture_output=True, text=True)
+            if result.returncode != 0:
+                raise Exception(f"FFmpeg error: {result.stderr}")
+            
+            stats = json.loads(result.stderr[result.stderr.rindex('{'):result.stderr.rindex('}') + 1])
+            
+            # Pass 2: apply a linear gain from the measurement. Silent input
+            # has no finite loudness, so leave it to single-pass mode.
+            audio_filter = target
+            if math.isfinite(float(stats['input_i'])):
+                audio_filter += (
+                    f":measured_I={stats['input_i']}"
+                    f":measured_TP={stats['input_tp']}"
+                    f":measured_LRA={stats['input_lra']}"
+                    f":measured_thresh={stats['input_thresh']}"
+                    f":offset={stats['target_offset']}"
+                    f":linear=true"
+                )
+            
+            cmd = [
+                'ffmpeg', '-y',
+                '-i', audio_path,
+                '-af', audio_filter
+            ]
+            return self._run_output(cmd, output_path, 'loudnorm_audio_', encode, quality, return_bytes)
+            
+        except Exception as e:
+            raise Exception(f"Failed to normalize loudness: {str(e)}")
+    
+    def finalize(
+        self,
+        audio_path: str,
+        output_path: Optional[str] = None,
+        codec: str = 'libmp3lame',
+        quality: str = 'final'
+    ) -> str:
+        """
+        Encode a WAV intermediate from a chain of encode=False calls once.
+        
+        Args:
+            audio_path: Path to the intermediate audio file
+            output_path: Path for the encoded file. If None, generates temp
+            codec: FFmpeg audio encoder to use
+            quality: Key into QUALITY selecting sample rate and bitrate
+            
+        Returns:
+            Path to the encoded audio file
+            
+        Raises:
+            FileNotFoundError: If audio file doesn't exist
+            ValueError: If quality is not a known tier
+            Exception: If encoding fails
+        """
+        if not os.path.exists(audio_path):
+            raise FileNotFoundError(f"Audio file not found: {audio_path}")
+        
+        if quality not in QUALITY:
+            raise ValueError(f"Unknown quality tier: {quality}")
+        
         try:
             # Generate output path if not provided
             if output_path is None:
-                output_filename = f"normalized_audio_{uuid.uuid4()}.mp3"
-                output_path = str(self.temp_dir / output_filename)
+                output_path = self._make_temp_path('final_audio_', '.mp3')
             
             # Ensure output directory exists
             Path(output_path).parent.mkdir(parents=True, exist_ok=True)
@@ -474,10 +827,9 @@ class AudioMixer:
             cmd = [
                 'ffmpeg', '-y',
                 '-i', audio_path,
-                '-af', f'volume={target_volume}',
-                '-c:a', 'libmp3lame',
-                '-b:a', '192k',
-                '-ar', '44100',
+                '-c:a', codec,
+                '-b:a', QUALITY[quality]['bitrate'],
+                '-ar', str(QUALITY[quality]['sample_rate']),
                 output_path
             ]
             
@@ -487,7 +839,5 @@ class AudioMixer:
             
             return output_path
             
-        except ValueError:
-            raise
         except Exception as e:
-            raise Exception(f"Failed to normalize audio: {str(e)}")
+            raise Exception(f"Failed to finalize audio: {str(e)}")
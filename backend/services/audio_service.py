@@ -4,11 +4,134 @@ Audio Service for waveform generation and audio extraction.
 import numpy as np
 import ffmpeg
 from pathlib import Path
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+import subprocess
+import tempfile
 import uuid
-from typing import List
+from typing import Dict, List, Optional, Tuple
 import os
 
 
+try:
+    from numba import njit
+except ImportError:  # numba is optional; the numpy reduction is used instead
+    njit = None
+
+try:
+    import soundfile
+except (ImportError, OSError):  # soundfile is optional; needs libsndfile
+    soundfile = None
+
+try:
+    import mutagen
+except ImportError:  # mutagen is optional; ffprobe is used instead
+    mutagen = None
+
+
+# Bytes of decoded PCM read from ffmpeg per iteration when streaming
+_PCM_CHUNK_BYTES = 1 << 16
+
+# Maximum number of cached waveform arrays kept on disk
+_WAVEFORM_CACHE_MAX_FILES = 256
+
+# Maximum number of probed durations kept in memory
+_DURATION_CACHE_MAX_ENTRIES = 1024
+
+# Worker threads used to unlink temp files during cleanup
+_CLEANUP_WORKERS = 8
+
+# Uncompressed/lossless containers libsndfile reads faster than an ffmpeg fork
+_SOUNDFILE_FORMATS = frozenset(('WAV', 'WAVEX', 'AIFF', 'FLAC'))
+
+
+def read_header_duration(audio_path: str) -> Optional[float]:
+    """
+    Read an audio file's duration from its container header in-process.
+    
+    Tries libsndfile (WAV/FLAC/OGG/MP3) and then mutagen (MP3/M4A/...),
+    avoiding an ffprobe fork for the common formats.
+    
+    Args:
+        audio_path: Path to the audio file
+        
+    Returns:
+        Duration in seconds, or None if neither reader understands the file
+    """
+    if soundfile is not None:
+        try:
+            return float(soundfile.info(audio_path).duration)
+        except Exception:
+            pass
+    
+    if mutagen is not None:
+        try:
+            info = mutagen.File(audio_path)
+            if info is not None and info.info.length > 0:
+                return float(info.info.length)
+        except Exception:
+            pass
+    
+    return None
+
+
+def _unlink_quietly(path: str) -> None:
+    """
+    Remove a file, ignoring one that is already gone.
+    
+    Args:
+        path: Path to the file
+    """
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+def _accumulate_rms_bins_numpy(samples, offset, samples_per_pixel, sum_squares, counts):
+    """
+    Fold a chunk of s16 samples into per-bin sum of squares and counts.
+    
+    Squares are of the raw integer samples; the caller applies the
+    1/32768 full-scale factor once to the final RMS.
+    
+    Args:
+        samples: int16 sample array for this chunk
+        offset: Index of the first sample in the whole stream
+        samples_per_pixel: Number of samples per bin
+        sum_squares: float64 accumulator, one entry per bin (updated in place)
+        counts: int64 accumulator, one entry per bin (updated in place)
+    """
+    width = len(sum_squares)
+    
+    # Samples past the last bin are dropped, as with a full decode
+    in_range = min(len(samples), width * samples_per_pixel - offset)
+    if in_range <= 0:
+        return
+    
+    bins = (offset + np.arange(in_range)) // samples_per_pixel
+    squares = samples[:in_range].astype(np.int32)
+    squares *= squares
+    sum_squares += np.bincount(bins, weights=squares, minlength=width)
+    counts += np.bincount(bins, minlength=width)
+
+
+if njit is not None:
+    @njit(cache=True, fastmath=True)
+    def _accumulate_rms_bins(samples, offset, samples_per_pixel, sum_squares, counts):
+        # Same contract as _accumulate_rms_bins_numpy, in a single fused pass
+        width = sum_squares.shape[0]
+        for j in range(samples.shape[0]):
+            bin_idx = (offset + j) // samples_per_pixel
+            if bin_idx >= width:
+                break
+            value = np.int32(samples[j])
+            sum_squares[bin_idx] += value * value
+            counts[bin_idx] += 1
+else:
+    _accumulate_rms_bins = _accumulate_rms_bins_numpy
+
+
 class AudioService:
     """Service for audio processing operations."""
     
@@ -21,6 +144,215 @@ class AudioService:
         """
         self.temp_dir = Path(temp_dir)
         self.temp_dir.mkdir(exist_ok=True)
+        self.cache_dir = self.temp_dir / "waveform_cache"
+        self.cache_dir.mkdir(exist_ok=True)
+        self._duration_cache: Dict[Tuple[str, int, int], float] = {}
+    
+    def _waveform_cache_path(self, audio_path: str, width: int) -> Path:
+        """
+        Get the cache file for a waveform, keyed by file identity and width.
+        
+        Args:
+            audio_path: Path to audio file
+            width: Number of amplitude values requested
+            
+        Returns:
+            Path to the .npy cache entry
+        """
+        stat = os.stat(audio_path)
+        key = f"{os.path.abspath(audio_path)}:{stat.st_mtime_ns}:{stat.st_size}:{width}"
+        digest = hashlib.sha1(key.encode()).hexdigest()
+        return self.cache_dir / f"{digest}.npy"
+    
+    def _load_cached_waveform(self, cache_path: Path) -> Optional[List[float]]:
+        """
+        Load a cached waveform if present.
+        
+        Args:
+            cache_path: Path to the .npy cache entry
+            
+        Returns:
+            Cached waveform values, or None on a miss
+        """
+        try:
+            waveform = np.load(cache_path)
+            # Refresh mtime so eviction drops least recently used entries
+            os.utime(cache_path)
+            return waveform.tolist()
+        except (OSError, ValueError):
+            return None
+    
+    def _store_cached_waveform(self, cache_path: Path, waveform: np.ndarray):
+        """
+        Write a waveform to the cache and evict the oldest entries.
+        
+        Args:
+            cache_path: Path to the .npy cache entry
+            waveform: Normalized waveform values
+        """
+        try:
+            fd, tmp_path = tempfile.mkstemp(suffix=".tmp", dir=self.cache_dir)
+            with os.fdopen(fd, "wb") as f:
+                np.save(f, waveform)
+            os.replace(tmp_path, cache_path)
+            
+            entries = list(self.cache_dir.glob("*.npy"))
+            if len(entries) > _WAVEFORM_CACHE_MAX_FILES:
+                entries.sort(key=lambda entry: entry.stat().st_mtime)
+                for entry in entries[:len(entries) - _WAVEFORM_CACHE_MAX_FILES]:
+                    entry.unlink()
+        except OSError as e:
+            print(f"Warning: Failed to cache waveform: {str(e)}")
+    
+    def _rms_bins_from_astats(
+        self, audio_path: str, width: int, sample_rate: int, samples_per_pixel: int
+    ) -> Optional[np.ndarray]:
+        """
+        Compute per-bin RMS inside ffmpeg with asetnsamples + astats.
+        
+        Each bin becomes one audio frame, astats resets per frame, and only the
+        RMS level metadata (one line per bin) comes back over the pipe.
+        
+        Args:
+            audio_path: Path to audio file
+            width: Number of bins
+            sample_rate: Decode sample rate in Hz
+            samples_per_pixel: Number of samples per bin
+            
+        Returns:
+            Linear RMS amplitude per bin, or None if this ffmpeg build
+            cannot run the filter chain
+        """
+        audio_filter = (
+            f"aformat=channel_layouts=mono,aresample={sample_rate},"
+            f"asetnsamples=n={samples_per_pixel}:p=0,"
+            f"astats=metadata=1:reset=1:measure_perchannel=none:measure_overall=RMS_level,"
+            f"ametadata=mode=print:key=lavfi.astats.Overall.RMS_level:file=-"
+        )
+        result = subprocess.run(
+            ['ffmpeg', '-v', 'error', '-i', audio_path, '-af', audio_filter, '-f', 'null', '-'],
+            capture_output=True, text=True
+        )
+        if result.returncode != 0:
+            return None
+        
+        rms = np.zeros(width, dtype=np.float64)
+        levels = [
+            line.split('=', 1)[1] for line in result.stdout.splitlines()
+            if line.startswith('lavfi.astats.Overall.RMS_level=')
+        ]
+        # A trailing partial frame past the last bin is dropped
+        levels = levels[:width]
+        if levels:
+            # RMS_level is in dBFS; silent bins report -inf
+            db = np.array(levels, dtype=np.float64)
+            rms[:len(levels)] = np.nan_to_num(np.power(10.0, db / 20.0))
+        return rms
+    
+    def _rms_bins_from_pcm(
+        self, audio_path: str, width: int, sample_rate: int, samples_per_pixel: int
+    ) -> np.ndarray:
+        """
+        Compute per-bin RMS by streaming decoded s16 PCM through numpy.
+        
+        Args:
+            audio_path: Path to audio file
+            width: Number of bins
+            sample_rate: Decode sample rate in Hz
+            samples_per_pixel: Number of samples per bin
+            
+        Returns:
+            Linear RMS amplitude per bin
+        """
+        sum_squares = np.zeros(width, dtype=np.float64)
+        counts = np.zeros(width, dtype=np.int64)
+        
+        process = (
+            ffmpeg
+            .input(audio_path)
+            .output('pipe:', format='s16le', acodec='pcm_s16le', ac=1, ar=str(sample_rate))
+            .global_args('-loglevel', 'error')
+            .run_async(pipe_stdout=True, pipe_stderr=True)
+        )
+        
+        try:
+            # One read buffer is reused for every chunk; samples are viewed in
+            # place rather than copied into fresh bytes/arrays per read
+            buf = bytearray(_PCM_CHUNK_BYTES)
+            view = memoryview(buf)
+            offset = 0
+            filled = 0
+            while True:
+                read = process.stdout.readinto(view[filled:])
+                if not read:
+                    break
+                filled += read
+                
+                usable = filled - (filled % 2)
+                samples = np.frombuffer(buf, np.int16, count=usable // 2)
+                _accumulate_rms_bins(samples, offset, samples_per_pixel, sum_squares, counts)
+                offset += len(samples)
+                
+                # Carry a trailing odd byte over to the next read
+                if filled > usable:
+                    buf[0] = buf[usable]
+                filled -= usable
+            
+            _, stderr = process.communicate()
+        finally:
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+        
+        if process.returncode != 0:
+            raise Exception(stderr.decode(errors='replace') if stderr else "ffmpeg decode failed")
+        
+        # Use RMS (root mean square) for better visual representation
+        # This gives us the average amplitude in each bin
+        return np.sqrt(sum_squares / np.maximum(counts, 1)) / 32768.0
+    
+    def _rms_bins_from_soundfile(self, audio_path: str, width: int) -> Optional[np.ndarray]:
+        """
+        Compute per-bin RMS in-process with libsndfile for PCM containers.
+        
+        Samples are read at the file's native rate and downmixed to mono,
+        so no ffmpeg process is spawned for WAV/AIFF/FLAC sources.
+        
+        Args:
+            audio_path: Path to audio file
+            width: Number of bins
+            
+        Returns:
+            Linear RMS amplitude per bin, or None if soundfile is unavailable
+            or the file is not a format it should handle
+        """
+        if soundfile is None:
+            return None
+        
+        try:
+            info = soundfile.info(audio_path)
+        except Exception:
+            return None
+        
+        if info.format not in _SOUNDFILE_FORMATS or info.frames <= 0:
+            return None
+        
+        samples_per_pixel = max(1, info.frames // width)
+        sum_squares = np.zeros(width, dtype=np.float64)
+        counts = np.zeros(width, dtype=np.int64)
+        
+        offset = 0
+        for block in soundfile.blocks(
+            audio_path, blocksize=_PCM_CHUNK_BYTES // 2, dtype='int16', always_2d=True
+        ):
+            if info.channels > 1:
+                samples = (block.sum(axis=1, dtype=np.int32) // info.channels).astype(np.int16)
+            else:
+                samples = np.ascontiguousarray(block[:, 0])
+            _accumulate_rms_bins(samples, offset, samples_per_pixel, sum_squares, counts)
+            offset += len(samples)
+        
+        return np.sqrt(sum_squares / np.maximum(counts, 1)) / 32768.0
     
     def generate_waveform_data(self, audio_path: str, width: int = 1000) -> List[float]:
         """
@@ -40,50 +372,39 @@ class AudioService:
         if not os.path.exists(audio_path):
             raise FileNotFoundError(f"Audio file not found: {audio_path}")
         
+        # Repeat requests (e.g. zooming back to a level) skip the decode entirely
+        cache_path = self._waveform_cache_path(audio_path, width)
+        cached = self._load_cached_waveform(cache_path)
+        if cached is not None:
+            return cached
+        
         try:
-            # Use ffmpeg to extract audio samples
-            # Output as 16-bit PCM at 22050 Hz mono
-            out, _ = (
-                ffmpeg
-                .input(audio_path)
-                .output('pipe:', format='s16le', acodec='pcm_s16le', ac=1, ar='22050')
-                .run(capture_stdout=True, capture_stderr=True, quiet=True)
-            )
-            
-            # Convert bytes to numpy array and normalize
-            audio_array = np.frombuffer(out, np.int16).astype(np.float32) / 32768.0
-            
-            # Get total number of samples
-            total_samples = len(audio_array)
-            
-            # Calculate samples per pixel
-            samples_per_pixel = max(1, total_samples // width)
-            
-            # Downsample to match width
-            waveform_data = []
-            for i in range(width):
-                start_idx = i * samples_per_pixel
-                end_idx = min(start_idx + samples_per_pixel, total_samples)
+            # PCM containers are read directly; everything else goes through ffmpeg
+            rms = self._rms_bins_from_soundfile(audio_path, width)
+            
+            if rms is None:
+                # RMS per bin does not need full bandwidth, so decode at a rate
+                # scaled to the requested resolution. Bins are sized up front
+                # from the container duration.
+                sample_rate = min(22050, max(8000, width * 4))
+                duration = self.get_audio_duration(audio_path)
+                samples_per_pixel = max(1, int(duration * sample_rate) // width)
                 
-                if start_idx >= total_samples:
-                    # If we've run out of samples, pad with zeros
-                    waveform_data.append(0.0)
-                else:
-                    # Get the chunk of samples
-                    chunk = audio_array[start_idx:end_idx]
-                    
-                    # Use RMS (root mean square) for better visual representation
-                    # This gives us the average amplitude in this chunk
-                    if len(chunk) > 0:
-                        rms = np.sqrt(np.mean(chunk ** 2))
-                        waveform_data.append(float(rms))
-                    else:
-                        waveform_data.append(0.0)
-            
-            # Normalize to -1 to 1 range
-            max_amplitude = max(abs(min(waveform_data)), abs(max(waveform_data)))
+                # Let ffmpeg compute per-bin RMS; only fall back to reducing raw
+                # PCM in Python on builds whose astats lacks measure_overall
+                rms = self._rms_bins_from_astats(audio_path, width, sample_rate, samples_per_pixel)
+                if rms is None:
+                    rms = self._rms_bins_from_pcm(audio_path, width, sample_rate, samples_per_pixel)
+            
+            # Normalize to -1 to 1 range; RMS values are non-negative, so the
+            # peak is just the array max
+            max_amplitude = float(rms.max()) if width > 0 else 0.0
             if max_amplitude > 0:
-                waveform_data = [val / max_amplitude for val in waveform_data]
+                rms *= 1.0 / max_amplitude
+            
+            self._store_cached_waveform(cache_path, rms)
+            
+            waveform_data = rms.tolist()
             
             return waveform_data
             
@@ -108,35 +429,30 @@ class AudioService:
             raise FileNotFoundError(f"Video file not found: {video_path}")
         
         try:
-            # Check if video has audio using probe
-            probe = ffmpeg.probe(video_path)
-            has_audio = False
-            for stream in probe.get('streams', []):
-                if stream.get('codec_type') == 'audio':
-                    has_audio = True
-                    break
-            
-            if not has_audio:
-                raise Exception("Video file has no audio track")
-            
             # Generate unique filename for extracted audio
             audio_id = str(uuid.uuid4())
             audio_filename = f"{audio_id}.mp3"
             audio_path = self.temp_dir / audio_filename
             
-            # Extract audio using ffmpeg
-            (
-                ffmpeg
-                .input(video_path)
-                .output(str(audio_path), acodec='mp3', vn=None)
-                .overwrite_output()
-                .run(capture_stdout=True, capture_stderr=True, quiet=True)
-            )
+            # Extract audio using ffmpeg. Mapping the first audio stream
+            # explicitly makes ffmpeg itself report a missing track, so no
+            # separate probe process is needed.
+            try:
+                (
+                    ffmpeg
+                    .input(video_path)['a:0']
+                    .output(str(audio_path), acodec='mp3')
+                    .overwrite_output()
+                    .run(capture_stdout=True, capture_stderr=True, quiet=True)
+                )
+            except ffmpeg.Error as e:
+                stderr = e.stderr.decode(errors='replace') if e.stderr else str(e)
+                if "matches no streams" in stderr:
+                    raise Exception("Video file has no audio track")
+                raise Exception(stderr)
             
             return str(audio_path)
             
-        except ffmpeg.Error as e:
-            raise Exception(f"Failed to extract audio: {e.stderr.decode() if e.stderr else str(e)}")
         except Exception as e:
             raise Exception(f"Failed to extract audio: {str(e)}")
     
@@ -151,17 +467,43 @@ class AudioService:
             Duration in seconds
         """
         try:
-            probe = ffmpeg.probe(audio_path)
-            duration = float(probe['format']['duration'])
+            # Waveform generation and the API both ask for the same file's
+            # duration, so remember it per file identity instead of reprobing
+            stat = os.stat(audio_path)
+            key = (os.path.abspath(audio_path), stat.st_mtime_ns, stat.st_size)
+            duration = self._duration_cache.get(key)
+            if duration is not None:
+                return duration
+            
+            # Header parse first; ffprobe only for formats it can't read
+            duration = read_header_duration(audio_path)
+            if duration is None:
+                probe = ffmpeg.probe(audio_path)
+                duration = float(probe['format']['duration'])
+            
+            if len(self._duration_cache) >= _DURATION_CACHE_MAX_ENTRIES:
+                self._duration_cache.clear()
+            self._duration_cache[key] = duration
             return duration
         except Exception as e:
             raise Exception(f"Failed to get audio duration: {str(e)}")
     
     def cleanup_temp_files(self):
-        """Remove all temporary audio files."""
+        """
+        Remove all temporary audio files.
+        
+        Unlinks run on a small thread pool so per-file syscall latency
+        overlaps on large or slow directories. The waveform cache
+        subdirectory is left in place.
+        """
         try:
-            for file in self.temp_dir.glob("*"):
-                if file.is_file():
-                    file.unlink()
+            with os.scandir(self.temp_dir) as entries:
+                files = [entry.path for entry in entries if entry.is_file(follow_symlinks=False)]
+            
+            if not files:
+                return
+            
+            with ThreadPoolExecutor(max_workers=min(_CLEANUP_WORKERS, len(files))) as executor:
+                list(executor.map(_unlink_quietly, files))
         except Exception as e:
             print(f"Warning: Failed to cleanup temp files: {str(e)}")
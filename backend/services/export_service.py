@@ -3,24 +3,278 @@ Export Service for rendering final video from timeline data.
 Optimized for performance using ffmpeg-python for video processing.
 """
 import uuid
+import bisect
+import heapq
+import io
 import logging
 import subprocess
 import tempfile
 import os
+import re
 import shutil
-from typing import Dict, List, Callable, Optional, Union
+import threading
+import wave
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Callable, Optional, Tuple, Union
 from pathlib import Path
 import ffmpeg
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:  # numba is optional; the numpy interpolation is used instead
+    njit = None
 
 # Configure logger - set to INFO level for cleaner output
 logger = logging.getLogger("video-editor.export_service")
 
+# Media file extensions looked up for a resource ID, in order of preference
+_MEDIA_EXTENSIONS = ('.mp4', '.mov', '.avi', '.mp3', '.wav', '.m4a', '.jpg', '.png', '.jpeg', '.gif', '.webp')
+_MEDIA_EXTENSION_RANK = {ext: rank for rank, ext in enumerate(_MEDIA_EXTENSIONS)}
+
+# Extensions of video layer files that are exported as image clips
+_IMAGE_EXTENSIONS = frozenset({'.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp', '.svg'})
+
+# Lossless filters for static rotations by whole quarter turns (clockwise)
+_QUARTER_TURN_FILTERS = {90: 'transpose=clock', 180: 'hflip,vflip', 270: 'transpose=cclock'}
+
+# Project media URL: /api/media/project/{project_id}/{media_id}/file
+_PROJECT_MEDIA_URL = re.compile(r'/api/media/project/([^/]+)/([^/]+)/file')
+
+# Maximum number of probed media entries kept in memory
+_MEDIA_INFO_CACHE_MAX_ENTRIES = 1024
+
+# Directories searched for text clip fonts, in order of preference
+_FONT_DIRS = (
+    'C:/Windows/Fonts', '/usr/share/fonts', '/usr/local/share/fonts',
+    os.path.expanduser('~/.fonts'), '/Library/Fonts', os.path.expanduser('~/Library/Fonts'),
+)
+_FONT_EXTENSIONS = frozenset({'.ttf', '.otf'})
+
+# Most ffprobe runs in flight while prefetching an export's media. Probes
+# mostly wait on process startup and file reads, not the CPU
+_MAX_PROBE_WORKERS = 8
+
+# Text colors given by name rather than hex
+_NAMED_COLORS = {
+    'white': (255, 255, 255), 'black': (0, 0, 0),
+    'red': (255, 0, 0), 'green': (0, 255, 0),
+    'blue': (0, 0, 255), 'yellow': (255, 255, 0),
+    'cyan': (0, 255, 255), 'magenta': (255, 0, 255),
+    'orange': (255, 165, 0), 'purple': (128, 0, 128),
+    'pink': (255, 192, 203), 'gray': (128, 128, 128),
+}
+
+# Maximum number of rendered text images kept in memory
+_TEXT_IMAGE_CACHE_MAX_ENTRIES = 256
+
+# Final mux flags for fragmented MP4: fragments at keyframes behind an
+# empty moov, so the file is playable while it is still being written
+_FRAGMENTED_MOVFLAGS = '+frag_keyframe+empty_moov+default_base_moof'
+
+# Longest stretch of a source that clips sharing its decoder may skip
+# between them; the skipped frames are still decoded
+_MAX_SHARED_SOURCE_GAP = 1.0
+
+# Shortest time shard worth rendering in its own ffmpeg run; shorter ones
+# spend more on startup and decoding into their first clips than they save
+_MIN_SHARD_SECONDS = 5.0
+
+# Sample rate of the 16-bit stereo PCM that audio clips are mixed at
+_MIX_SAMPLE_RATE = 48000
+
+# Software H.264 settings used when no hardware encoder is available
+_SOFTWARE_ENCODER_ARGS = ['-c:v', 'libx264', '-preset', 'ultrafast', '-crf', '23']
+
+# Hardware H.264 encoders in order of preference, with their fastest
+# presets and a quality target roughly matching libx264 crf 23
+_HW_ENCODER_ARGS = {
+    'h264_nvenc': ['-c:v', 'h264_nvenc', '-preset', 'p1', '-rc', 'vbr', '-cq', '23', '-b:v', '0'],
+    'h264_videotoolbox': ['-c:v', 'h264_videotoolbox', '-b:v', '10M'],
+    'h264_amf': ['-c:v', 'h264_amf', '-quality', 'speed', '-rc', 'cqp', '-qp_i', '23', '-qp_p', '23'],
+    'h264_qsv': ['-c:v', 'h264_qsv', '-preset', 'veryfast', '-global_quality', '23'],
+}
+
+# Decode hwaccel matching each hardware encoder's device; the rest use
+# ffmpeg's automatic choice
+_HW_DECODE_ACCELS = {
+    'h264_nvenc': 'cuda',
+    'h264_videotoolbox': 'videotoolbox',
+}
+
+# Hardware encoder found by the first probe ('' when there is none). The
+# hardware doesn't change while the process runs, so services share it
+_hw_encoder_lock = threading.RLock()
+_detected_hw_encoder: Optional[str] = None
+
+
+# Keyframe easing curves by code, as passed to _interpolate_keyframe_values
+_KEYFRAME_EASING_CODES = {'linear': 0, 'ease-in': 1, 'ease-out': 2, 'ease-in-out': 3}
+
+
+def _interpolate_keyframe_values_numpy(
+    kf_times: np.ndarray, kf_easings: np.ndarray, kf_values: np.ndarray,
+    frame_times: np.ndarray
+) -> np.ndarray:
+    """
+    Interpolate keyframe values at each frame time.
+
+    Args:
+        kf_times: Sorted keyframe times, shape (K,)
+        kf_easings: _KEYFRAME_EASING_CODES code of each keyframe, shape (K,)
+        kf_values: Value columns per keyframe, NaN where unset, shape (K, C)
+        frame_times: Ascending frame times, shape (N,)
+
+    Returns:
+        Interpolated values, shape (N, C). Between two keyframes the next
+        keyframe's easing applies, and when the earlier one has no value the
+        next one's value is used; before the first or after the last
+        keyframe the nearest keyframe's value is held.
+    """
+    kf_count = len(kf_times)
+
+    # Linear keyframes that set every column at distinct times are plain
+    # piecewise-linear curves, which np.interp evaluates in one C loop each
+    if (
+        not kf_easings[1:].any() and not np.isnan(kf_values).any()
+        and (np.diff(kf_times) > 0).all()
+    ):
+        return np.column_stack([
+            np.interp(frame_times, kf_times, kf_values[:, column])
+            for column in range(kf_values.shape[1])
+        ])
+
+    # Keyframe at or before each frame (-1 before the first) and the one after it
+    prev_idx = np.searchsorted(kf_times, frame_times, side='right') - 1
+    next_idx = prev_idx + 1
+    has_prev = prev_idx >= 0
+    has_next = next_idx < kf_count
+    prev_safe = np.clip(prev_idx, 0, kf_count - 1)
+    next_safe = np.clip(next_idx, 0, kf_count - 1)
+
+    # Progress between the surrounding keyframes, eased per segment
+    span = kf_times[next_safe] - kf_times[prev_safe]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        progress = np.where(span > 0, (frame_times - kf_times[prev_safe]) / span, 0.0)
+    progress = np.clip(progress, 0, 1)
+    easings = kf_easings[next_safe]
+    progress = np.select(
+        [easings == 1, easings == 2, easings == 3],
+        [progress * progress, progress * (2 - progress),
+         progress * progress * (3 - 2 * progress)],
+        progress,
+    )[:, None]
+
+    prev_values = kf_values[prev_safe]
+    next_values = kf_values[next_safe]
+    between = np.where(
+        np.isnan(prev_values), next_values,
+        prev_values + (next_values - prev_values) * progress,
+    )
+    return np.where(
+        (has_prev & has_next)[:, None], between,
+        np.where(has_prev[:, None], prev_values, next_values),
+    )
+
+
+if njit is not None:
+    # No fastmath: it would let the compiler assume away the NaN checks
+    @njit(cache=True)
+    def _interpolate_keyframe_values(kf_times, kf_easings, kf_values, frame_times):
+        # Same contract as _interpolate_keyframe_values_numpy, in one pass
+        # that walks the keyframes forward with the ascending frame times
+        kf_count = kf_times.shape[0]
+        channels = kf_values.shape[1]
+        out = np.empty((frame_times.shape[0], channels))
+        prev = -1
+        for f in range(frame_times.shape[0]):
+            t = frame_times[f]
+            while prev + 1 < kf_count and kf_times[prev + 1] <= t:
+                prev += 1
+            nxt = prev + 1
+            if prev < 0:
+                for c in range(channels):
+                    out[f, c] = kf_values[0, c]
+            elif nxt >= kf_count:
+                for c in range(channels):
+                    out[f, c] = kf_values[prev, c]
+            else:
+                span = kf_times[nxt] - kf_times[prev]
+                progress = (t - kf_times[prev]) / span if span > 0 else 0.0
+                progress = min(max(progress, 0.0), 1.0)
+                easing = kf_easings[nxt]
+                if easing == 1:
+                    progress = progress * progress
+                elif easing == 2:
+                    progress = progress * (2 - progress)
+                elif easing == 3:
+                    progress = progress * progress * (3 - 2 * progress)
+                for c in range(channels):
+                    prev_value = kf_values[prev, c]
+                    next_value = kf_values[nxt, c]
+                    if np.isnan(prev_value):
+                        out[f, c] = next_value
+                    else:
+                        out[f, c] = prev_value + (next_value - prev_value) * progress
+        return out
+else:
+    _interpolate_keyframe_values = _interpolate_keyframe_values_numpy
+
+_kernel_warm_up_started = threading.Event()
+
+
+def _parse_color(color: str) -> Tuple[int, int, int, int]:
+    """
+    Convert a CSS hex (#rgb, #rrggbb, #rrggbbaa) or named color to RGBA.
+
+    Args:
+        color: Color string
+
+    Returns:
+        Tuple of (red, green, blue, alpha); white for unknown colors
+    """
+    if color.startswith('#'):
+        hex_color = color[1:]
+        if len(hex_color) == 3:
+            hex_color = ''.join(digit * 2 for digit in hex_color)
+        try:
+            value = int(hex_color, 16)
+        except ValueError:
+            return (255, 255, 255, 255)
+        if len(hex_color) == 6:
+            return ((value >> 16) & 0xFF, (value >> 8) & 0xFF, value & 0xFF, 255)
+        if len(hex_color) == 8:
+            return ((value >> 24) & 0xFF, (value >> 16) & 0xFF, (value >> 8) & 0xFF, value & 0xFF)
+        return (255, 255, 255, 255)
+    return _NAMED_COLORS.get(color.lower(), (255, 255, 255)) + (255,)
+
+
+def _warm_up_keyframe_kernel() -> None:
+    """
+    Load the compiled keyframe kernel in a background thread.
+
+    Even from numba's on-disk cache the first call takes a few hundred
+    milliseconds, which would otherwise fall on the first keyframed export.
+    Runs once per process; a no-op without numba.
+    """
+    if njit is None or _kernel_warm_up_started.is_set():
+        return
+    _kernel_warm_up_started.set()
+    # Same argument types as _evaluate_compiled_keyframes passes
+    threading.Thread(
+        target=lambda: _interpolate_keyframe_values(
+            np.zeros(2), np.ones(2, dtype=np.int64), np.zeros((2, 1)), np.zeros(1)
+        ),
+        daemon=True
+    ).start()
+
 
 class ExportService:
     """Service for exporting timeline to final video file."""
 
     def __init__(
-        self, uploads_dir: str = "uploads", output_dir: str = "exports"
+        self, uploads_dir: str = "uploads", output_dir: str = "exports",
+        video_encoder: Optional[str] = None, max_workers: Optional[int] = None
     ):
         """
         Initialize export service.
@@ -28,6 +282,11 @@ class ExportService:
         Args:
             uploads_dir: Directory containing uploaded media files
             output_dir: Directory to save exported videos
+            video_encoder: H.264 encoder to use ("auto", "libx264" or one of
+                the hardware encoders). Defaults to the EXPORT_VIDEO_ENCODER
+                environment variable, or "auto" to probe for hardware.
+            max_workers: Number of clips prepared concurrently during an
+                export. Defaults to the CPU count.
         """
         self.uploads_dir = Path(uploads_dir)
         self.output_dir = Path(output_dir)
@@ -42,6 +301,150 @@ class ExportService:
             "480p": (854, 480)
         }
 
+        self.max_workers = max_workers or os.cpu_count() or 1
+        _warm_up_keyframe_kernel()
+        self.video_encoder = video_encoder or os.getenv("EXPORT_VIDEO_ENCODER", "auto")
+        self._resolved_encoder: Optional[str] = None
+        self._resolved_hwaccel: Optional[str] = None
+        # Probing for hardware runs test encodes, so it starts now rather
+        # than inside the first export
+        if self.video_encoder == "auto":
+            threading.Thread(target=self._get_video_encoder, daemon=True).start()
+
+        # Exports probe and resolve the same sources repeatedly (type detection,
+        # audio detection, processing, and clips sharing a resource)
+        self._media_info_cache: Dict[Tuple[str, int, int], Dict] = {}
+        self._media_path_cache: Dict[Tuple[str, str], Path] = {}
+        self._directory_indexes: Dict[Path, Tuple[int, Dict[str, Path], List[Path]]] = {}
+        # Text clips mostly share a few font/size pairs
+        self._font_cache: Dict[Tuple[str, int], object] = {}
+        # Measures text before its image is allocated (made on first use)
+        self._text_measure = None
+        # Lowercase font file stem -> path, listed on first use
+        self._font_index: Optional[Dict[str, str]] = None
+        # ...and captions and titles repeat the same text across a timeline
+        # (render arguments -> PNG bytes, x, y)
+        self._text_image_cache: Dict[Tuple, Tuple[bytes, int, int]] = {}
+
+    def _detect_hw_encoder(self) -> Optional[str]:
+        """
+        Find a working hardware H.264 encoder, probing once per process.
+
+        Returns:
+            Name of the first usable hardware encoder, or None
+        """
+        global _detected_hw_encoder
+        with _hw_encoder_lock:
+            if _detected_hw_encoder is None:
+                _detected_hw_encoder = self._probe_hw_encoders() or ''
+            return _detected_hw_encoder or None
+
+    def _probe_hw_encoders(self) -> Optional[str]:
+        """
+        Find a working hardware H.264 encoder.
+
+        Static ffmpeg builds list nvenc/qsv/amf even without the hardware,
+        so each candidate is confirmed with a one-frame test encode.
+
+        Returns:
+            Name of the first usable hardware encoder, or None
+        """
+        try:
+            result = subprocess.run(
+                ['ffmpeg', '-hide_banner', '-encoders'],
+                capture_output=True, text=True
+            )
+        except OSError:
+            return None
+
+        for encoder, args in _HW_ENCODER_ARGS.items():
+            if encoder not in result.stdout:
+                continue
+            cmd = [
+                'ffmpeg', '-hide_banner', '-loglevel', 'error',
+                '-f', 'lavfi', '-i', 'color=c=black:s=256x256:d=0.1',
+                '-frames:v', '1', '-pix_fmt', 'yuv420p'
+            ]
+            cmd.extend(args)
+            cmd.extend(['-f', 'null', '-'])
+            if subprocess.run(cmd, capture_output=True).returncode == 0:
+                return encoder
+
+        return None
+
+    def _get_video_encoder(self) -> str:
+        """
+        Resolve the H.264 encoder once per service instance.
+
+        Returns:
+            Encoder name, e.g. "h264_nvenc" or "libx264"
+        """
+        if self._resolved_encoder is None:
+            with _hw_encoder_lock:
+                if self._resolved_encoder is None:
+                    if self.video_encoder == "auto":
+                        self._resolved_encoder = self._detect_hw_encoder() or "libx264"
+                    elif self.video_encoder in _HW_ENCODER_ARGS:
+                        self._resolved_encoder = self.video_encoder
+                    else:
+                        self._resolved_encoder = "libx264"
+                    logger.info(f"Using video encoder: {self._resolved_encoder}")
+
+        return self._resolved_encoder
+
+    def _video_codec_args(self, threads: Optional[int] = None) -> List[str]:
+        """
+        Get FFmpeg H.264 encoder arguments for intermediate and final video.
+
+        Args:
+            threads: Encoder thread count. Defaults to ffmpeg's automatic
+                choice, which sizes libx264's pool to every core.
+
+        Returns:
+            List of FFmpeg output arguments
+        """
+        args = list(_HW_ENCODER_ARGS.get(self._get_video_encoder(), _SOFTWARE_ENCODER_ARGS))
+        if threads:
+            args.extend(['-threads', str(threads)])
+        return args
+
+    def _hwaccel_input_args(self) -> List[str]:
+        """
+        Get FFmpeg input arguments for hardware decoding of source video.
+
+        Only used when a hardware encoder is in use, i.e. the machine has a
+        GPU media engine. Decoding is pinned to the encoder's device family
+        where there is one (CUDA for NVENC), since "auto" may pick VAAPI or
+        VDPAU instead; the device is checked once and "auto" is used if it
+        can't be opened. Decoded frames are downloaded for the CPU filters,
+        and ffmpeg falls back to software decoding if the hwaccel can't
+        handle a stream.
+
+        Returns:
+            List of FFmpeg input arguments (empty for software encoding)
+        """
+        encoder = self._get_video_encoder()
+        if encoder not in _HW_ENCODER_ARGS:
+            return []
+
+        if self._resolved_hwaccel is None:
+            hwaccel = _HW_DECODE_ACCELS.get(encoder, 'auto')
+            if hwaccel != 'auto':
+                cmd = [
+                    'ffmpeg', '-hide_banner', '-loglevel', 'error',
+                    '-init_hw_device', hwaccel,
+                    '-f', 'lavfi', '-i', 'nullsrc=s=64x64:d=0.1',
+                    '-frames:v', '1', '-f', 'null', '-'
+                ]
+                try:
+                    if subprocess.run(cmd, capture_output=True).returncode != 0:
+                        hwaccel = 'auto'
+                except OSError:
+                    hwaccel = 'auto'
+            self._resolved_hwaccel = hwaccel
+
+        return ['-hwaccel', self._resolved_hwaccel]
+
     def _get_media_info(self, file_path: str) -> Dict:
         """
         Get media file information using ffprobe.
@@ -50,8 +453,22 @@ class ExportService:
             file_path: Path to media file
 
         Returns:
-            Dict with width, height, duration, has_audio, fps
+            Dict with width, height, duration, has_audio, fps and rotation
+            (the display rotation in degrees, 0-359; missing if the probe
+            fails)
         """
+        # Results are reused per file identity, so edits to the file reprobe
+        try:
+            stat = os.stat(file_path)
+            cache_key = (os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            cache_key = None
+
+        if cache_key is not None:
+            cached = self._media_info_cache.get(cache_key)
+            if cached is not None:
+                return dict(cached)
+
         try:
             probe = ffmpeg.probe(file_path)
             video_info = next(
@@ -79,6 +496,22 @@ class ExportService:
                 elif fps_parts[0].isdigit():
                     result['fps'] = int(fps_parts[0])
 
+            # Display rotation, from the display matrix or the older rotate tag
+            rotation = 0
+            if video_info:
+                for side_data in video_info.get('side_data_list', []):
+                    if 'rotation' in side_data:
+                        rotation = side_data['rotation']
+                        break
+                else:
+                    rotation = video_info.get('tags', {}).get('rotate', 0)
+            result['rotation'] = int(round(float(rotation))) % 360
+
+            if cache_key is not None:
+                if len(self._media_info_cache) >= _MEDIA_INFO_CACHE_MAX_ENTRIES:
+                    self._media_info_cache.clear()
+                self._media_info_cache[cache_key] = dict(result)
+
             return result
         except Exception as e:
             logger.warning(f"Error probing media file {file_path}: {e}")
@@ -101,76 +534,214 @@ class ExportService:
         Returns:
             Interpolated value or None
         """
-        if not keyframes:
-            return None
+        return self._interpolate_keyframe_properties(keyframes, time).get(property_name)
 
-        # Sort keyframes by time
-        sorted_keyframes = sorted(keyframes, key=lambda kf: kf.get("time", 0))
+    def _interpolate_keyframe_properties(
+        self, keyframes: List[Dict], time: float
+    ) -> Dict[str, Union[float, Dict[str, float]]]:
+        """
+        Interpolate all keyframed properties at a specific time.
+
+        The surrounding keyframes and eased progress are found once and
+        shared by every property, instead of once per property. Keyframes
+        already in time order (as the editor keeps them) are not re-sorted,
+        and the surrounding pair is found by binary search. Per-frame
+        evaluation over a whole clip should use _build_keyframe_luts.
+
+        Args:
+            keyframes: List of keyframes with time and properties
+            time: Time within clip to interpolate at
 
-        # Find surrounding keyframes
-        prev_kf = None
-        next_kf = None
+        Returns:
+            Dict mapping property names to their interpolated values;
+            properties without a value at this time are omitted
+        """
+        if not keyframes:
+            return {}
 
-        for kf in sorted_keyframes:
-            kf_time = kf.get("time", 0)
-            if kf_time <= time:
-                prev_kf = kf
-            if kf_time > time and next_kf is None:
-                next_kf = kf
-                break
+        # Sort keyframes by time, unless they already are
+        kf_times = [kf.get("time", 0) for kf in keyframes]
+        if any(later < earlier for earlier, later in zip(kf_times, kf_times[1:])):
+            order = sorted(range(len(keyframes)), key=kf_times.__getitem__)
+            keyframes = [keyframes[i] for i in order]
+            kf_times = [kf_times[i] for i in order]
 
-        # Get property from keyframes
-        prev_val = prev_kf.get("properties", {}).get(property_name) if prev_kf else None
-        next_val = next_kf.get("properties", {}).get(property_name) if next_kf else None
+        # Find surrounding keyframes: the last at or before time, and the
+        # first after it
+        index = bisect.bisect_right(kf_times, time)
+        prev_kf = keyframes[index - 1] if index > 0 else None
+        next_kf = keyframes[index] if index < len(keyframes) else None
 
-        # If no keyframes with this property, return None
-        if prev_val is None and next_val is None:
-            return None
+        prev_props = prev_kf.get("properties", {}) if prev_kf else {}
+        next_props = next_kf.get("properties", {}) if next_kf else {}
 
         # If only one keyframe or after last keyframe
         if prev_kf and not next_kf:
-            return prev_val
+            return {name: value for name, value in prev_props.items() if value is not None}
 
         # If before first keyframe
         if not prev_kf and next_kf:
-            return next_val
+            return {name: value for name, value in next_props.items() if value is not None}
 
         # Interpolate between two keyframes
-        if prev_kf and next_kf:
-            prev_time = prev_kf.get("time", 0)
-            next_time = next_kf.get("time", 0)
-
-            if next_time <= prev_time:
-                return prev_val
-
-            # Calculate progress between keyframes
-            progress = (time - prev_time) / (next_time - prev_time)
-            progress = max(0, min(1, progress))  # Clamp to [0, 1]
-
-            # Apply easing (currently only linear)
-            easing = next_kf.get("easing", "linear")
-            if easing == "ease-in":
-                progress = progress * progress
-            elif easing == "ease-out":
-                progress = progress * (2 - progress)
-            elif easing == "ease-in-out":
-                progress = progress * progress * (3 - 2 * progress)
+        prev_time = prev_kf.get("time", 0)
+        next_time = next_kf.get("time", 0)
+
+        if next_time <= prev_time:
+            return {name: value for name, value in prev_props.items() if value is not None}
+
+        # Calculate progress between keyframes
+        progress = (time - prev_time) / (next_time - prev_time)
+        progress = max(0, min(1, progress))  # Clamp to [0, 1]
+
+        # Apply easing (currently only linear)
+        easing = next_kf.get("easing", "linear")
+        if easing == "ease-in":
+            progress = progress * progress
+        elif easing == "ease-out":
+            progress = progress * (2 - progress)
+        elif easing == "ease-in-out":
+            progress = progress * progress * (3 - 2 * progress)
+
+        values = {}
+        for name in prev_props.keys() | next_props.keys():
+            prev_val = prev_props.get(name)
+            next_val = next_props.get(name)
 
             # Interpolate based on type
             if isinstance(prev_val, (int, float)) and isinstance(next_val, (int, float)):
-                return prev_val + (next_val - prev_val) * progress
+                value = prev_val + (next_val - prev_val) * progress
             elif isinstance(prev_val, dict) and isinstance(next_val, dict):
-                # Interpolate dict values (for scale, position)
-                result = {}
-                for key in set(list(prev_val.keys()) + list(next_val.keys())):
-                    prev_v = prev_val.get(key, 0)
-                    next_v = next_val.get(key, 0)
-                    result[key] = prev_v + (next_v - prev_v) * progress
-                return result
+                # Interpolate dict values (for scale, position); only x and
+                # y are read, as in _compile_keyframes
+                prev_x = prev_val.get("x", 0)
+                prev_y = prev_val.get("y", 0)
+                value = {
+                    "x": prev_x + (next_val.get("x", 0) - prev_x) * progress,
+                    "y": prev_y + (next_val.get("y", 0) - prev_y) * progress,
+                }
             else:
-                return next_val
+                value = next_val
 
-        return None
+            if value is not None:
+                values[name] = value
+
+        return values
+
+    def _compile_keyframes(self, keyframes: List[Dict]) -> Optional[Dict]:
+        """
+        Convert a clip's keyframes into parallel arrays.
+
+        The keyframe dicts are sorted and read once here, so evaluating them
+        is a search over a times array rather than dict lookups per time and
+        property.
+
+        Args:
+            keyframes: List of keyframes with time and properties
+
+        Returns:
+            Dict with 'times' (sorted, shape (K,)), 'easings'
+            (_KEYFRAME_EASING_CODES, shape (K,)), 'values' (one column per
+            numeric property and two, x and y, per dict property, NaN where
+            a keyframe leaves the property unset, shape (K, C)) and
+            'columns' (property name -> (first column, column count)), or
+            None if no keyframe sets a property
+        """
+        if not keyframes:
+            return None
+
+        sorted_keyframes = sorted(keyframes, key=lambda kf: kf.get("time", 0))
+        kf_count = len(sorted_keyframes)
+        property_names = sorted({
+            name for kf in sorted_keyframes for name in kf.get("properties", {})
+        })
+        if not property_names:
+            return None
+
+        value_columns = []
+        columns = {}
+        column = 0
+        for property_name in property_names:
+            raw_values = [kf.get("properties", {}).get(property_name) for kf in sorted_keyframes]
+            is_pair = any(isinstance(value, dict) for value in raw_values)
+            values = np.full((kf_count, 2 if is_pair else 1), np.nan)
+            for i, value in enumerate(raw_values):
+                if isinstance(value, dict):
+                    values[i] = (value.get("x", 0), value.get("y", 0))
+                elif isinstance(value, (int, float)):
+                    values[i] = value
+            value_columns.append(values)
+            columns[property_name] = (column, values.shape[1])
+            column += values.shape[1]
+
+        return {
+            'times': np.array([kf.get("time", 0) for kf in sorted_keyframes], dtype=np.float64),
+            'easings': np.array(
+                [_KEYFRAME_EASING_CODES.get(kf.get("easing", "linear"), 0) for kf in sorted_keyframes],
+                dtype=np.int64
+            ),
+            'values': np.hstack(value_columns),
+            'columns': columns,
+        }
+
+    @staticmethod
+    def _evaluate_compiled_keyframes(compiled: Dict, times: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        Interpolate every property of compiled keyframes at the given times.
+
+        All properties share one search for the surrounding keyframes and
+        one eased progress per time.
+
+        Args:
+            compiled: Keyframes from _compile_keyframes
+            times: Ascending times within the clip, shape (N,)
+
+        Returns:
+            Dict mapping each property name to its values: shape (N,) for
+            numeric properties, (N, 2) holding x and y for dict properties
+            (numbers are applied to both). Times with no value are NaN.
+        """
+        interpolated = _interpolate_keyframe_values(
+            compiled['times'], compiled['easings'], compiled['values'],
+            np.asarray(times, dtype=np.float64)
+        )
+        return {
+            name: interpolated[:, start:start + 2] if count == 2 else interpolated[:, start]
+            for name, (start, count) in compiled['columns'].items()
+        }
+
+    def _build_keyframe_luts(
+        self, keyframes: List[Dict], duration: float, fps: int
+    ) -> Dict[str, np.ndarray]:
+        """
+        Interpolate every keyframed property at each frame of a clip at once.
+
+        Produces the same values as _interpolate_keyframes at the frame times
+        0, 1/fps, 2/fps, ..., but reads the keyframes once and evaluates all
+        frames in one compiled (or vectorized) pass, so a per-frame lookup
+        is an index. Values are interpolated in double precision and stored
+        as float32, which halves the tables of long clips and still resolves
+        positions to well under a pixel.
+
+        Args:
+            keyframes: List of keyframes with time and properties
+            duration: Clip duration in seconds
+            fps: Frames per second
+
+        Returns:
+            Dict mapping each property name to a float32 array indexed by
+            frame number, shaped as by _evaluate_compiled_keyframes
+        """
+        compiled = self._compile_keyframes(keyframes)
+        if compiled is None:
+            return {}
+
+        frame_count = max(1, int(round(duration * fps)))
+        frame_times = np.arange(frame_count, dtype=np.float64) / fps
+        return {
+            name: values.astype(np.float32)
+            for name, values in self._evaluate_compiled_keyframes(compiled, frame_times).items()
+        }
 
     def _calculate_content_duration(self, layers: List[Dict]) -> float:
         """
@@ -182,23 +753,106 @@ class ExportService:
         Returns:
             The end time of the last clip, or 0 if no clips exist
         """
-        max_end_time = 0.0
-
-        for layer in layers:
-            clips = layer.get("clips", [])
-            for clip in clips:
-                start_time = clip.get("startTime", 0)
-                duration = clip.get("duration", 0)
-                clip_end_time = start_time + duration
-                if clip_end_time > max_end_time:
-                    max_end_time = clip_end_time
-
-        return max_end_time
+        max_end_time = max(
+            (
+                clip.get("startTime", 0) + clip.get("duration", 0)
+                for layer in layers
+                for clip in layer.get("clips", [])
+            ),
+            default=0.0
+        )
+        return max(max_end_time, 0.0)
 
     def _find_media_file(self, resource_id: str, clip_data: dict = None) -> Optional[Path]:
         """
         Find media file by resource ID, using clip data URL if available.
 
+        Args:
+            resource_id: Resource ID to find
+            clip_data: Optional clip data containing URL with project info
+
+        Returns:
+            Path to media file or None
+        """
+        url = clip_data.get("url", "") if clip_data else ""
+        cache_key = (resource_id, url)
+        cached = self._media_path_cache.get(cache_key)
+        if cached is not None:
+            if cached.exists():
+                return cached
+            self._media_path_cache.pop(cache_key, None)
+
+        file_path = self._search_media_file(resource_id, clip_data)
+        if file_path is not None:
+            self._media_path_cache[cache_key] = file_path
+        return file_path
+
+    def _clip_media_path(self, item: Dict) -> Optional[Path]:
+        """
+        Get the media file of a collected clip entry.
+
+        export_timeline looks each clip's file up once as it collects the
+        clips; entries built without one are looked up here.
+
+        Args:
+            item: Collected clip entry (clip, optionally media_path)
+
+        Returns:
+            Path to media file or None
+        """
+        if 'media_path' in item:
+            return item['media_path']
+        clip_data = item['clip']
+        return self._find_media_file(clip_data.get("resourceId", "unknown"), clip_data.get("data", {}))
+
+    def _directory_index(self, directory: Path) -> Tuple[Dict[str, Path], List[Path]]:
+        """
+        List a directory's media files by stem, plus its subdirectories.
+
+        The listing is one scandir and is reused until the directory's
+        mtime changes (i.e. an entry is added, removed or renamed).
+
+        Args:
+            directory: Directory to index
+
+        Returns:
+            Tuple of (stem -> media file path, subdirectory paths). When a
+            stem exists with several extensions, the earliest entry in
+            _MEDIA_EXTENSIONS wins.
+        """
+        try:
+            mtime_ns = directory.stat().st_mtime_ns
+        except OSError:
+            return {}, []
+
+        cached = self._directory_indexes.get(directory)
+        if cached is not None and cached[0] == mtime_ns:
+            return cached[1], cached[2]
+
+        files: Dict[str, Path] = {}
+        ranks: Dict[str, int] = {}
+        subdirs: List[Path] = []
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_dir():
+                        subdirs.append(Path(entry.path))
+                        continue
+                    stem, ext = os.path.splitext(entry.name)
+                    rank = _MEDIA_EXTENSION_RANK.get(ext)
+                    if rank is not None and rank < ranks.get(stem, len(_MEDIA_EXTENSIONS)):
+                        files[stem] = Path(entry.path)
+                        ranks[stem] = rank
+        except OSError:
+            return {}, []
+
+        self._directory_indexes[directory] = (mtime_ns, files, subdirs)
+        return files, subdirs
+
+    def _search_media_file(self, resource_id: str, clip_data: dict = None) -> Optional[Path]:
+        """
+        Search the uploads directories for a resource's media file.
+
         Args:
             resource_id: Resource ID to find
             clip_data: Optional clip data containing URL with project info
@@ -209,44 +863,132 @@ class ExportService:
         # Try to extract project_id from clip data URL
         # URL format: /api/media/project/{project_id}/{media_id}/file
         if clip_data and clip_data.get("url"):
-            url = clip_data.get("url", "")
-            import re
-            match = re.search(r'/api/media/project/([^/]+)/([^/]+)/file', url)
+            match = _PROJECT_MEDIA_URL.search(clip_data.get("url", ""))
             if match:
                 project_id = match.group(1)
                 media_id = match.group(2)
                 # Search in project-specific directory
-                project_dir = self.uploads_dir / project_id
-                if project_dir.exists():
-                    for ext in ['.mp4', '.mov', '.avi', '.mp3', '.wav', '.m4a', '.jpg', '.png', '.jpeg', '.gif', '.webp']:
-                        file_path = project_dir / f"{media_id}{ext}"
-                        if file_path.exists():
-                            logger.debug(f"Found media file in project dir: {file_path}")
-                            return file_path
-        
+                file_path = self._directory_index(self.uploads_dir / project_id)[0].get(media_id)
+                if file_path is not None:
+                    logger.debug("Found media file in project dir: %s", file_path)
+                    return file_path
+
+        uploads_files, project_dirs = self._directory_index(self.uploads_dir)
+
         # Fallback: Search all project subdirectories
-        if self.uploads_dir.exists():
-            for project_dir in self.uploads_dir.iterdir():
-                if project_dir.is_dir():
-                    for ext in ['.mp4', '.mov', '.avi', '.mp3', '.wav', '.m4a', '.jpg', '.png', '.jpeg', '.gif', '.webp']:
-                        file_path = project_dir / f"{resource_id}{ext}"
-                        if file_path.exists():
-                            logger.debug(f"Found media file in project subdir: {file_path}")
-                            return file_path
-        
-        # Legacy fallback: search directly in uploads dir
-        for ext in ['.mp4', '.mov', '.avi', '.mp3', '.wav', '.m4a', '.jpg', '.png', '.jpeg', '.gif', '.webp']:
-            file_path = self.uploads_dir / f"{resource_id}{ext}"
-            if file_path.exists():
+        for project_dir in project_dirs:
+            file_path = self._directory_index(project_dir)[0].get(resource_id)
+            if file_path is not None:
+                logger.debug("Found media file in project subdir: %s", file_path)
                 return file_path
-        
+
+        # Legacy fallback: search directly in uploads dir
+        file_path = uploads_files.get(resource_id)
+        if file_path is not None:
+            return file_path
+
         logger.warning(f"Media file not found for resource_id: {resource_id}")
         return None
 
+    def _prefetch_media_info(self, layers: List[Dict]) -> Dict[Tuple[str, str], Optional[Path]]:
+        """
+        Probe the media of every exported clip concurrently.
+
+        Fills the media info cache, so collecting and planning clips reads
+        the probes from memory instead of running ffprobe one clip at a time.
+
+        Args:
+            layers: Timeline layers
+
+        Returns:
+            Dict of (resource ID, URL) -> media file path (or None), with
+            each resource looked up once however many clips use it
+        """
+        resolved: Dict[Tuple[str, str], Optional[Path]] = {}
+        media_paths = set()
+        for layer in layers:
+            layer_type = layer.get("type", "video")
+            if not layer.get("visible", True) or layer_type == "text":
+                continue
+            if layer_type == "audio" and layer.get("muted", False):
+                continue
+            for clip in layer.get("clips", []):
+                clip_data = clip.get("data", {})
+                key = (clip.get("resourceId", "unknown"), clip_data.get("url", "") if clip_data else "")
+                if key in resolved:
+                    continue
+                media_path = self._find_media_file(key[0], clip_data)
+                resolved[key] = media_path
+                if media_path:
+                    media_paths.add(str(media_path))
+
+        if len(media_paths) > 1:
+            probe_workers = min(max(self.max_workers, _MAX_PROBE_WORKERS), len(media_paths))
+            with ThreadPoolExecutor(max_workers=probe_workers) as executor:
+                list(executor.map(self._get_media_info, media_paths))
+        return resolved
+
+    def _get_font_path(self, font_family: str) -> Optional[str]:
+        """
+        Find the font file of a font family in the system font directories.
+
+        The directories are listed once, on first use, rather than trying
+        candidate paths for every font that is loaded.
+
+        Args:
+            font_family: Font family name (matched case-insensitively
+                against font file names)
+
+        Returns:
+            Path to the font file or None
+        """
+        if self._font_index is None:
+            font_index: Dict[str, str] = {}
+            for font_dir in _FONT_DIRS:
+                for root, _, files in os.walk(font_dir):
+                    for name in files:
+                        stem, ext = os.path.splitext(name)
+                        if ext.lower() in _FONT_EXTENSIONS:
+                            font_index.setdefault(stem.lower(), os.path.join(root, name))
+            self._font_index = font_index
+        return self._font_index.get(font_family.lower())
+
+    def _load_font(self, font_family: str, font_size: int):
+        """
+        Load a TrueType font, falling back to Pillow's default font.
+
+        Fonts are cached per family and size, so repeated text clips skip
+        the font file lookup and parsing.
+
+        Args:
+            font_family: Font family name or path
+            font_size: Font size in pixels
+
+        Returns:
+            Pillow font object
+        """
+        from PIL import ImageFont
+
+        cache_key = (font_family, font_size)
+        font = self._font_cache.get(cache_key)
+        if font is not None:
+            return font
+
+        try:
+            # Families not installed may still be a font file path or a
+            # name Pillow resolves itself
+            font = ImageFont.truetype(self._get_font_path(font_family) or font_family, font_size)
+        except (IOError, OSError):
+            font = ImageFont.load_default()
+
+        self._font_cache[cache_key] = font
+        return font
+
     def _create_text_image(
         self, text: str, font_size: int, color: str, font_family: str,
-        width: int, height: int, pos_x: int = None, pos_y: int = None
-    ) -> Optional[str]:
+        width: int, height: int, pos_x: int = None, pos_y: int = None,
+        crop: bool = False, rotation: float = 0
+    ) -> Optional[Tuple[str, int, int]]:
         """
         Create a text image using Pillow.
 
@@ -259,51 +1001,38 @@ class ExportService:
             height: Canvas height
             pos_x: X position for text (None = center)
             pos_y: Y position for text (None = center)
+            crop: Crop the image to the drawn text instead of keeping the
+                full canvas, so compositing only blends the covered region
+            rotation: Clockwise rotation in degrees about the text's
+                top-left corner (as in preview)
 
         Returns:
-            Path to generated PNG image or None
+            Tuple of (path to generated PNG image, x, y), where x and y place
+            the image on the canvas, or None
         """
+        # Every call gets its own file, as each export deletes its images
+        cache_key = (text, font_size, color, font_family, width, height, pos_x, pos_y, crop, rotation)
+        output_path = str(self.temp_dir / f"text_{uuid.uuid4()}.png")
         try:
-            from PIL import Image, ImageDraw, ImageFont
+            cached = self._text_image_cache.get(cache_key)
+            if cached is not None:
+                png_bytes, offset_x, offset_y = cached
+                with open(output_path, 'wb') as f:
+                    f.write(png_bytes)
+                return output_path, offset_x, offset_y
 
-            # Convert color from hex or name to RGB
-            if color.startswith('#'):
-                hex_color = color.lstrip('#')
-                rgb_color = tuple(int(hex_color[i:i + 2], 16) for i in (0, 2, 4))
-            else:
-                color_map = {
-                    'white': (255, 255, 255), 'black': (0, 0, 0),
-                    'red': (255, 0, 0), 'green': (0, 255, 0),
-                    'blue': (0, 0, 255), 'yellow': (255, 255, 0),
-                    'cyan': (0, 255, 255), 'magenta': (255, 0, 255),
-                    'orange': (255, 165, 0), 'purple': (128, 0, 128),
-                    'pink': (255, 192, 203), 'gray': (128, 128, 128),
-                }
-                rgb_color = color_map.get(color.lower(), (255, 255, 255))
+            from PIL import Image, ImageDraw
 
-            # Try to load font
-            font = None
-            try:
-                font_paths = [
-                    f"C:/Windows/Fonts/{font_family}.ttf",
-                    f"C:/Windows/Fonts/{font_family.lower()}.ttf",
-                    f"/usr/share/fonts/truetype/{font_family.lower()}.ttf",
-                    f"/usr/share/fonts/TTF/{font_family}.ttf",
-                ]
-                for font_path in font_paths:
-                    try:
-                        font = ImageFont.truetype(font_path, font_size)
-                        break
-                    except (IOError, OSError):
-                        continue
-                if font is None:
-                    font = ImageFont.truetype(font_family, font_size)
-            except (IOError, OSError):
-                font = ImageFont.load_default()
+            # Convert color from hex or name to RGBA
+            fill_color = _parse_color(color)
 
-            # Create transparent image
-            img = Image.new('RGBA', (width, height), (0, 0, 0, 0))
-            draw = ImageDraw.Draw(img)
+            font = self._load_font(font_family, font_size)
+
+            # Text is measured before its image is made, so the image can be
+            # sized to the text
+            if self._text_measure is None:
+                self._text_measure = ImageDraw.Draw(Image.new('RGBA', (1, 1)))
+            measure = self._text_measure
 
             # Position text
             # In preview: ctx.textAlign = "left", ctx.textBaseline = "top"
@@ -315,7 +1044,7 @@ class ExportService:
                 x = pos_x
             else:
                 # Default: center horizontally on canvas
-                bbox = draw.textbbox((0, 0), text, font=font)
+                bbox = measure.textbbox((0, 0), text, font=font)
                 text_width = bbox[2] - bbox[0]
                 x = (width - text_width) // 2
             
@@ -324,18 +1053,54 @@ class ExportService:
                 y = pos_y
             else:
                 # Default: center vertically on canvas
-                bbox = draw.textbbox((0, 0), text, font=font)
+                bbox = measure.textbbox((0, 0), text, font=font)
                 text_height = bbox[3] - bbox[1]
                 y = (height - text_height) // 2
 
-            # Draw text with alpha (left-top aligned)
-            draw.text((x, y), text, font=font, fill=rgb_color + (255,))
+            # A cropped, unturned image only needs the part of the canvas the
+            # text covers. Turned text is drawn on the full canvas, as it
+            # turns about its anchor
+            origin_x, origin_y, image_width, image_height = 0, 0, width, height
+            if crop and not rotation % 360:
+                left, top, right, bottom = measure.textbbox((x, y), text, font=font)
+                left, top = max(0, left), max(0, top)
+                right, bottom = min(width, right), min(height, bottom)
+                if right > left and bottom > top:
+                    origin_x, origin_y = left, top
+                    image_width, image_height = right - left, bottom - top
 
-            # Save to temp file
-            output_path = str(self.temp_dir / f"text_{uuid.uuid4()}.png")
-            img.save(output_path, 'PNG')
+            # Create transparent image
+            img = Image.new('RGBA', (image_width, image_height), (0, 0, 0, 0))
+            draw = ImageDraw.Draw(img)
 
-            return output_path
+            # Draw text with alpha (left-top aligned)
+            draw.text((x - origin_x, y - origin_y), text, font=font, fill=fill_color)
+
+            # Turned once here, so the clip's frames need no rotate filter.
+            # Pillow turns counterclockwise
+            if rotation % 360:
+                img = img.rotate(-rotation, resample=Image.BICUBIC, center=(x, y))
+
+            offset_x, offset_y = origin_x, origin_y
+            if crop:
+                bbox = img.getbbox()
+                if bbox:
+                    img = img.crop(bbox)
+                    offset_x, offset_y = origin_x + bbox[0], origin_y + bbox[1]
+
+            # Save to temp file. ffmpeg decodes it once per export, so the
+            # fastest compression level costs far less than it saves
+            buffer = io.BytesIO()
+            img.save(buffer, 'PNG', compress_level=1)
+            png_bytes = buffer.getvalue()
+            with open(output_path, 'wb') as f:
+                f.write(png_bytes)
+
+            if len(self._text_image_cache) >= _TEXT_IMAGE_CACHE_MAX_ENTRIES:
+                self._text_image_cache.clear()
+            self._text_image_cache[cache_key] = (png_bytes, offset_x, offset_y)
+
+            return output_path, offset_x, offset_y
         except Exception as e:
             logger.error(f"Error creating text image: {e}")
             return None
@@ -676,7 +1441,8 @@ class ExportService:
         - OUT transition with direction="in": 1.0x → 2.0x (grow from normal to large)
         - OUT transition with direction="out": 1.0x → 0.5x (shrink from normal to small)
         
-        Uses scale+pad for zoom-out (scale < 1) and scale+crop for zoom-in (scale > 1)
+        Uses scale+pad for zoom-out (scale < 1) and scale+crop for zoom-in (scale > 1).
+        Scaling targets clip_width x clip_height regardless of the input size.
         
         Args:
             in_trans_duration: Duration of IN transition in seconds (0 if none)
@@ -742,80 +1508,1495 @@ class ExportService:
         # For scale < 1: scale down then pad to maintain canvas size (zoom out effect)
         # IMPORTANT: eval=frame is required for frame-based expressions (n, t, pos) in scale filter
         # Note: crop filter doesn't support eval option, but it evaluates expressions per-frame by default
+        # Sizes are relative to the clip's target size rather than iw/ih, so
+        # this scale can also take over the clip's base resize in one pass
         return (
-            f"scale='iw*({scale_expr})':'ih*({scale_expr})':eval=frame,"
+            f"scale='{clip_width}*({scale_expr})':'{clip_height}*({scale_expr})':eval=frame,"
             f"crop='min(iw,{clip_width})':'min(ih,{clip_height})':"
             f"'max(0,(iw-{clip_width})/2)':'max(0,(ih-{clip_height})/2)',"
             f"pad={clip_width}:{clip_height}:'(ow-iw)/2':'(oh-ih)/2'"
         )
 
-    def export_timeline(
-        self,
-        timeline_data: Dict,
-        output_path: str,
-        resolution: str = "1080p",
-        fps: int = 30,
-        progress_callback: Optional[Callable[[float], None]] = None,
-        width: Optional[int] = None,
-        height: Optional[int] = None
-    ) -> str:
+    @staticmethod
+    def _has_clip_below(item: Dict, items: List[Dict]) -> bool:
         """
-        Export timeline to final video file using FFmpeg.
+        Check whether another clip is composited beneath a clip while it plays.
 
         Args:
-            timeline_data: Timeline JSON with layers and clips
-            output_path: Path for output video file
-            resolution: Resolution preset (1080p, 720p, 480p) - fallback
-            fps: Frames per second for output video
-            progress_callback: Optional callback for progress updates
-            width: Optional explicit width
-            height: Optional explicit height
+            item: Collected clip entry (clip, layer_index)
+            items: All collected video and text clip entries
 
         Returns:
-            Path to exported video file
+            True if a clip on the same or a lower layer overlaps it in time
         """
-        logger.info(f"Starting export: {width}x{height} @ {fps}fps")
-
-        try:
-            if progress_callback:
-                progress_callback(0.0)
-
-            # Get resolution dimensions
-            if not (width and height):
-                if timeline_data.get("resolution"):
-                    timeline_res = timeline_data["resolution"]
-                    width = timeline_res.get("width", 1080)
-                    height = timeline_res.get("height", 1920)
-                else:
-                    width, height = self.resolutions.get(resolution, (1920, 1080))
+        start = item['clip'].get('startTime', 0)
+        end = start + item['clip'].get('duration', 0)
+        for other in items:
+            if other is item or other['layer_index'] > item['layer_index']:
+                continue
+            other_start = other['clip'].get('startTime', 0)
+            other_end = other_start + other['clip'].get('duration', 0)
+            if other_start < end and start < other_end:
+                return True
+        return False
+
+    def _plan_video_clip(
+        self, video_item: Dict, width: int, height: int,
+        source_width: int, source_height: int, fps: int,
+        letterbox: bool = False, threads: Optional[int] = None,
+        temp_files: Optional[List[str]] = None
+    ) -> Optional[Dict]:
+        """
+        Work out how one video or image clip is decoded, filtered and placed.
 
-            # Get source resolution for scaling positions
-            source_res = timeline_data.get("sourceResolution", {})
-            source_width = source_res.get("width", width)
-            source_height = source_res.get("height", height)
+        The plan is rendered either to an intermediate file for compositing
+        or directly as one input chain of the composite filter graph.
 
-            layers = timeline_data.get("layers", [])
+        Args:
+            video_item: Collected clip entry (clip, type, layer_index, muted, and
+                optionally the media_path and media_info looked up when collected)
+            width: Canvas width
+            height: Canvas height
+            source_width: Preview canvas width that positions are relative to
+            source_height: Preview canvas height that positions are relative to
+            fps: Output frames per second
+            letterbox: Whether nothing is composited beneath the clip, so it
+                may be padded with black to the canvas instead of carrying alpha
+            threads: Decoder thread count for the clip's input, or None for
+                ffmpeg's automatic choice
+            temp_files: List that the clip's keyframe command script is
+                appended to for cleanup; keyframed scale and position are
+                only animated when it is given
 
-            # Calculate content duration
-            content_duration = self._calculate_content_duration(layers)
-            timeline_duration = timeline_data.get("duration", 0)
-            duration = content_duration if content_duration > 0 else timeline_duration
+        Returns:
+            Clip plan (media_path, input_args, filters, alpha_filters,
+            needs_alpha, is_passthrough, clip_info), or None if the clip's
+            media is missing
+        """
+        clip_data = video_item['clip']
+        clip_type = video_item['type']
 
-            if duration <= 0:
-                raise Exception("No content to export: timeline has no clips")
+        resource_id = clip_data.get("resourceId")
+        if not resource_id:
+            return None
 
-            if progress_callback:
-                progress_callback(0.1)
+        media_path = self._clip_media_path(video_item)
+        if not media_path:
+            logger.warning(f"Media file not found: {resource_id}")
+            return None
 
-            # Collect all clips
-            video_clips = []
-            audio_clips = []
-            text_clips = []
-            layer_index = 0
+        start_time = clip_data.get("startTime", 0)
+        clip_duration = clip_data.get("duration", 0)
+        trim_start = clip_data.get("trimStart", 0)
+        trim_end = clip_data.get("trimEnd", 0)
+        transitions = clip_data.get("transitions", {})
+
+        # Get media info
+        media_info = video_item.get('media_info') or self._get_media_info(str(media_path))
+        original_width = media_info.get('width') or width
+        original_height = media_info.get('height') or height
+        # Ensure we have valid numeric values
+        if original_width is None or original_width == 0:
+            original_width = width if width is not None else 1920
+        if original_height is None or original_height == 0:
+            original_height = height if height is not None else 1080
+
+        # Get transform values
+        user_scale = clip_data.get("scale", 1)
+        if isinstance(user_scale, dict):
+            user_scale_x = user_scale.get("x", 1)
+            user_scale_y = user_scale.get("y", 1)
+        else:
+            user_scale_x = user_scale
+            user_scale_y = user_scale
+
+        position = clip_data.get("position", {})
+        pos_x = position.get("x", 0) if position else 0
+        pos_y = position.get("y", 0) if position else 0
+        opacity = clip_data.get("opacity", 1)
+        opacity = 1 if opacity is None else max(0.0, min(1.0, opacity))
+        # Whole turns leave the clip as it is, so they need no rotate pass
+        rotation = (clip_data.get("rotation") or 0) % 360
+
+        # Keyframes that hold a property at one value are applied as its
+        # static value, so only properties that actually change are animated
+        luts = {}
+        if temp_files is not None and clip_data.get("keyframes") and clip_duration > 0:
+            luts = self._build_keyframe_luts(clip_data["keyframes"], clip_duration, fps)
+        if 'scale' in luts:
+            frame_scale_x, frame_scale_y = self._keyframe_lut_pair(luts['scale'], user_scale_x, user_scale_y)
+            if (frame_scale_x == frame_scale_x[0]).all() and (frame_scale_y == frame_scale_y[0]).all():
+                user_scale_x, user_scale_y = float(frame_scale_x[0]), float(frame_scale_y[0])
+                del luts['scale']
+        if 'position' in luts:
+            frame_pos_x, frame_pos_y = self._keyframe_lut_pair(luts['position'], pos_x, pos_y)
+            if (frame_pos_x == frame_pos_x[0]).all() and (frame_pos_y == frame_pos_y[0]).all():
+                pos_x, pos_y = float(frame_pos_x[0]), float(frame_pos_y[0])
+                del luts['position']
+        if 'rotation' in luts and luts['rotation'].ndim == 1:
+            frame_rotation = np.where(np.isnan(luts['rotation']), rotation, luts['rotation'])
+            if (frame_rotation == frame_rotation[0]).all():
+                rotation = float(frame_rotation[0]) % 360
+                del luts['rotation']
+        if 'opacity' in luts and luts['opacity'].ndim == 1:
+            frame_opacity = np.where(np.isnan(luts['opacity']), opacity, luts['opacity'])
+            if (frame_opacity == frame_opacity[0]).all():
+                opacity = max(0.0, min(1.0, float(frame_opacity[0])))
+                del luts['opacity']
+
+        # Build FFmpeg command using subprocess for more control
+        filter_parts = []
+
+        # Input setup
+        source = None
+        if clip_type == "image":
+            input_args = ['-loop', '1', '-t', str(clip_duration), '-i', str(media_path)]
+        else:
+            input_args = self._hwaccel_input_args()
+            if threads:
+                input_args.extend(['-threads', str(threads)])
+            decoder_args = list(input_args)
+            if trim_start > 0:
+                input_args.extend(['-ss', str(trim_start)])
+            input_args.extend(['-i', str(media_path)])
+            if clip_duration > 0:
+                media_duration = media_info['duration'] - trim_start - trim_end
+                actual_duration = min(clip_duration, media_duration) if media_duration > 0 else clip_duration
+                input_args.extend(['-t', str(actual_duration)])
+                # Lets clips cut from one source share its decoder
+                source = {
+                    'path': str(media_path),
+                    'decoder_args': decoder_args,
+                    'start': trim_start,
+                    'duration': actual_duration
+                }
 
+        # Build video filter
+        # For compositing, we need to:
+        # 1. Scale to the intended size based on user scale and canvas ratio
+        # 2. Keep track of position for overlay
+        # 3. Crop will be applied at composite stage to show only visible part
+        overlay_x = 0
+        overlay_y = 0
+        
+        # Calculate canvas scale factors (export resolution vs preview resolution)
+        canvas_scale_x = width / source_width if source_width > 0 else 1.0
+        canvas_scale_y = height / source_height if source_height > 0 else 1.0
+        
+        # Apply user scale on top of canvas scale
+        final_scale_x = user_scale_x * canvas_scale_x
+        final_scale_y = user_scale_y * canvas_scale_y
+        
+        # Calculate scaled dimensions
+        scaled_clip_width = int(original_width * final_scale_x)
+        scaled_clip_height = int(original_height * final_scale_y)
+        
+        # Ensure minimum size
+        scaled_clip_width = max(scaled_clip_width, 2)
+        scaled_clip_height = max(scaled_clip_height, 2)
+        
+        # Keyframed scale, position, rotation and opacity are interpolated
+        # for every frame up front; sendcmd hands each frame's values to the
+        # clip's named scale, overlay, rotate and alpha filters, so the graph
+        # only applies precomputed sizes, offsets, angles and alpha factors
+        filter_id = None
+        keyframe_commands = {}
+        frame_rotation = None
+        if 'rotation' in luts and luts['rotation'].ndim == 1:
+            frame_rotation = np.where(np.isnan(luts['rotation']), rotation, luts['rotation'])
+            # Keyframes that never turn the clip need no rotate filter
+            if not (frame_rotation % 360).any():
+                frame_rotation = None
+        frame_opacity = None
+        if 'opacity' in luts and luts['opacity'].ndim == 1:
+            # In steps of the 8-bit alpha it ends up as, so runs of frames
+            # that look the same send no commands
+            frame_opacity = np.round(
+                np.clip(np.where(np.isnan(luts['opacity']), opacity, luts['opacity']), 0, 1) * 255
+            ).astype(np.float32) / 255
+            # Keyframes that keep the clip opaque need no alpha filter
+            if (frame_opacity == 1).all():
+                frame_opacity = None
+        if (
+            'scale' in luts or 'position' in luts
+            or frame_rotation is not None or frame_opacity is not None
+        ):
+            filter_id = f"kf{uuid.uuid4().hex[:8]}"
+        if 'scale' in luts:
+            keyframe_commands[(f"{filter_id}_scale", 'w')] = np.maximum(
+                (original_width * frame_scale_x * canvas_scale_x).astype(np.int64), 2
+            )
+            keyframe_commands[(f"{filter_id}_scale", 'h')] = np.maximum(
+                (original_height * frame_scale_y * canvas_scale_y).astype(np.int64), 2
+            )
+            base_scale_filter = f"scale@{filter_id}_scale={scaled_clip_width}:{scaled_clip_height}"
+        elif (
+            (scaled_clip_width, scaled_clip_height) == (original_width, original_height)
+            and (media_info.get('width'), media_info.get('height')) == (original_width, original_height)
+            and media_info.get('rotation') in (0, 180)
+        ):
+            # Already shown at its probed size (a quarter turn swaps the
+            # decoded width and height, so it is still scaled)
+            base_scale_filter = None
+        else:
+            base_scale_filter = f"scale={scaled_clip_width}:{scaled_clip_height}"
+        if base_scale_filter:
+            filter_parts.append(base_scale_filter)
+        
+        # Calculate overlay position
+        # IMPORTANT: Preview centers based on ORIGINAL dimensions (before user scale),
+        # not the scaled dimensions. This ensures consistent positioning.
+        # Frontend logic: if position is (0,0), center the clip
+        # x = position.x !== 0 ? position.x : (canvas.width - imgWidth) / 2
+        # y = position.y !== 0 ? position.y : (canvas.height - imgHeight) / 2
+        # Where imgWidth is the ORIGINAL width, not scaled
+        
+        # Calculate original dimensions in export space (with canvas scale only, no user scale)
+        export_original_width = int(original_width * canvas_scale_x)
+        export_original_height = int(original_height * canvas_scale_y)
+        # Zero position means center based on ORIGINAL dimensions (like preview)
+        center_x = int((width - export_original_width) / 2)
+        center_y = int((height - export_original_height) / 2)
+        
+        # Non-zero position: scale it to export resolution
+        overlay_x = int(pos_x * canvas_scale_x) if pos_x != 0 else center_x
+        overlay_y = int(pos_y * canvas_scale_y) if pos_y != 0 else center_y
+        
+        if 'position' in luts:
+            # Same rule as above: a zero coordinate centers the clip
+            frame_overlay_x = np.where(
+                frame_pos_x != 0, (frame_pos_x * canvas_scale_x).astype(np.int64), center_x
+            )
+            frame_overlay_y = np.where(
+                frame_pos_y != 0, (frame_pos_y * canvas_scale_y).astype(np.int64), center_y
+            )
+            overlay_x = int(frame_overlay_x[0])
+            overlay_y = int(frame_overlay_y[0])
+            # The fps filter holds each frame until the next one arrives, so
+            # filters after it get each frame's value as the following frame
+            # passes sendcmd
+            keyframe_commands[(f"{filter_id}_overlay", 'x')] = np.concatenate(([overlay_x], frame_overlay_x))
+            keyframe_commands[(f"{filter_id}_overlay", 'y')] = np.concatenate(([overlay_y], frame_overlay_y))
+
+        # Determine if this clip fills canvas exactly (for optimization)
+        is_full_canvas = (
+            overlay_x == 0 and overlay_y == 0
+            and scaled_clip_width == width and scaled_clip_height == height
+            and filter_id is None
+        )
+
+        # Apply rotation. rotate keeps the frame size it was configured
+        # with, so an animated scale has to follow it
+        if frame_rotation is not None:
+            frame_rad = np.radians(frame_rotation)
+            keyframe_commands[(f"{filter_id}_rotate", 'angle')] = frame_rad
+            # Corners uncovered at one angle may not be at the next, so
+            # they are painted rather than left as they were
+            rotate_filter = f"rotate@{filter_id}_rotate={frame_rad[0]}:c=black@0"
+        elif rotation in _QUARTER_TURN_FILTERS and 'scale' not in luts:
+            # Quarter turns move pixels without resampling. Like rotate, the
+            # turned frame is framed in the unturned box about its center:
+            # cropped where it overhangs, with the uncovered sides left clear
+            rotate_filter = _QUARTER_TURN_FILTERS[rotation]
+            if rotation != 180 and scaled_clip_width != scaled_clip_height:
+                side = min(scaled_clip_width, scaled_clip_height)
+                rotate_filter += (
+                    f",crop={side}:{side},format=yuva420p,"
+                    f"pad={scaled_clip_width}:{scaled_clip_height}:"
+                    f"{(scaled_clip_width - side) // 2}:{(scaled_clip_height - side) // 2}:color=black@0"
+                )
+        elif rotation != 0:
+            rad = rotation * 3.14159265359 / 180
+            rotate_filter = f"rotate={rad}:c=none"
+        else:
+            rotate_filter = None
+        if rotate_filter and 'scale' in luts:
+            filter_parts.insert(0, rotate_filter)
+        elif rotate_filter:
+            filter_parts.append(rotate_filter)
+
+
+        # A looped still input is decoded and resized again for every
+        # frame. A still image is instead decoded once, sized and turned,
+        # and that frame repeated for the clip's length at the output rate.
+        # Keyframed stills keep the looped input, as their filters have to
+        # see every frame
+        if (
+            clip_type == "image" and filter_id is None and clip_duration > 0
+            and media_path.suffix.lower() not in ('.gif', '.webp')
+        ):
+            input_args = ['-i', str(media_path)]
+            filter_parts.extend([
+                'loop=loop=-1:size=1', f'settb=1/{fps}', 'setpts=N', f'trim=duration={clip_duration}'
+            ])
+
+        # Track if we need alpha channel for wipe/slide transitions
+        needs_alpha_for_transition = False
+        wipe_slide_filters = []
+        
+        # Track slide transition position info (for animated overlay position)
+        slide_in_info = None
+        slide_out_info = None
+        
+        # Track zoom transitions (need to be combined into single filter)
+        zoom_in_duration = 0
+        zoom_in_direction = "in"
+        zoom_out_duration = 0
+        zoom_out_direction = "out"
+        
+        # Track wipe transitions (need to be combined into single filter)
+        wipe_in_duration = None
+        wipe_in_direction = None
+        wipe_out_duration = None
+        wipe_out_direction = None
+
+        # Apply transitions
+        if transitions:
+            # Handle both list format and dict format
+            if isinstance(transitions, list):
+                # List format: [{type: "fadeIn", duration: 0.5, position: "start"}, ...]
+                for trans in transitions:
+                    trans_type = trans.get("type", "").lower()
+                    trans_duration = trans.get("duration", 1.0)
+                    position = trans.get("position", "")
+                    
+                    if trans_type in ("fadein", "fade_in", "fade"):
+                        if position == "start" or not position:
+                            filter_parts.append(f"fade=t=in:st=0:d={trans_duration}")
+                    elif trans_type in ("fadeout", "fade_out"):
+                        fade_start = max(0, clip_duration - trans_duration)
+                        filter_parts.append(f"fade=t=out:st={fade_start}:d={trans_duration}")
+            elif isinstance(transitions, dict):
+                # Dict format: {in: {type, duration, properties}, out: {type, duration, properties}}
+                if transitions.get("in"):
+                    trans_in = transitions["in"]
+                    trans_type = trans_in.get("type", "").lower()
+                    trans_duration = trans_in.get("duration", 1.0)
+                    trans_props = trans_in.get("properties", {})
+                    direction = trans_props.get("direction", "left")
+                    
+                    if trans_type in ("fade", "dissolve"):
+                        filter_parts.append(f"fade=t=in:st=0:d={trans_duration}")
+                    elif trans_type == "wipe":
+                        # Wipe uses alpha animation (reveal effect)
+                        needs_alpha_for_transition = True
+                        wipe_in_duration = trans_duration
+                        wipe_in_direction = direction
+                    elif trans_type == "slide":
+                        # Slide uses position animation (push effect)
+                        slide_in_info = {
+                            'duration': trans_duration,
+                            'direction': direction
+                        }
+                    elif trans_type == "zoom":
+                        # Zoom transition - use direction property: "in" or "out"
+                        # Default to "in" for in-transition
+                        zoom_in_duration = trans_duration
+                        zoom_in_direction = trans_props.get("direction", "in")
+
+                if transitions.get("out"):
+                    trans_out = transitions["out"]
+                    trans_type = trans_out.get("type", "").lower()
+                    trans_duration = trans_out.get("duration", 1.0)
+                    trans_props = trans_out.get("properties", {})
+                    direction = trans_props.get("direction", "left")
+                    
+                    if trans_type in ("fade", "dissolve"):
+                        fade_start = max(0, clip_duration - trans_duration)
+                        filter_parts.append(f"fade=t=out:st={fade_start}:d={trans_duration}")
+                    elif trans_type == "wipe":
+                        # Wipe uses alpha animation (hide effect)
+                        needs_alpha_for_transition = True
+                        wipe_out_duration = trans_duration
+                        wipe_out_direction = direction
+                    elif trans_type == "slide":
+                        # Slide uses position animation (push effect)
+                        slide_out_info = {
+                            'duration': trans_duration,
+                            'direction': direction
+                        }
+                    elif trans_type == "zoom":
+                        # Zoom transition - use direction property: "in" or "out"
+                        # Default to "out" for out-transition
+                        zoom_out_duration = trans_duration
+                        zoom_out_direction = trans_props.get("direction", "out")
+
+        # Build combined wipe filter if we have any wipe transitions
+        if wipe_in_duration or wipe_out_duration:
+            combined_wipe_filter = self._build_combined_wipe_filter(
+                wipe_in_duration, wipe_in_direction,
+                wipe_out_duration, wipe_out_direction,
+                clip_duration, scaled_clip_width, scaled_clip_height, fps
+            )
+            wipe_slide_filters.append(combined_wipe_filter)
+
+        # Translucent clips scale their alpha once in the graph and are
+        # blended by the overlay; applied after the wipe, which sets alpha
+        if frame_opacity is not None:
+            # Sent a frame late, as it follows the fps filter (see position)
+            keyframe_commands[(f"{filter_id}_opacity", 'aa')] = np.concatenate(
+                ([frame_opacity[0]], frame_opacity)
+            )
+            wipe_slide_filters.append(f"colorchannelmixer@{filter_id}_opacity=aa={frame_opacity[0]}")
+        elif opacity < 1:
+            wipe_slide_filters.append(f"colorchannelmixer=aa={opacity}")
+        
+        # Build combined zoom filter if we have any zoom transitions
+        # Note: zoom filter already specifies output dimensions to maintain size
+        if zoom_in_duration > 0 or zoom_out_duration > 0:
+            zoom_filter = self._build_combined_zoom_filter(
+                zoom_in_duration, zoom_in_direction,
+                zoom_out_duration, zoom_out_direction,
+                clip_duration, scaled_clip_width, scaled_clip_height, fps
+            )
+            # The zoom scale sizes from the source directly, so a separate
+            # base resize would only add a second pass (unless rotate or
+            # keyframes need it)
+            if base_scale_filter and rotate_filter is None and 'scale' not in luts:
+                filter_parts.remove(base_scale_filter)
+            filter_parts.append(zoom_filter)
+
+        # Set fps and format
+        filter_parts.append(f"fps={fps}")
+
+        if keyframe_commands:
+            script_path = self._write_keyframe_commands(keyframe_commands, fps, temp_files)
+            escaped_path = script_path.replace('\\', '/').replace(':', '\\:')
+            filter_parts.insert(0, f"sendcmd=f={escaped_path}")
+        
+        # Check if this is an image that might have transparency (PNG)
+        is_transparent_image = clip_type == "image" and str(media_path).lower().endswith('.png')
+        
+        # A plain clip smaller than the canvas with nothing beneath it would
+        # only ever be seen against black, so pad it to the canvas here and
+        # skip the alpha intermediate
+        letterboxed = (
+            letterbox
+            and not is_full_canvas
+            and not is_transparent_image
+            and not transitions
+            and rotation == 0
+            and opacity == 1
+            and filter_id is None
+            and 0 <= overlay_x and overlay_x + scaled_clip_width <= width
+            and 0 <= overlay_y and overlay_y + scaled_clip_height <= height
+        )
+        if letterboxed:
+            filter_parts.append(f"pad={width}:{height}:{overlay_x}:{overlay_y}:black")
+            overlay_x = 0
+            overlay_y = 0
+            is_full_canvas = True
+        
+        # For clips that aren't full canvas, transparent images, or wipe/slide transitions,
+        # preserve alpha channel for proper compositing
+        needs_alpha = (
+            (not is_full_canvas) or is_transparent_image
+            or needs_alpha_for_transition or opacity < 1
+        )
+        
+        # A video that already fills the canvas at the export size and
+        # rate, untrimmed and without transitions, needs no filtering:
+        # the composite decodes it either way, so copy the stream
+        is_passthrough = (
+            clip_type == "video"
+            and trim_start == 0
+            and not transitions
+            and rotation == 0
+            and opacity == 1
+            and is_full_canvas
+            and not letterboxed
+            and (original_width, original_height) == (width, height)
+            and abs(media_info['fps'] - fps) < 0.01
+        )
+        
+        return {
+            'media_path': media_path,
+            'input_args': input_args,
+            'filters': filter_parts,
+            'alpha_filters': wipe_slide_filters,
+            'needs_alpha': needs_alpha,
+            'is_passthrough': is_passthrough,
+            'clip_info': {
+                'start_time': start_time,
+                'duration': clip_duration,
+                'overlay_x': overlay_x,
+                'overlay_y': overlay_y,
+                'is_full_canvas': is_full_canvas,
+                'layer_index': video_item['layer_index'],
+                'has_alpha': needs_alpha,
+                'slide_in': slide_in_info,
+                'slide_out': slide_out_info,
+                'clip_width': width if letterboxed else scaled_clip_width,
+                'clip_height': height if letterboxed else scaled_clip_height,
+                'canvas_width': width,
+                'canvas_height': height,
+                'fps': fps,
+                'source': source,
+                'filter_id': filter_id
+            }
+        }
+
+    @staticmethod
+    def _keyframe_lut_pair(
+        lut: np.ndarray, default_x: float, default_y: float
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Split a keyframe LUT into x and y values per frame.
+
+        Args:
+            lut: Values from _build_keyframe_luts, shape (N,) for a number
+                applied to both axes or (N, 2) for x and y
+            default_x: x value for frames the keyframes leave unset
+            default_y: y value for frames the keyframes leave unset
+
+        Returns:
+            (x values, y values), each shape (N,), in double precision so
+            pixel sizes and offsets derived from them round as before
+        """
+        lut = lut.astype(np.float64)
+        if lut.ndim == 1:
+            lut = np.column_stack((lut, lut))
+        return (
+            np.where(np.isnan(lut[:, 0]), default_x, lut[:, 0]),
+            np.where(np.isnan(lut[:, 1]), default_y, lut[:, 1])
+        )
+
+    def _write_keyframe_commands(
+        self, commands: Dict[Tuple[str, str], np.ndarray], fps: int, temp_files: List[str]
+    ) -> str:
+        """
+        Write per-frame filter values as an ffmpeg sendcmd script.
+
+        A command is only written on frames where its value changes, and is
+        sent half a frame early so it is in place when its frame arrives.
+
+        Args:
+            commands: (filter instance name, command) -> value at each frame
+            fps: Frames per second the values are indexed by
+            temp_files: List that the script path is appended to for cleanup
+
+        Returns:
+            Path of the script
+        """
+        frame_commands: Dict[int, List[str]] = {}
+        for (target, command), values in commands.items():
+            changed = np.flatnonzero(np.concatenate(([True], values[1:] != values[:-1])))
+            for frame in changed:
+                frame_commands.setdefault(int(frame), []).append(
+                    f"[enter] {target} {command} {values[frame]}"
+                )
+
+        script_path = str(self.temp_dir / f"keyframes_{uuid.uuid4()}.txt")
+        temp_files.append(script_path)
+        with open(script_path, 'w') as f:
+            for frame, entries in sorted(frame_commands.items()):
+                f.write(f"{max(0.0, (frame - 0.5) / fps):.6f} {', '.join(entries)};\n")
+        return script_path
+
+    @staticmethod
+    def _plan_filter_chain(plan: Dict) -> str:
+        """
+        Build a clip plan's complete video filter chain.
+
+        Args:
+            plan: Clip plan from _plan_video_clip or _plan_text_clip
+
+        Returns:
+            Comma-separated FFmpeg filter chain ending in the pixel format
+        """
+        if plan['needs_alpha']:
+            # Wipe alpha filters run after the conversion to RGBA
+            filters = plan['filters'] + ['format=rgba'] + plan['alpha_filters']
+        else:
+            filters = plan['filters'] + ['format=yuv420p']
+        return ','.join(filters)
+
+    def _process_video_clip(
+        self, index: int, video_item: Dict, width: int, height: int,
+        source_width: int, source_height: int, fps: int, temp_files: List[str],
+        letterbox: bool = False, threads: Optional[int] = None
+    ) -> Optional[Dict]:
+        """
+        Render one video or image clip to an intermediate file for compositing.
+
+        Args:
+            index: Position of the clip in the export, used in temp file names
+            video_item: Collected clip entry (clip, type, layer_index, muted)
+            width: Canvas width
+            height: Canvas height
+            source_width: Preview canvas width that positions are relative to
+            source_height: Preview canvas height that positions are relative to
+            fps: Output frames per second
+            temp_files: List that intermediate paths are appended to for cleanup
+            letterbox: Whether nothing is composited beneath the clip, so it
+                may be padded with black to the canvas instead of carrying alpha
+            threads: Decoder and encoder thread count for the clip's ffmpeg
+                run, or None for ffmpeg's automatic choice
+
+        Returns:
+            Processed clip entry for the composite stage, or None if the clip
+            was skipped or failed
+        """
+        plan = self._plan_video_clip(
+            video_item, width, height, source_width, source_height, fps,
+            letterbox=letterbox, threads=threads, temp_files=temp_files
+        )
+        if plan is None:
+            return None
+
+        input_args = plan['input_args']
+        is_passthrough = plan['is_passthrough']
+
+        # Create temp output for this clip
+        temp_output = str(self.temp_dir / f"clip_{index}_{uuid.uuid4()}.mp4")
+        temp_files.append(temp_output)
+
+        if is_passthrough:
+            # Keep the source container so the copied stream fits it
+            temp_output = str(Path(temp_output).with_suffix(plan['media_path'].suffix.lower()))
+            temp_files[-1] = temp_output
+            
+            cmd = ['ffmpeg', '-y']
+            cmd.extend(input_args)
+            cmd.extend(['-map', '0:v:0', '-c:v', 'copy', '-an'])
+            cmd.append(temp_output)
+        elif plan['needs_alpha']:
+            # Use output format that supports alpha
+            temp_output = temp_output.replace('.mp4', '.mov')
+            temp_files[-1] = temp_output  # Update the temp file reference
+            
+            # Build command with alpha support using qtrle codec
+            cmd = ['ffmpeg', '-y']
+            cmd.extend(input_args)
+            cmd.extend(['-vf', self._plan_filter_chain(plan)])
+            cmd.extend(['-c:v', 'qtrle'])  # QuickTime Animation codec for alpha support
+            cmd.extend(['-an'])
+            cmd.append(temp_output)
+        else:
+            # Build command
+            cmd = ['ffmpeg', '-y']
+            cmd.extend(input_args)
+            cmd.extend(['-vf', self._plan_filter_chain(plan)])
+            cmd.extend(self._video_codec_args(threads))
+            cmd.extend(['-an'])
+            cmd.append(temp_output)
+
+        result = subprocess.run(cmd, capture_output=True, text=True)
+        if result.returncode != 0 and is_passthrough:
+            # Stream copy can fail on odd sources; encode it instead
+            logger.warning(f"Stream copy failed for clip {index}, re-encoding: {result.stderr}")
+            temp_output = str(Path(temp_output).with_suffix('.mp4'))
+            temp_files.append(temp_output)
+            
+            cmd = ['ffmpeg', '-y']
+            cmd.extend(input_args)
+            cmd.extend(['-vf', self._plan_filter_chain(plan)])
+            cmd.extend(self._video_codec_args(threads))
+            cmd.extend(['-an'])
+            cmd.append(temp_output)
+            result = subprocess.run(cmd, capture_output=True, text=True)
+        
+        if result.returncode == 0:
+            return {'path': temp_output, **plan['clip_info']}
+        else:
+            logger.error(f"Error processing clip {index}: {result.stderr}")
+
+        return None
+
+    def _decode_audio(
+        self,
+        media_path: Path,
+        trim_start: float,
+        duration: float,
+        volume: float = 1.0
+    ) -> Optional[np.ndarray]:
+        """
+        Decode a stretch of a media file's audio to 16-bit stereo PCM.
+
+        The audio is read from ffmpeg's stdout at _MIX_SAMPLE_RATE, so mixing
+        needs no further decode or temporary file and AAC is only encoded at
+        the mux.
+
+        Args:
+            media_path: Path to the audio or video file
+            trim_start: Source time to start decoding at, in seconds
+            duration: Seconds to decode, or 0 to decode to the end
+            volume: Volume multiplier applied while decoding
+
+        Returns:
+            (N, 2) int16 samples, or None if ffmpeg failed
+        """
+        cmd = ['ffmpeg', '-y']
+        if trim_start > 0:
+            cmd.extend(['-ss', str(trim_start)])
+        cmd.extend(['-i', str(media_path)])
+        if duration > 0:
+            cmd.extend(['-t', str(duration)])
+
+        if volume != 1.0:
+            cmd.extend(['-af', f"volume={volume}"])
+
+        cmd.extend([
+            '-vn', '-f', 's16le', '-c:a', 'pcm_s16le',
+            '-ac', '2', '-ar', str(_MIX_SAMPLE_RATE),
+            'pipe:1'
+        ])
+
+        result = subprocess.run(cmd, capture_output=True)
+        if result.returncode != 0:
+            return None
+        # Whole stereo frames only
+        pcm = result.stdout[:len(result.stdout) // 4 * 4]
+        return np.frombuffer(pcm, dtype=np.int16).reshape(-1, 2)
+
+    def _process_audio_clip(self, index: int, audio_item: Dict) -> Optional[Dict]:
+        """
+        Trim and level one audio (or video-audio) clip into PCM samples.
+
+        The clip is decoded once to 16-bit stereo at _MIX_SAMPLE_RATE
+        (see _decode_audio).
+
+        Args:
+            index: Position of the clip in the export, used in log messages
+            audio_item: Collected clip entry (clip, type, layer_index)
+
+        Returns:
+            Processed audio entry (samples as an (N, 2) int16 array,
+            start_time, duration), or None if the clip was skipped or failed
+        """
+        clip_data = audio_item['clip']
+
+        resource_id = clip_data.get("resourceId")
+        if not resource_id:
+            return None
+
+        media_path = self._clip_media_path(audio_item)
+        if not media_path:
+            return None
+
+        start_time = clip_data.get("startTime", 0)
+        clip_duration = clip_data.get("duration", 0)
+        trim_start = clip_data.get("trimStart", 0)
+        volume = clip_data.get("volume", 1.0)
+
+        # Extract/process audio
+        try:
+            samples = self._decode_audio(media_path, trim_start, clip_duration, volume)
+            if samples is not None:
+                return {
+                    'samples': samples,
+                    'start_time': start_time,
+                    'duration': clip_duration
+                }
+        except Exception as e:
+            logger.warning(f"Error processing audio {index}: {e}")
+
+        return None
+
+    def _shared_audio_groups(self, audio_clips: List[Dict]) -> List[List[int]]:
+        """
+        Find audio clips that can be cut from one decode of their source.
+
+        Clips from the same file qualify when they follow each other in the
+        source with at most _MAX_SHARED_SOURCE_GAP between them, as after
+        splitting a clip, so decoding the stretch once costs no more than
+        decoding each clip on its own.
+
+        Args:
+            audio_clips: Collected audio entries (clip, type, layer_index)
+
+        Returns:
+            Lists of audio clip indices, ordered by source time, that share a
+            decode; every group has at least two clips
+        """
+        candidates: Dict[Path, List[int]] = {}
+        for idx, audio_item in enumerate(audio_clips):
+            clip_data = audio_item['clip']
+            resource_id = clip_data.get("resourceId")
+            # Clips decoded to the end of their source can't be cut out
+            if not resource_id or clip_data.get("duration", 0) <= 0:
+                continue
+            media_path = self._clip_media_path(audio_item)
+            if media_path:
+                candidates.setdefault(media_path, []).append(idx)
+
+        groups = []
+        for indices in candidates.values():
+            indices.sort(key=lambda idx: audio_clips[idx]['clip'].get("trimStart", 0))
+            group = [indices[0]]
+            group_end = 0.0
+            for idx in indices:
+                clip_data = audio_clips[idx]['clip']
+                trim_start = clip_data.get("trimStart", 0)
+                if idx != group[0]:
+                    if trim_start - group_end <= _MAX_SHARED_SOURCE_GAP:
+                        group.append(idx)
+                    else:
+                        if len(group) > 1:
+                            groups.append(group)
+                        group = [idx]
+                        group_end = 0.0
+                group_end = max(group_end, trim_start + clip_data["duration"])
+            if len(group) > 1:
+                groups.append(group)
+        return groups
+
+    def _process_audio_group(self, audio_clips: List[Dict], group: List[int]) -> List[Optional[Dict]]:
+        """
+        Decode the clips of a _shared_audio_groups group in one ffmpeg run.
+
+        The source stretch covering every clip is decoded once, then each
+        clip's samples are sliced out of it and leveled with NumPy.
+
+        Args:
+            audio_clips: Collected audio entries (clip, type, layer_index)
+            group: Indices of the clips in audio_clips that share a decode
+
+        Returns:
+            Processed audio entries in group order, None for failed clips
+        """
+        clips = [audio_clips[idx]['clip'] for idx in group]
+        media_path = self._clip_media_path(audio_clips[group[0]])
+        span_start = min(clip_data.get("trimStart", 0) for clip_data in clips)
+        span_end = max(clip_data.get("trimStart", 0) + clip_data["duration"] for clip_data in clips)
+
+        try:
+            source_samples = self._decode_audio(media_path, span_start, span_end - span_start)
+        except Exception as e:
+            logger.warning(f"Error processing audio {group}: {e}")
+            source_samples = None
+        if source_samples is None:
+            return [None] * len(group)
+
+        processed = []
+        for clip_data in clips:
+            offset = int(round((clip_data.get("trimStart", 0) - span_start) * _MIX_SAMPLE_RATE))
+            length = int(round(clip_data["duration"] * _MIX_SAMPLE_RATE))
+            samples = source_samples[offset:offset + length]
+            volume = clip_data.get("volume", 1.0)
+            if volume != 1.0:
+                # float32 holds every scaled 16-bit sample exactly enough to
+                # round, at half the intermediate of numpy's float64 default
+                scaled = np.multiply(samples, np.float32(volume), dtype=np.float32)
+                np.rint(scaled, out=scaled)
+                np.clip(scaled, -32768, 32767, out=scaled)
+                samples = scaled.astype(np.int16)
+            processed.append({
+                'samples': samples,
+                'start_time': clip_data.get("startTime", 0),
+                'duration': clip_data["duration"]
+            })
+        return processed
+
+    def _process_audio_clips(self, audio_clips: List[Dict], executor: ThreadPoolExecutor) -> List[Dict]:
+        """
+        Decode every audio clip to PCM samples for mixing.
+
+        Clips split from one stretch of a source share a single decode
+        (_process_audio_group); the rest are decoded on their own. The decodes
+        run on the executor.
+
+        Args:
+            audio_clips: Collected audio entries (clip, type, layer_index)
+            executor: Executor that runs the decodes
+
+        Returns:
+            Processed audio entries, in audio_clips order, without the clips
+            that were skipped or failed
+        """
+        groups = self._shared_audio_groups(audio_clips)
+        grouped = {idx for group in groups for idx in group}
+        singles = [[idx] for idx in range(len(audio_clips)) if idx not in grouped]
+
+        results: List[Optional[Dict]] = [None] * len(audio_clips)
+        for group, processed in zip(
+            groups + singles,
+            executor.map(
+                lambda group: (
+                    self._process_audio_group(audio_clips, group) if len(group) > 1
+                    else [self._process_audio_clip(group[0], audio_clips[group[0]])]
+                ),
+                groups + singles
+            )
+        ):
+            for idx, result in zip(group, processed):
+                results[idx] = result
+        return [result for result in results if result is not None]
+
+    def _mix_audio_clips(self, audio_clips: List[Dict], output_path: str) -> None:
+        """
+        Mix processed audio clips into one 16-bit stereo WAV file.
+
+        Each clip is added into a preallocated buffer at its timeline offset
+        in a single vectorized pass, then scaled by 1/N like ffmpeg's amix.
+        A single clip needs no mixing and is written as it was decoded,
+        after silence up to its offset.
+
+        Args:
+            audio_clips: Processed audio entries (samples, start_time) holding
+                (N, 2) int16 samples at _MIX_SAMPLE_RATE
+            output_path: Path for the mixed WAV file
+        """
+        tracks = [
+            (int(round(audio_info['start_time'] * _MIX_SAMPLE_RATE)), audio_info['samples'])
+            for audio_info in audio_clips
+        ]
+
+        with wave.open(output_path, 'wb') as wav_file:
+            wav_file.setnchannels(2)
+            wav_file.setsampwidth(2)
+            wav_file.setframerate(_MIX_SAMPLE_RATE)
+
+            # wave writes any contiguous buffer, so the samples are handed
+            # over as they are rather than copied into bytes first
+            if len(tracks) == 1:
+                offset, samples = tracks[0]
+                wav_file.writeframes(bytes(offset * 4))
+                wav_file.writeframes(np.ascontiguousarray(samples))
+                return
+
+            total_frames = max(offset + len(samples) for offset, samples in tracks)
+            mix = np.zeros((total_frames, 2), dtype=np.int32)
+            for offset, samples in tracks:
+                mix[offset:offset + len(samples)] += samples
+            mix //= len(tracks)
+            wav_file.writeframes(mix.astype(np.int16))
+
+    def _plan_text_clip(
+        self, text_item: Dict, width: int, height: int,
+        source_width: int, source_height: int, fps: int, temp_files: List[str]
+    ) -> Optional[Dict]:
+        """
+        Render one text clip's image and work out how it is filtered and placed.
+
+        Args:
+            text_item: Collected clip entry (clip, layer_index)
+            width: Canvas width
+            height: Canvas height
+            source_width: Preview canvas width that positions are relative to
+            source_height: Preview canvas height that positions are relative to
+            fps: Output frames per second
+            temp_files: List that the text image path is appended to for cleanup
+
+        Returns:
+            Clip plan in the _plan_video_clip format, or None if the text
+            could not be rendered
+        """
+        clip_data = text_item['clip']
+        data = clip_data.get("data", {})
+        start_time = clip_data.get("startTime", 0)
+        clip_duration = clip_data.get("duration", 5)
+
+        text_content = data.get("text", "")
+        # Blank text draws nothing, so it is left out of the composite
+        # rather than blended in as a transparent image
+        if not text_content.strip():
+            logger.info("Skipping empty text clip at %ss", start_time)
+            return None
+
+        font_family = data.get("fontFamily", "Arial")
+        font_size = data.get("fontSize", 50)
+        color = data.get("color", "white")
+        
+        # Get text scale from clip data (like video/image clips)
+        user_scale = clip_data.get("scale", 1)
+        if isinstance(user_scale, dict):
+            user_scale_x = user_scale.get("x", 1)
+            user_scale_y = user_scale.get("y", 1)
+        else:
+            user_scale_x = user_scale
+            user_scale_y = user_scale
+        
+        # Get text position from clip data
+        text_position = clip_data.get("position", {})
+        text_pos_x = text_position.get("x", 0) if text_position else 0
+        text_pos_y = text_position.get("y", 0) if text_position else 0
+
+        # Scale font and position for export
+        canvas_scale_x = width / source_width if source_width > 0 else 1.0
+        canvas_scale_y = height / source_height if source_height > 0 else 1.0
+        
+        # Apply both canvas scale AND user scale to font size
+        # User scale_y affects the height/fontSize
+        final_scale_y = canvas_scale_y * user_scale_y
+        scaled_font_size = int(font_size * final_scale_y)
+        
+        # Scale position for export (if position is provided)
+        # IMPORTANT: Preview centers text at canvas center (width/2, height/2) when pos is 0
+        # Frontend logic: x = position.x !== 0 ? position.x : canvasWidth / 2
+        if text_pos_x != 0:
+            scaled_pos_x = int(text_pos_x * canvas_scale_x)
+        else:
+            # Center at canvas center, not based on text dimensions
+            scaled_pos_x = width // 2
+        
+        if text_pos_y != 0:
+            scaled_pos_y = int(text_pos_y * canvas_scale_y)
+        else:
+            # Center at canvas center, not based on text dimensions
+            scaled_pos_y = height // 2
+
+        # Check for transitions
+        transitions = clip_data.get("transitions", {}) or {}
+        has_zoom = any(
+            transitions.get(key) and transitions[key].get("type") == "zoom"
+            for key in ("in", "out")
+        )
+
+        # Create text overlay image with text at the correct position. Zoom
+        # scales about the canvas center, so only unzoomed text is cropped to
+        # its bounds; the overlay then blends just that region per frame
+        text_image = self._create_text_image(
+            text_content, scaled_font_size, color, font_family, 
+            width, height, scaled_pos_x, scaled_pos_y, crop=not has_zoom,
+            rotation=clip_data.get("rotation") or 0
+        )
+
+        if not text_image:
+            return None
+
+        text_image_path, overlay_x, overlay_y = text_image
+        temp_files.append(text_image_path)
+
+        # Track zoom transitions (need to be combined into single filter)
+        zoom_in_duration = 0
+        zoom_in_direction = "in"
+        zoom_out_duration = 0
+        zoom_out_direction = "out"
+
+        # Build video filter chain. The text image is decoded once and its
+        # frame repeated for the clip's length (as for still image clips),
+        # rather than looping the input, which decodes it for every frame
+        input_args = ['-loop', '1', '-t', str(clip_duration), '-i', text_image_path]
+        filter_parts = []
+        if clip_duration > 0:
+            input_args = ['-i', text_image_path]
+            filter_parts.extend([
+                'loop=loop=-1:size=1', f'settb=1/{fps}', 'setpts=N', f'trim=duration={clip_duration}'
+            ])
+
+        # Collect zoom transition info
+        if transitions:
+            if transitions.get("in"):
+                trans_in = transitions["in"]
+                if trans_in.get("type") == "zoom":
+                    trans_duration = trans_in.get("duration", 1.0)
+                    trans_props = trans_in.get("properties", {})
+                    zoom_in_direction = trans_props.get("direction", "in")
+                    if zoom_in_direction in ["in", "out"]:
+                        zoom_in_duration = trans_duration
+
+            if transitions.get("out"):
+                trans_out = transitions["out"]
+                if trans_out.get("type") == "zoom":
+                    trans_duration = trans_out.get("duration", 1.0)
+                    trans_props = trans_out.get("properties", {})
+                    zoom_out_direction = trans_props.get("direction", "out")
+                    if zoom_out_direction in ["in", "out"]:
+                        zoom_out_duration = trans_duration
+
+        # Build combined zoom filter if we have any zoom transitions
+        if zoom_in_duration > 0 or zoom_out_duration > 0:
+            zoom_filter = self._build_combined_zoom_filter(
+                zoom_in_duration, zoom_in_direction,
+                zoom_out_duration, zoom_out_direction,
+                clip_duration, width, height, fps
+            )
+            filter_parts.append(zoom_filter)
+
+        # Always add fps filter
+        filter_parts.append(f'fps={fps}')
+
+        return {
+            'media_path': Path(text_image_path),
+            'input_args': input_args,
+            'filters': filter_parts,
+            'alpha_filters': [],
+            'needs_alpha': True,
+            'is_passthrough': False,
+            'clip_info': {
+                'start_time': start_time,
+                'duration': clip_duration,
+                'overlay_x': overlay_x,
+                'overlay_y': overlay_y,
+                'is_overlay': True,
+                'is_full_canvas': has_zoom,  # Full canvas with text at position
+                'has_alpha': True,
+                'layer_index': text_item['layer_index']
+            }
+        }
+
+    def _process_text_clip(
+        self, index: int, text_item: Dict, width: int, height: int,
+        source_width: int, source_height: int, fps: int, temp_files: List[str]
+    ) -> Optional[Dict]:
+        """
+        Render one text clip to a transparent overlay video.
+
+        Args:
+            index: Position of the clip in the export, used in temp file names
+            text_item: Collected clip entry (clip, layer_index)
+            width: Canvas width
+            height: Canvas height
+            source_width: Preview canvas width that positions are relative to
+            source_height: Preview canvas height that positions are relative to
+            fps: Output frames per second
+            temp_files: List that intermediate paths are appended to for cleanup
+
+        Returns:
+            Processed overlay entry for the composite stage, or None if the
+            text could not be rendered
+        """
+        plan = self._plan_text_clip(
+            text_item, width, height, source_width, source_height, fps, temp_files
+        )
+        if plan is None:
+            return None
+
+        temp_text_video = str(self.temp_dir / f"text_{index}_{uuid.uuid4()}.mov")
+        temp_files.append(temp_text_video)
+
+        # Convert text image to video with alpha support
+        # Use qtrle codec which properly supports RGBA
+        cmd = ['ffmpeg', '-y']
+        cmd.extend(plan['input_args'])
+        cmd.extend([
+            '-vf', ','.join(plan['filters']),
+            '-c:v', 'qtrle',
+            temp_text_video
+        ])
+
+        result = subprocess.run(cmd, capture_output=True, text=True)
+        if result.returncode == 0:
+            return {'path': temp_text_video, **plan['clip_info']}
+        else:
+            logger.warning(f"Text video creation error: {result.stderr}")
+
+        return None
+
+    def _build_overlay_filter(
+        self, clip_info: Dict, base_label: str, input_label: str, out_label: str,
+        width: int, height: int, fps: int
+    ) -> str:
+        """
+        Build the filter that overlays one processed clip onto the canvas.
+
+        The clip is shifted to its timeline start with setpts and placed at
+        its (possibly slide-animated) position; eof_action=pass keeps the
+        base showing once the clip ends.
+
+        Args:
+            clip_info: Processed clip entry (path, timing, position, slide info)
+            base_label: Filter label of the canvas to draw onto, e.g. "[0:v]"
+            input_label: Filter label of the clip's video, e.g. "[1:v]"
+            out_label: Filter label for the result, e.g. "[out]"
+            width: Canvas width
+            height: Canvas height
+            fps: Output frames per second
+
+        Returns:
+            FFmpeg filter_complex fragment ending in out_label
+        """
+        start_time = clip_info['start_time']
+        clip_dur = clip_info['duration']
+        ov_label = f"ov{out_label.strip('[]')}"
+        # Named so keyframe commands can move it
+        overlay = f"overlay@{clip_info['filter_id']}_overlay" if clip_info.get('filter_id') else "overlay"
+
+        # Get overlay position (default to 0,0 for full canvas clips)
+        overlay_x = clip_info.get('overlay_x', 0)
+        overlay_y = clip_info.get('overlay_y', 0)
+        is_full_canvas = clip_info.get('is_full_canvas', False)
+        has_alpha = clip_info.get('has_alpha', False)
+        
+        # Get slide transition info
+        slide_in = clip_info.get('slide_in')
+        slide_out = clip_info.get('slide_out')
+        clip_width = clip_info.get('clip_width', width)
+        clip_height = clip_info.get('clip_height', height)
+        canvas_w = clip_info.get('canvas_width', width)
+        canvas_h = clip_info.get('canvas_height', height)
+        clip_fps = clip_info.get('fps', fps)
+
+        # Use overlay filter with timing handled via setpts
+        # The overlay input needs to be time-shifted to start at the correct time
+        # We use setpts to delay the overlay video's timestamps
+        # and eof_action=pass to continue the background when overlay ends
+        
+        # Build overlay filter:
+        # 1. Use setpts=PTS+{start_time}/TB on overlay input to shift its timeline
+        # 2. Use eof_action=pass so background continues after overlay ends
+        # 3. Use shortest=0 to not stop when overlay ends
+        pts_offset = start_time
+        
+        # Calculate animated position expressions for slide transitions
+        x_expr = str(overlay_x)
+        y_expr = str(overlay_y)
+        has_slide = slide_in is not None or slide_out is not None
+        
+        if has_slide:
+            # Build position expression that combines slide_in and slide_out
+            total_frames = max(1, int(clip_dur * clip_fps))
+            
+            if slide_in and slide_out:
+                # Both slide in and slide out
+                in_dur = slide_in['duration']
+                in_dir = slide_in['direction']
+                out_dur = slide_out['duration']
+                out_dir = slide_out['direction']
+                in_frames = max(1, int(in_dur * clip_fps))
+                out_start = max(0, total_frames - max(1, int(out_dur * clip_fps)))
+                out_frames = max(1, int(out_dur * clip_fps))
+                
+                # X position expression
+                if in_dir in ('left', 'right') or out_dir in ('left', 'right'):
+                    in_x_start = canvas_w if in_dir == 'left' else -clip_width if in_dir == 'right' else overlay_x
+                    out_x_end = -clip_width if out_dir == 'left' else canvas_w if out_dir == 'right' else overlay_x
+                    
+                    if in_dir in ('left', 'right'):
+                        # Slide in x movement
+                        in_x_progress = f"min(n/{in_frames},1)"
+                        in_x_expr = f"({in_x_start}+{in_x_progress}*{overlay_x - in_x_start})"
+                    else:
+                        in_x_expr = str(overlay_x)
+                    
+                    if out_dir in ('left', 'right'):
+                        # Slide out x movement
+                        out_x_progress = f"max(0,(n-{out_start})/{out_frames})"
+                        out_x_expr = f"({overlay_x}+{out_x_progress}*{out_x_end - overlay_x})"
+                    else:
+                        out_x_expr = str(overlay_x)
+                    
+                    x_expr = f"if(lt(n,{in_frames}),{in_x_expr},if(lt(n,{out_start}),{overlay_x},{out_x_expr}))"
+                
+                # Y position expression
+                if in_dir in ('up', 'down') or out_dir in ('up', 'down'):
+                    in_y_start = canvas_h if in_dir == 'up' else -clip_height if in_dir == 'down' else overlay_y
+                    out_y_end = -clip_height if out_dir == 'up' else canvas_h if out_dir == 'down' else overlay_y
+                    
+                    if in_dir in ('up', 'down'):
+                        in_y_progress = f"min(n/{in_frames},1)"
+                        in_y_expr = f"({in_y_start}+{in_y_progress}*{overlay_y - in_y_start})"
+                    else:
+                        in_y_expr = str(overlay_y)
+                    
+                    if out_dir in ('up', 'down'):
+                        out_y_progress = f"max(0,(n-{out_start})/{out_frames})"
+                        out_y_expr = f"({overlay_y}+{out_y_progress}*{out_y_end - overlay_y})"
+                    else:
+                        out_y_expr = str(overlay_y)
+                    
+                    y_expr = f"if(lt(n,{in_frames}),{in_y_expr},if(lt(n,{out_start}),{overlay_y},{out_y_expr}))"
+                    
+            elif slide_in:
+                # Only slide in
+                in_dur = slide_in['duration']
+                in_dir = slide_in['direction']
+                in_frames = max(1, int(in_dur * clip_fps))
+                
+                if in_dir == 'left':
+                    # Enter from right
+                    x_expr = f"if(lt(n,{in_frames}),{canvas_w}-n*{(canvas_w - overlay_x) / in_frames},{overlay_x})"
+                elif in_dir == 'right':
+                    # Enter from left
+                    x_expr = f"if(lt(n,{in_frames}),(0-{clip_width})+n*{clip_width / in_frames},{overlay_x})"
+                elif in_dir == 'up':
+                    # Enter from bottom
+                    y_expr = f"if(lt(n,{in_frames}),{canvas_h}-n*{(canvas_h - overlay_y) / in_frames},{overlay_y})"
+                elif in_dir == 'down':
+                    # Enter from top
+                    y_expr = f"if(lt(n,{in_frames}),(0-{clip_height})+n*{clip_height / in_frames},{overlay_y})"
+                    
+            elif slide_out:
+                # Only slide out
+                out_dur = slide_out['duration']
+                out_dir = slide_out['direction']
+                out_frames = max(1, int(out_dur * clip_fps))
+                out_start = max(0, total_frames - out_frames)
+                
+                if out_dir == 'left':
+                    # Exit to left
+                    x_expr = f"if(lt(n,{out_start}),{overlay_x},{overlay_x}-(n-{out_start})*{clip_width / out_frames})"
+                elif out_dir == 'right':
+                    # Exit to right
+                    x_expr = f"if(lt(n,{out_start}),{overlay_x},{overlay_x}+(n-{out_start})*{(canvas_w - overlay_x) / out_frames})"
+                elif out_dir == 'up':
+                    # Exit to top
+                    y_expr = f"if(lt(n,{out_start}),{overlay_y},{overlay_y}-(n-{out_start})*{clip_height / out_frames})"
+                elif out_dir == 'down':
+                    # Exit to bottom
+                    y_expr = f"if(lt(n,{out_start}),{overlay_y},{overlay_y}+(n-{out_start})*{(canvas_h - overlay_y) / out_frames})"
+        
+        # Build overlay filter - use format=auto for alpha support. The
+        # output keeps the base's canvas size, so clips reaching past the
+        # canvas edges are clipped by the overlay itself
+        if is_full_canvas and overlay_x == 0 and overlay_y == 0 and not has_alpha and not has_slide:
+            overlay_filter = f"{input_label}setpts=PTS+{pts_offset}/TB[{ov_label}];{base_label}[{ov_label}]{overlay}=0:0:eof_action=pass{out_label}"
+        elif has_slide:
+            # Use expression-based overlay for animated positions
+            overlay_filter = f"{input_label}setpts=PTS+{pts_offset}/TB[{ov_label}];{base_label}[{ov_label}]{overlay}=x='{x_expr}':y='{y_expr}':format=auto:eof_action=pass{out_label}"
+        else:
+            # For clips with alpha or custom position, use format=auto to handle transparency
+            overlay_filter = f"{input_label}setpts=PTS+{pts_offset}/TB[{ov_label}];{base_label}[{ov_label}]{overlay}={overlay_x}:{overlay_y}:format=auto:eof_action=pass{out_label}"
+
+        return overlay_filter
+
+    def _composite_sequentially(
+        self, processed_video_paths: List[Dict], temp_files: List[str],
+        width: int, height: int, fps: int, duration: float
+    ) -> str:
+        """
+        Overlay processed clips onto a black canvas one ffmpeg run at a time.
+
+        Fallback for when the single-pass composite fails; a clip whose
+        overlay fails is skipped instead of failing the whole export.
+
+        Args:
+            processed_video_paths: Processed clip entries, in overlay order
+            temp_files: List that intermediate paths are appended to for cleanup
+            width: Canvas width
+            height: Canvas height
+            fps: Output frames per second
+            duration: Output duration in seconds
+
+        Returns:
+            Path to the composited video
+        """
+        # The black background is generated inside the first overlay run
+        # instead of being encoded to a file and decoded again
+        canvas_args = ['-f', 'lavfi', '-i', f'color=c=black:s={width}x{height}:d={duration}:r={fps}']
+        current_input = canvas_args
+        current_output = None
+        for idx, clip_info in enumerate(processed_video_paths):
+            temp_overlay = str(self.temp_dir / f"overlay_{idx}_{uuid.uuid4()}.mp4")
+            temp_files.append(temp_overlay)
+
+            overlay_filter = self._build_overlay_filter(
+                clip_info, "[0:v]", "[1:v]", "[out]", width, height, fps
+            )
+
+            cmd = [
+                'ffmpeg', '-y',
+                *current_input,
+                '-i', clip_info['path'],
+                '-filter_complex', overlay_filter,
+                '-map', '[out]',
+                *self._video_codec_args(),
+                '-pix_fmt', 'yuv420p',
+                '-t', str(duration),
+                temp_overlay
+            ]
+
+            result = subprocess.run(cmd, capture_output=True, text=True)
+            if result.returncode == 0:
+                current_output = temp_overlay
+                current_input = ['-i', temp_overlay]
+            else:
+                logger.warning(f"Overlay error for clip {idx}: {result.stderr}")
+
+        if current_output is None:
+            # No clip could be overlaid, so the background alone is the video
+            current_output = str(self.temp_dir / f"bg_{uuid.uuid4()}.mp4")
+            temp_files.append(current_output)
+            cmd = [
+                'ffmpeg', '-y',
+                *canvas_args,
+                *self._video_codec_args(),
+                '-pix_fmt', 'yuv420p',
+                current_output
+            ]
+            subprocess.run(cmd, capture_output=True)
+
+        return current_output
+
+    def export_timeline(
+        self,
+        timeline_data: Dict,
+        output_path: str,
+        resolution: str = "1080p",
+        fps: int = 30,
+        progress_callback: Optional[Callable[[float], None]] = None,
+        width: Optional[int] = None,
+        height: Optional[int] = None,
+        fragmented: bool = False,
+        segment: bool = False,
+        segment_duration: float = 2.0
+    ) -> str:
+        """
+        Export timeline to final video file using FFmpeg.
+
+        Args:
+            timeline_data: Timeline JSON with layers and clips
+            output_path: Path for output video file
+            resolution: Resolution preset (1080p, 720p, 480p) - fallback
+            fps: Frames per second for output video
+            progress_callback: Optional callback for progress updates
+            width: Optional explicit width
+            height: Optional explicit height
+            fragmented: Write a fragmented MP4 that can be played while it
+                downloads, instead of moving the moov atom to the front
+                (faststart) after the mux
+            segment: Write an HLS playlist with fMP4 segments named after
+                output_path instead of a single MP4, so playback can start
+                while the export is still encoding
+            segment_duration: Target HLS segment length in seconds
+
+        Returns:
+            Path to exported video file, or to the HLS playlist when segmenting
+        """
+        logger.info(f"Starting export: {width}x{height} @ {fps}fps")
+
+        try:
+            if progress_callback:
+                progress_callback(0.0)
+
+            # Get resolution dimensions
+            if not (width and height):
+                if timeline_data.get("resolution"):
+                    timeline_res = timeline_data["resolution"]
+                    width = timeline_res.get("width", 1080)
+                    height = timeline_res.get("height", 1920)
+                else:
+                    width, height = self.resolutions.get(resolution, (1920, 1080))
+
+            # Get source resolution for scaling positions
+            source_res = timeline_data.get("sourceResolution", {})
+            source_width = source_res.get("width", width)
+            source_height = source_res.get("height", height)
+
+            layers = timeline_data.get("layers", [])
+
+            # Calculate content duration
+            content_duration = self._calculate_content_duration(layers)
+            timeline_duration = timeline_data.get("duration", 0)
+            duration = content_duration if content_duration > 0 else timeline_duration
+
+            if duration <= 0:
+                raise Exception("No content to export: timeline has no clips")
+
+            if progress_callback:
+                progress_callback(0.1)
+
+            resolved_paths = self._prefetch_media_info(layers)
+
+            def find_clip_media(clip: Dict) -> Optional[Path]:
+                clip_data = clip.get("data", {})
+                key = (clip.get("resourceId", "unknown"), clip_data.get("url", "") if clip_data else "")
+                if key in resolved_paths:
+                    return resolved_paths[key]
+                return self._find_media_file(key[0], clip_data)
+
+            # Collect all clips
+            video_clips = []
+            audio_clips = []
+            text_clips = []
+            layer_index = 0
+
+            # Layers are walked in order and each layer's clips by start
+            # time, so the collected clips are already in composite order
             for layer in layers:
                 layer_type = layer.get("type", "video")
-                clips = layer.get("clips", [])
+                clips = sorted(layer.get("clips", []), key=lambda clip: clip.get("startTime", 0))
                 visible = layer.get("visible", True)
                 muted = layer.get("muted", False)
 
@@ -825,38 +3006,39 @@ class ExportService:
 
                 if layer_type == "video":
                     for clip in clips:
-                        resource_id = clip.get("resourceId", "unknown")
                         clip_data = clip.get("data", {})
                         actual_clip_type = clip_data.get("type", None)
+                        media_path = find_clip_media(clip)
 
                         # Detect type from file extension if not set
                         if actual_clip_type is None:
-                            media_path = self._find_media_file(resource_id, clip_data)
-                            if media_path:
-                                ext = media_path.suffix.lower()
-                                actual_clip_type = "image" if ext in ['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp', '.svg'] else "video"
+                            if media_path and media_path.suffix.lower() in _IMAGE_EXTENSIONS:
+                                actual_clip_type = "image"
                             else:
                                 actual_clip_type = "video"
 
+                        # The file and its probe are looked up once here and
+                        # carried with the clip to planning and audio decoding
+                        media_info = self._get_media_info(str(media_path)) if media_path else None
                         video_clips.append({
                             'clip': clip,
                             'type': actual_clip_type,
                             'layer_index': layer_index,
-                            'muted': muted
+                            'muted': muted,
+                            'media_path': media_path,
+                            'media_info': media_info
                         })
 
                         # Extract audio from video clips if not muted
                         # Check if video has audio stream first
                         if not muted and actual_clip_type == "video":
-                            media_path_for_audio = self._find_media_file(resource_id, clip_data)
-                            if media_path_for_audio:
-                                media_info = self._get_media_info(str(media_path_for_audio))
-                                if media_info.get('has_audio', False):
-                                    audio_clips.append({
-                                        'clip': clip,
-                                        'type': 'video_audio',
-                                        'layer_index': layer_index
-                                    })
+                            if media_info and media_info.get('has_audio', False):
+                                audio_clips.append({
+                                    'clip': clip,
+                                    'type': 'video_audio',
+                                    'layer_index': layer_index,
+                                    'media_path': media_path
+                                })
 
                 elif layer_type == "image":
                     for clip in clips:
@@ -864,7 +3046,8 @@ class ExportService:
                             'clip': clip,
                             'type': 'image',
                             'layer_index': layer_index,
-                            'muted': True
+                            'muted': True,
+                            'media_path': find_clip_media(clip)
                         })
 
                 elif layer_type == "audio":
@@ -873,7 +3056,8 @@ class ExportService:
                             audio_clips.append({
                                 'clip': clip,
                                 'type': 'audio',
-                                'layer_index': layer_index
+                                'layer_index': layer_index,
+                                'media_path': find_clip_media(clip)
                             })
 
                 elif layer_type == "text":
@@ -890,794 +3074,690 @@ class ExportService:
             if progress_callback:
                 progress_callback(0.3)
 
-            # Sort video clips by layer then start time
-            video_clips.sort(key=lambda x: (x['layer_index'], x['clip'].get('startTime', 0)))
-
             # Build FFmpeg command using complex filter
             full_output_path = str(self.output_dir / output_path)
+            if segment:
+                full_output_path = str(Path(full_output_path).with_suffix('.m3u8'))
+            output_args = self._output_args(full_output_path, fragmented, segment, segment_duration)
             temp_files = []
 
             try:
-                # Process each clip individually and create intermediate files
-                processed_video_paths = []
-                processed_audio_paths = []
+                # Ensure width and height are valid integers for text processing
+                final_width: int = width if width is not None else 1920
+                final_height: int = height if height is not None else 1080
 
-                for i, video_item in enumerate(video_clips):
-                    clip_data = video_item['clip']
-                    clip_type = video_item['type']
+                # Segments can only be cut at keyframes
+                keyframe_args = (
+                    ['-force_key_frames', f'expr:gte(t,n_forced*{segment_duration})']
+                    if segment else []
+                )
+
+                # Clips are prepared concurrently; map keeps results in input order.
+                # All work is queued up front, so clip planning (text
+                # rendering, probes) overlaps the audio decodes and the mix
+                # instead of waiting for them
+                with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                    # Render straight from the source media: each clip's filter
+                    # chain feeds the overlay graph of a single ffmpeg run, so
+                    # frames are decoded and encoded once, with no intermediates
+                    video_plans = executor.map(
+                        lambda item: self._plan_video_clip(
+                            item, width, height, source_width, source_height, fps,
+                            temp_files=temp_files
+                        ),
+                        video_clips
+                    )
+                    text_plans = executor.map(
+                        lambda item: self._plan_text_clip(
+                            item, final_width, final_height,
+                            source_width, source_height, fps, temp_files
+                        ),
+                        text_clips
+                    )
 
-                    resource_id = clip_data.get("resourceId")
-                    if not resource_id:
-                        continue
+                    # Mix the audio, so the composite can mux it in
+                    processed_audio = self._process_audio_clips(audio_clips, executor)
+
+                    mixed_audio_path = None
+                    if processed_audio:
+                        mixed_audio_path = str(self.temp_dir / f"mixed_audio_{uuid.uuid4()}.wav")
+                        temp_files.append(mixed_audio_path)
+                        self._mix_audio_clips(processed_audio, mixed_audio_path)
+
+                    if progress_callback:
+                        progress_callback(0.4)
+
+                    # Both lists are in layer then start time order, and a
+                    # layer holds only one kind of clip, so merging them by
+                    # layer index gives the composite order
+                    plans = list(heapq.merge(
+                        (plan for plan in video_plans if plan is not None),
+                        (plan for plan in text_plans if plan is not None),
+                        key=lambda plan: plan['clip_info']['layer_index']
+                    ))
+
+                rendered = False
+                if plans:
+                    composite_layers = [
+                        (plan['input_args'], self._plan_filter_chain(plan), plan['clip_info'])
+                        for plan in plans
+                    ]
+                    # Segmented output streams while it encodes, so it is
+                    # rendered in one run rather than joined at the end
+                    shard_count = 1 if segment else self._shard_count(composite_layers, duration)
+                    if shard_count > 1:
+                        rendered = self._render_shards(
+                            composite_layers, shard_count, width, height, fps, duration,
+                            mixed_audio_path, output_args, temp_files,
+                            progress_callback, progress_range=(0.4, 0.99)
+                        )
+                        if not rendered:
+                            logger.warning("Sharded render failed, rendering in a single run")
+                    if not rendered:
+                        cmd = self._build_composite_command(
+                            composite_layers, width, height, fps, duration,
+                            mixed_audio_path, keyframe_args + output_args
+                        )
+                        # The render is most of the export's wall time
+                        result = self._run_ffmpeg_with_progress(
+                            cmd, duration, progress_callback, progress_range=(0.4, 0.99)
+                        )
+                        rendered = result.returncode == 0
+                        if not rendered:
+                            logger.warning(f"Direct render failed, rendering clips to intermediate files: {result.stderr}")
+
+                final_video_path = None
+                if not rendered:
+                    # Process each clip individually and create intermediate
+                    # files. Concurrent clips split the cores instead of each
+                    # sizing its threads to all of them; the composite encode
+                    # then uses every core
+                    concurrent_clips = max(1, min(self.max_workers, len(video_clips)))
+                    clip_threads = max(1, (os.cpu_count() or 1) // concurrent_clips)
+                    # Text clips are queued alongside the video clips rather
+                    # than after them, so every layer's renders share the pool
+                    with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                        video_results = executor.map(
+                            lambda item: self._process_video_clip(
+                                item[0], item[1], width, height,
+                                source_width, source_height, fps, temp_files,
+                                letterbox=not self._has_clip_below(item[1], video_clips + text_clips),
+                                threads=clip_threads
+                            ),
+                            enumerate(video_clips)
+                        )
+                        text_results = executor.map(
+                            lambda item: self._process_text_clip(
+                                item[0], item[1], final_width, final_height,
+                                source_width, source_height, fps, temp_files
+                            ),
+                            enumerate(text_clips)
+                        )
+                        # Merged into composite order, as the plans are
+                        processed_video_paths = list(heapq.merge(
+                            (result for result in video_results if result is not None),
+                            (result for result in text_results if result is not None),
+                            key=lambda clip_info: clip_info['layer_index']
+                        ))
+
+                    if progress_callback:
+                        progress_callback(0.8)
+
+                    # Composite all clips
+                    if processed_video_paths:
+                        # Overlay every clip onto a generated black canvas in a
+                        # single ffmpeg run that writes the final output
+                        cmd = self._build_composite_command(
+                            [(['-i', clip_info['path']], None, clip_info) for clip_info in processed_video_paths],
+                            width, height, fps, duration, mixed_audio_path, keyframe_args + output_args
+                        )
+                        result = self._run_ffmpeg_with_progress(
+                            cmd, duration, progress_callback, progress_range=(0.8, 0.99)
+                        )
+                        if result.returncode != 0:
+                            logger.warning(f"Single-pass composite failed, overlaying clips one at a time: {result.stderr}")
+                            final_video_path = self._composite_sequentially(
+                                processed_video_paths, temp_files, width, height, fps, duration
+                            )
+                    else:
+                        # No video clips: the black canvas with the audio is
+                        # written straight to the output
+                        cmd = self._build_composite_command(
+                            [], width, height, fps, duration, mixed_audio_path, keyframe_args + output_args
+                        )
+                        subprocess.run(cmd, capture_output=True)
 
-                    media_path = self._find_media_file(resource_id, clip_data.get("data", {}))
-                    if not media_path:
-                        logger.warning(f"Media file not found: {resource_id}")
-                        continue
+                # Mux separately rendered video with the audio
+                if final_video_path and mixed_audio_path:
+                    cmd = [
+                        'ffmpeg', '-y',
+                        '-i', final_video_path,
+                        '-i', mixed_audio_path,
+                        '-c:v', 'copy',
+                        '-c:a', 'aac', '-b:a', '192k',
+                        '-shortest',
+                        *output_args
+                    ]
+                    subprocess.run(cmd, capture_output=True)
+                elif final_video_path:
+                    # No audio, remux the video so it gets the same movflags
+                    cmd = [
+                        'ffmpeg', '-y',
+                        '-i', final_video_path,
+                        '-c', 'copy',
+                        *output_args
+                    ]
+                    result = subprocess.run(cmd, capture_output=True)
+                    if result.returncode != 0 and not segment:
+                        shutil.copy(final_video_path, full_output_path)
 
-                    start_time = clip_data.get("startTime", 0)
-                    clip_duration = clip_data.get("duration", 0)
-                    trim_start = clip_data.get("trimStart", 0)
-                    trim_end = clip_data.get("trimEnd", 0)
-                    transitions = clip_data.get("transitions", {})
-
-                    # Get media info
-                    media_info = self._get_media_info(str(media_path))
-                    original_width = media_info.get('width') or width
-                    original_height = media_info.get('height') or height
-                    # Ensure we have valid numeric values
-                    if original_width is None or original_width == 0:
-                        original_width = width if width is not None else 1920
-                    if original_height is None or original_height == 0:
-                        original_height = height if height is not None else 1080
-
-                    # Create temp output for this clip
-                    temp_output = str(self.temp_dir / f"clip_{i}_{uuid.uuid4()}.mp4")
-                    temp_files.append(temp_output)
-
-                    # Get transform values
-                    user_scale = clip_data.get("scale", 1)
-                    if isinstance(user_scale, dict):
-                        user_scale_x = user_scale.get("x", 1)
-                        user_scale_y = user_scale.get("y", 1)
-                    else:
-                        user_scale_x = user_scale
-                        user_scale_y = user_scale
+                if progress_callback:
+                    progress_callback(1.0)
 
-                    position = clip_data.get("position", {})
-                    pos_x = position.get("x", 0) if position else 0
-                    pos_y = position.get("y", 0) if position else 0
-                    opacity = clip_data.get("opacity", 1)
-                    rotation = clip_data.get("rotation", 0)
+                logger.info(f"✅ Export completed: {full_output_path}")
+                return full_output_path
 
-                    # Build FFmpeg command using subprocess for more control
-                    filter_parts = []
+            finally:
+                # Cleanup temp files
+                for temp_file in temp_files:
+                    try:
+                        if os.path.exists(temp_file):
+                            os.unlink(temp_file)
+                    except OSError:
+                        pass
 
-                    # Input setup
-                    if clip_type == "image":
-                        input_args = ['-loop', '1', '-t', str(clip_duration), '-i', str(media_path)]
-                    else:
-                        input_args = []
-                        if trim_start > 0:
-                            input_args.extend(['-ss', str(trim_start)])
-                        input_args.extend(['-i', str(media_path)])
-                        if clip_duration > 0:
-                            media_duration = media_info['duration'] - trim_start - trim_end
-                            actual_duration = min(clip_duration, media_duration) if media_duration > 0 else clip_duration
-                            input_args.extend(['-t', str(actual_duration)])
-
-                    # Build video filter
-                    # For compositing, we need to:
-                    # 1. Scale to the intended size based on user scale and canvas ratio
-                    # 2. Keep track of position for overlay
-                    # 3. Crop will be applied at composite stage to show only visible part
-                    overlay_x = 0
-                    overlay_y = 0
-                    
-                    # Calculate canvas scale factors (export resolution vs preview resolution)
-                    canvas_scale_x = width / source_width if source_width > 0 else 1.0
-                    canvas_scale_y = height / source_height if source_height > 0 else 1.0
-                    
-                    # Apply user scale on top of canvas scale
-                    final_scale_x = user_scale_x * canvas_scale_x
-                    final_scale_y = user_scale_y * canvas_scale_y
-                    
-                    # Calculate scaled dimensions
-                    scaled_clip_width = int(original_width * final_scale_x)
-                    scaled_clip_height = int(original_height * final_scale_y)
-                    
-                    # Ensure minimum size
-                    scaled_clip_width = max(scaled_clip_width, 2)
-                    scaled_clip_height = max(scaled_clip_height, 2)
-                    
-                    filter_parts.append(f"scale={scaled_clip_width}:{scaled_clip_height}")
-                    
-                    # Calculate overlay position
-                    # IMPORTANT: Preview centers based on ORIGINAL dimensions (before user scale),
-                    # not the scaled dimensions. This ensures consistent positioning.
-                    # Frontend logic: if position is (0,0), center the clip
-                    # x = position.x !== 0 ? position.x : (canvas.width - imgWidth) / 2
-                    # y = position.y !== 0 ? position.y : (canvas.height - imgHeight) / 2
-                    # Where imgWidth is the ORIGINAL width, not scaled
-                    
-                    # Calculate original dimensions in export space (with canvas scale only, no user scale)
-                    export_original_width = int(original_width * canvas_scale_x)
-                    export_original_height = int(original_height * canvas_scale_y)
-                    
-                    if pos_x != 0:
-                        # Non-zero position: scale it to export resolution
-                        overlay_x = int(pos_x * canvas_scale_x)
-                    else:
-                        # Zero position means center based on ORIGINAL dimensions (like preview)
-                        overlay_x = int((width - export_original_width) / 2)
-                    
-                    if pos_y != 0:
-                        # Non-zero position: scale it to export resolution
-                        overlay_y = int(pos_y * canvas_scale_y)
-                    else:
-                        # Zero position means center based on ORIGINAL dimensions (like preview)
-                        overlay_y = int((height - export_original_height) / 2)
-                    
-                    # Determine if this clip fills canvas exactly (for optimization)
-                    is_full_canvas = (
-                        overlay_x == 0 and overlay_y == 0
-                        and scaled_clip_width == width and scaled_clip_height == height
-                    )
+        except Exception as e:
+            logger.error(f"❌ Export failed: {str(e)}")
+            raise Exception(f"Export failed: {str(e)}")
 
-                    # Apply rotation
-                    if rotation != 0:
-                        rad = rotation * 3.14159265359 / 180
-                        filter_parts.append(f"rotate={rad}:c=none")
+    @staticmethod
+    def _source_input_args(decoder_args: List[str], path: str, start: float, duration: float) -> List[str]:
+        """
+        Build the input arguments that decode a stretch of a source file.
 
-                    # Track if we need alpha channel for wipe/slide transitions
-                    needs_alpha_for_transition = False
-                    wipe_slide_filters = []
-                    
-                    # Track slide transition position info (for animated overlay position)
-                    slide_in_info = None
-                    slide_out_info = None
-                    
-                    # Track zoom transitions (need to be combined into single filter)
-                    zoom_in_duration = 0
-                    zoom_in_direction = "in"
-                    zoom_out_duration = 0
-                    zoom_out_direction = "out"
-                    
-                    # Track wipe transitions (need to be combined into single filter)
-                    wipe_in_duration = None
-                    wipe_in_direction = None
-                    wipe_out_duration = None
-                    wipe_out_direction = None
-
-                    # Apply transitions
-                    if transitions:
-                        # Handle both list format and dict format
-                        if isinstance(transitions, list):
-                            # List format: [{type: "fadeIn", duration: 0.5, position: "start"}, ...]
-                            for trans in transitions:
-                                trans_type = trans.get("type", "").lower()
-                                trans_duration = trans.get("duration", 1.0)
-                                position = trans.get("position", "")
-                                
-                                if trans_type in ("fadein", "fade_in", "fade"):
-                                    if position == "start" or not position:
-                                        filter_parts.append(f"fade=t=in:st=0:d={trans_duration}")
-                                elif trans_type in ("fadeout", "fade_out"):
-                                    fade_start = max(0, clip_duration - trans_duration)
-                                    filter_parts.append(f"fade=t=out:st={fade_start}:d={trans_duration}")
-                        elif isinstance(transitions, dict):
-                            # Dict format: {in: {type, duration, properties}, out: {type, duration, properties}}
-                            if transitions.get("in"):
-                                trans_in = transitions["in"]
-                                trans_type = trans_in.get("type", "").lower()
-                                trans_duration = trans_in.get("duration", 1.0)
-                                trans_props = trans_in.get("properties", {})
-                                direction = trans_props.get("direction", "left")
-                                
-                                if trans_type in ("fade", "dissolve"):
-                                    filter_parts.append(f"fade=t=in:st=0:d={trans_duration}")
-                                elif trans_type == "wipe":
-                                    # Wipe uses alpha animation (reveal effect)
-                                    needs_alpha_for_transition = True
-                                    wipe_in_duration = trans_duration
-                                    wipe_in_direction = direction
-                                elif trans_type == "slide":
-                                    # Slide uses position animation (push effect)
-                                    slide_in_info = {
-                                        'duration': trans_duration,
-                                        'direction': direction
-                                    }
-                                elif trans_type == "zoom":
-                                    # Zoom transition - use direction property: "in" or "out"
-                                    # Default to "in" for in-transition
-                                    zoom_in_duration = trans_duration
-                                    zoom_in_direction = trans_props.get("direction", "in")
-
-                            if transitions.get("out"):
-                                trans_out = transitions["out"]
-                                trans_type = trans_out.get("type", "").lower()
-                                trans_duration = trans_out.get("duration", 1.0)
-                                trans_props = trans_out.get("properties", {})
-                                direction = trans_props.get("direction", "left")
-                                
-                                if trans_type in ("fade", "dissolve"):
-                                    fade_start = max(0, clip_duration - trans_duration)
-                                    filter_parts.append(f"fade=t=out:st={fade_start}:d={trans_duration}")
-                                elif trans_type == "wipe":
-                                    # Wipe uses alpha animation (hide effect)
-                                    needs_alpha_for_transition = True
-                                    wipe_out_duration = trans_duration
-                                    wipe_out_direction = direction
-                                elif trans_type == "slide":
-                                    # Slide uses position animation (push effect)
-                                    slide_out_info = {
-                                        'duration': trans_duration,
-                                        'direction': direction
-                                    }
-                                elif trans_type == "zoom":
-                                    # Zoom transition - use direction property: "in" or "out"
-                                    # Default to "out" for out-transition
-                                    zoom_out_duration = trans_duration
-                                    zoom_out_direction = trans_props.get("direction", "out")
-
-                    # Build combined wipe filter if we have any wipe transitions
-                    if wipe_in_duration or wipe_out_duration:
-                        combined_wipe_filter = self._build_combined_wipe_filter(
-                            wipe_in_duration, wipe_in_direction,
-                            wipe_out_duration, wipe_out_direction,
-                            clip_duration, scaled_clip_width, scaled_clip_height, fps
-                        )
-                        wipe_slide_filters.append(combined_wipe_filter)
-                    
-                    # Build combined zoom filter if we have any zoom transitions
-                    # Note: zoom filter already specifies output dimensions to maintain size
-                    if zoom_in_duration > 0 or zoom_out_duration > 0:
-                        zoom_filter = self._build_combined_zoom_filter(
-                            zoom_in_duration, zoom_in_direction,
-                            zoom_out_duration, zoom_out_direction,
-                            clip_duration, scaled_clip_width, scaled_clip_height, fps
-                        )
-                        filter_parts.append(zoom_filter)
+        Args:
+            decoder_args: Decoder options placed before the input (hwaccel, threads)
+            path: Source media path
+            start: Source time to start decoding at
+            duration: Length of the stretch in seconds
 
-                    # Set fps and format
-                    filter_parts.append(f"fps={fps}")
-                    
-                    # Check if this is an image that might have transparency (PNG)
-                    is_transparent_image = clip_type == "image" and str(media_path).lower().endswith('.png')
-                    
-                    # For clips that aren't full canvas, transparent images, or wipe/slide transitions,
-                    # preserve alpha channel for proper compositing
-                    needs_alpha = (not is_full_canvas) or is_transparent_image or needs_alpha_for_transition
-                    
-                    if needs_alpha:
-                        filter_parts.append("format=rgba")
-                        # Add wipe/slide alpha filters after format conversion
-                        filter_parts.extend(wipe_slide_filters)
-                        # Use output format that supports alpha
-                        temp_output = temp_output.replace('.mp4', '.mov')
-                        temp_files[-1] = temp_output  # Update the temp file reference
-                        
-                        # Build command with alpha support using qtrle codec
-                        cmd = ['ffmpeg', '-y']
-                        cmd.extend(input_args)
-                        cmd.extend(['-vf', ','.join(filter_parts)])
-                        cmd.extend(['-c:v', 'qtrle'])  # QuickTime Animation codec for alpha support
-                        cmd.extend(['-an'])
-                        cmd.append(temp_output)
-                    else:
-                        filter_parts.append("format=yuv420p")
-                        
-                        # Build command
-                        cmd = ['ffmpeg', '-y']
-                        cmd.extend(input_args)
-                        cmd.extend(['-vf', ','.join(filter_parts)])
-                        cmd.extend(['-c:v', 'libx264', '-preset', 'ultrafast', '-crf', '23'])
-                        cmd.extend(['-an'])
-                        cmd.append(temp_output)
-
-                    result = subprocess.run(cmd, capture_output=True, text=True)
-                    if result.returncode == 0:
-                        processed_video_paths.append({
-                            'path': temp_output,
-                            'start_time': start_time,
-                            'duration': clip_duration,
-                            'overlay_x': overlay_x,
-                            'overlay_y': overlay_y,
-                            'is_full_canvas': is_full_canvas,
-                            'layer_index': video_item['layer_index'],
-                            'has_alpha': needs_alpha,
-                            'slide_in': slide_in_info,
-                            'slide_out': slide_out_info,
-                            'clip_width': scaled_clip_width,
-                            'clip_height': scaled_clip_height,
-                            'canvas_width': width,
-                            'canvas_height': height,
-                            'fps': fps
-                        })
-                    else:
-                        logger.error(f"Error processing clip {i}: {result.stderr}")
+        Returns:
+            FFmpeg input arguments
+        """
+        input_args = list(decoder_args)
+        if start > 0:
+            input_args.extend(['-ss', str(start)])
+        input_args.extend(['-i', path, '-t', str(duration)])
+        return input_args
 
-                if progress_callback:
-                    progress_callback(0.5)
+    def _shared_source_groups(self, layers: List[Tuple[List[str], Optional[str], Dict]]) -> List[List[int]]:
+        """
+        Find clips that can be decoded from one shared input.
 
-                # Process audio clips
-                for i, audio_item in enumerate(audio_clips):
-                    clip_data = audio_item['clip']
-                    audio_type = audio_item['type']
+        Clips cut from the same source qualify when they follow each other
+        in the source and sit at the same offset on the timeline, as after
+        splitting a clip: the source then plays through once, and each
+        clip's frames arrive just as its overlay needs them. Any other
+        arrangement would make one branch wait on frames buffered for
+        another, so those clips keep their own inputs.
 
-                    resource_id = clip_data.get("resourceId")
-                    if not resource_id:
-                        continue
+        Args:
+            layers: Composite layers as passed to _build_composite_command
 
-                    media_path = self._find_media_file(resource_id, clip_data.get("data", {}))
-                    if not media_path:
-                        continue
+        Returns:
+            Lists of layer indices, ordered by source time, that share an
+            input; every group has at least two clips
+        """
+        candidates: Dict[Tuple, List[int]] = {}
+        for idx, (clip_input_args, _, clip_info) in enumerate(layers):
+            source = clip_info.get('source')
+            # Only clips decoded straight from their source (not intermediates)
+            if not source or clip_input_args != self._source_input_args(
+                source['decoder_args'], source['path'], source['start'], source['duration']
+            ):
+                continue
+            key = (source['path'], tuple(source['decoder_args']))
+            candidates.setdefault(key, []).append(idx)
+
+        groups = []
+        for indices in candidates.values():
+            indices.sort(key=lambda idx: layers[idx][2]['source']['start'])
+            group = [indices[0]]
+            for idx in indices[1:]:
+                prev_info = layers[group[-1]][2]
+                clip_info = layers[idx][2]
+                prev_end = prev_info['source']['start'] + prev_info['source']['duration']
+                gap = clip_info['source']['start'] - prev_end
+                offset_shift = (
+                    (clip_info['start_time'] - clip_info['source']['start'])
+                    - (prev_info['start_time'] - prev_info['source']['start'])
+                )
+                if -1e-6 <= gap <= _MAX_SHARED_SOURCE_GAP and abs(offset_shift) < 1e-3:
+                    group.append(idx)
+                else:
+                    if len(group) > 1:
+                        groups.append(group)
+                    group = [idx]
+            if len(group) > 1:
+                groups.append(group)
+        return groups
+
+    def _build_composite_command(
+        self, layers: List[Tuple[List[str], Optional[str], Dict]],
+        width: int, height: int, fps: int, duration: float,
+        audio_path: Optional[str], output_args: List[str]
+    ) -> List[str]:
+        """
+        Build the ffmpeg run that overlays every clip onto a black canvas.
 
-                    start_time = clip_data.get("startTime", 0)
-                    clip_duration = clip_data.get("duration", 0)
-                    trim_start = clip_data.get("trimStart", 0)
-                    trim_end = clip_data.get("trimEnd", 0)
-                    volume = clip_data.get("volume", 1.0)
+        Args:
+            layers: (input arguments, filter chain or None, clip entry) for
+                each clip, bottom layer first. The filter chain is applied to
+                the clip's input before it is overlaid. Clips cut in sequence
+                from one source share a single input (_shared_source_groups).
+            width: Canvas width
+            height: Canvas height
+            fps: Output frames per second
+            duration: Output duration in seconds
+            audio_path: Optional mixed audio file muxed into the output
+            output_args: Further output arguments, ending in the output path
 
-                    # Extract/process audio
-                    temp_audio = str(self.temp_dir / f"audio_{i}_{uuid.uuid4()}.m4a")
-                    temp_files.append(temp_audio)
+        Returns:
+            FFmpeg command
+        """
+        if len(layers) == 1 and self._covers_output(layers[0][2], duration, fps):
+            # The lone clip hides the whole canvas, so it is the output:
+            # no black canvas is generated and nothing is blended
+            clip_input_args, filter_chain, _ = layers[0]
+            input_args = list(clip_input_args)
+            filter_parts = [f"[0:v]{filter_chain}[v0]"] if filter_chain else []
+            base_label = "[v0]" if filter_chain else "0:v"
+            input_count = 1
+        else:
+            input_args, filter_parts, base_label, input_count = self._build_overlay_graph(
+                layers, width, height, fps, duration
+            )
 
-                    try:
-                        cmd = ['ffmpeg', '-y']
-                        if trim_start > 0:
-                            cmd.extend(['-ss', str(trim_start)])
-                        cmd.extend(['-i', str(media_path)])
-                        if clip_duration > 0:
-                            cmd.extend(['-t', str(clip_duration)])
-
-                        filter_parts = []
-                        if volume != 1.0:
-                            filter_parts.append(f"volume={volume}")
-
-                        if filter_parts:
-                            cmd.extend(['-af', ','.join(filter_parts)])
-
-                        cmd.extend(['-c:a', 'aac', '-b:a', '192k'])
-                        cmd.append(temp_audio)
-
-                        result = subprocess.run(cmd, capture_output=True, text=True)
-                        if result.returncode == 0:
-                            processed_audio_paths.append({
-                                'path': temp_audio,
-                                'start_time': start_time,
-                                'duration': clip_duration
-                            })
-                    except Exception as e:
-                        logger.warning(f"Error processing audio {i}: {e}")
+        audio_args = []
+        if audio_path:
+            input_args.extend(['-i', audio_path])
+            audio_args = ['-map', f'{input_count}:a', '-c:a', 'aac', '-b:a', '192k']
+
+        cmd = ['ffmpeg', '-y']
+        cmd.extend(input_args)
+        if filter_parts:
+            cmd.extend(['-filter_complex', ';'.join(filter_parts)])
+        cmd.extend([
+            '-map', base_label,
+            *audio_args,
+            *self._video_codec_args(),
+            '-pix_fmt', 'yuv420p',
+            '-t', str(duration),
+            *output_args
+        ])
+        return cmd
+
+    @staticmethod
+    def _covers_output(clip_info: Dict, duration: float, fps: int) -> bool:
+        """
+        Check whether a clip alone fills every pixel of every output frame.
 
-                if progress_callback:
-                    progress_callback(0.7)
+        Args:
+            clip_info: Clip entry of a composite layer
+            duration: Output duration in seconds
+            fps: Output frames per second
 
-                # Ensure width and height are valid integers for text processing
-                final_width: int = width if width is not None else 1920
-                final_height: int = height if height is not None else 1080
+        Returns:
+            True if the clip is opaque, fills the canvas at rest and plays
+            from the first output frame to the last
+        """
+        source = clip_info.get('source')
+        clip_duration = source['duration'] if source else clip_info['duration']
+        return (
+            clip_info.get('is_full_canvas', False)
+            and not clip_info.get('has_alpha', False)
+            and not clip_info.get('slide_in')
+            and not clip_info.get('slide_out')
+            and abs(clip_info['start_time']) < 1e-6
+            and clip_duration >= duration - 0.5 / fps
+        )
 
-                # Process text clips
-                for i, text_item in enumerate(text_clips):
-                    clip_data = text_item['clip']
-                    data = clip_data.get("data", {})
-                    start_time = clip_data.get("startTime", 0)
-                    clip_duration = clip_data.get("duration", 5)
-
-                    text_content = data.get("text", "")
-                    font_family = data.get("fontFamily", "Arial")
-                    font_size = data.get("fontSize", 50)
-                    color = data.get("color", "white")
-                    
-                    # Get text scale from clip data (like video/image clips)
-                    user_scale = clip_data.get("scale", 1)
-                    if isinstance(user_scale, dict):
-                        user_scale_x = user_scale.get("x", 1)
-                        user_scale_y = user_scale.get("y", 1)
-                    else:
-                        user_scale_x = user_scale
-                        user_scale_y = user_scale
-                    
-                    # Get text position from clip data
-                    text_position = clip_data.get("position", {})
-                    text_pos_x = text_position.get("x", 0) if text_position else 0
-                    text_pos_y = text_position.get("y", 0) if text_position else 0
-
-                    # Scale font and position for export
-                    canvas_scale_x = final_width / source_width if source_width > 0 else 1.0
-                    canvas_scale_y = final_height / source_height if source_height > 0 else 1.0
-                    
-                    # Apply both canvas scale AND user scale to font size
-                    # User scale_y affects the height/fontSize
-                    final_scale_y = canvas_scale_y * user_scale_y
-                    scaled_font_size = int(font_size * final_scale_y)
-                    
-                    # Scale position for export (if position is provided)
-                    # IMPORTANT: Preview centers text at canvas center (width/2, height/2) when pos is 0
-                    # Frontend logic: x = position.x !== 0 ? position.x : canvasWidth / 2
-                    if text_pos_x != 0:
-                        scaled_pos_x = int(text_pos_x * canvas_scale_x)
-                    else:
-                        # Center at canvas center, not based on text dimensions
-                        scaled_pos_x = final_width // 2
-                    
-                    if text_pos_y != 0:
-                        scaled_pos_y = int(text_pos_y * canvas_scale_y)
-                    else:
-                        # Center at canvas center, not based on text dimensions
-                        scaled_pos_y = final_height // 2
+    def _build_overlay_graph(
+        self, layers: List[Tuple[List[str], Optional[str], Dict]],
+        width: int, height: int, fps: int, duration: float
+    ) -> Tuple[List[str], List[str], str, int]:
+        """
+        Build the inputs and filter graph overlaying clips onto a black canvas.
 
-                    # Create text overlay image with text at the correct position
-                    text_image_path = self._create_text_image(
-                        text_content, scaled_font_size, color, font_family, 
-                        final_width, final_height, scaled_pos_x, scaled_pos_y
-                    )
+        Args:
+            layers: Composite layers as passed to _build_composite_command
+            width: Canvas width
+            height: Canvas height
+            fps: Output frames per second
+            duration: Output duration in seconds
 
-                    if text_image_path:
-                        temp_files.append(text_image_path)
-                        temp_text_video = str(self.temp_dir / f"text_{i}_{uuid.uuid4()}.mov")
-                        temp_files.append(temp_text_video)
-
-                        # Check for transitions
-                        transitions = clip_data.get("transitions", {})
-                        
-                        # Track zoom transitions (need to be combined into single filter)
-                        zoom_in_duration = 0
-                        zoom_in_direction = "in"
-                        zoom_out_duration = 0
-                        zoom_out_direction = "out"
-                        
-                        # Build video filter chain
-                        filter_parts = []
-                        
-                        # Collect zoom transition info
-                        if transitions:
-                            if transitions.get("in"):
-                                trans_in = transitions["in"]
-                                if trans_in.get("type") == "zoom":
-                                    trans_duration = trans_in.get("duration", 1.0)
-                                    trans_props = trans_in.get("properties", {})
-                                    zoom_in_direction = trans_props.get("direction", "in")
-                                    if zoom_in_direction in ["in", "out"]:
-                                        zoom_in_duration = trans_duration
-                            
-                            if transitions.get("out"):
-                                trans_out = transitions["out"]
-                                if trans_out.get("type") == "zoom":
-                                    trans_duration = trans_out.get("duration", 1.0)
-                                    trans_props = trans_out.get("properties", {})
-                                    zoom_out_direction = trans_props.get("direction", "out")
-                                    if zoom_out_direction in ["in", "out"]:
-                                        zoom_out_duration = trans_duration
-                        
-                        # Build combined zoom filter if we have any zoom transitions
-                        if zoom_in_duration > 0 or zoom_out_duration > 0:
-                            zoom_filter = self._build_combined_zoom_filter(
-                                zoom_in_duration, zoom_in_direction,
-                                zoom_out_duration, zoom_out_direction,
-                                clip_duration, final_width, final_height, fps
-                            )
-                            filter_parts.append(zoom_filter)
-                        
-                        # Always add fps filter
-                        filter_parts.append(f'fps={fps}')
-                        
-                        # Build filter string
-                        filter_str = ','.join(filter_parts)
-
-                        # Convert text image to video with alpha support
-                        # Use qtrle codec which properly supports RGBA
-                        cmd = [
-                            'ffmpeg', '-y',
-                            '-loop', '1', '-t', str(clip_duration),
-                            '-i', text_image_path,
-                            '-vf', filter_str,
-                            '-c:v', 'qtrle',
-                            temp_text_video
-                        ]
-
-                        result = subprocess.run(cmd, capture_output=True, text=True)
-                        if result.returncode == 0:
-                            processed_video_paths.append({
-                                'path': temp_text_video,
-                                'start_time': start_time,
-                                'duration': clip_duration,
-                                'overlay_x': 0,  # Text is positioned within the image
-                                'overlay_y': 0,
-                                'is_overlay': True,
-                                'is_full_canvas': True,  # Full canvas with text at position
-                                'has_alpha': True,
-                                'layer_index': text_item['layer_index']
-                            })
-                        else:
-                            logger.warning(f"Text video creation error: {result.stderr}")
+        Returns:
+            (input arguments, filter graph parts, label of the composited
+            video, number of inputs)
+        """
+        input_args = ['-f', 'lavfi', '-i', f'color=c=black:s={width}x{height}:d={duration}:r={fps}']
+        filter_parts = []
+        input_count = 1
+
+        # Clips sharing a source get a branch of one split input, trimmed
+        # to their stretch of it
+        shared_inputs: Dict[int, Tuple[str, str]] = {}
+        for group in self._shared_source_groups(layers):
+            first = layers[group[0]][2]['source']
+            last = layers[group[-1]][2]['source']
+            input_args.extend(self._source_input_args(
+                first['decoder_args'], first['path'], first['start'],
+                last['start'] + last['duration'] - first['start']
+            ))
+            branch_labels = [f"[s{input_count}_{branch}]" for branch in range(len(group))]
+            filter_parts.append(f"[{input_count}:v]split={len(group)}{''.join(branch_labels)}")
+            for idx, branch_label in zip(group, branch_labels):
+                source = layers[idx][2]['source']
+                shared_inputs[idx] = (branch_label, (
+                    f"trim=start={source['start'] - first['start']}:duration={source['duration']},"
+                    "setpts=PTS-STARTPTS"
+                ))
+            input_count += 1
+
+        base_label = "[0:v]"
+        for idx, (clip_input_args, filter_chain, clip_info) in enumerate(layers):
+            if idx in shared_inputs:
+                input_label, trim_filter = shared_inputs[idx]
+                filter_chain = f"{trim_filter},{filter_chain}" if filter_chain else trim_filter
+            else:
+                input_args.extend(clip_input_args)
+                input_label = f"[{input_count}:v]"
+                input_count += 1
+            if filter_chain:
+                filter_parts.append(f"{input_label}{filter_chain}[c{idx}]")
+                input_label = f"[c{idx}]"
+            out_label = f"[v{idx}]"
+            filter_parts.append(self._build_overlay_filter(
+                clip_info, base_label, input_label, out_label, width, height, fps
+            ))
+            base_label = out_label
+
+        # With no clips the canvas input itself is mapped
+        return input_args, filter_parts, base_label if filter_parts else "0:v", input_count
+
+    def _shard_count(self, layers: List[Tuple[List[str], Optional[str], Dict]], duration: float) -> int:
+        """
+        Choose how many time shards to render a timeline in concurrently.
 
-                if progress_callback:
-                    progress_callback(0.8)
+        A single ffmpeg run filters its overlay graph largely on one thread,
+        so on multi-core machines separate runs over consecutive time ranges
+        scale further. Hardware encoders are left to one session, and slide
+        transitions animate on the overlay's frame count, which restarts in
+        every shard.
 
-                # Composite all clips
-                if processed_video_paths:
-                    # Sort by layer index first (lower layers first), then by start time
-                    processed_video_paths.sort(key=lambda x: (x.get('layer_index', 0), x['start_time']))
+        Args:
+            layers: Composite layers as passed to _build_composite_command
+            duration: Timeline duration in seconds
 
-                    # Create a black background video
-                    bg_path = str(self.temp_dir / f"bg_{uuid.uuid4()}.mp4")
-                    temp_files.append(bg_path)
+        Returns:
+            Number of shards, 1 to render in a single run
+        """
+        if self._get_video_encoder() != 'libx264':
+            return 1
+        if any(clip_info.get('slide_in') or clip_info.get('slide_out') for _, _, clip_info in layers):
+            return 1
+        return max(1, min(self.max_workers, int(duration // _MIN_SHARD_SECONDS)))
+
+    def _shard_layers(
+        self, layers: List[Tuple[List[str], Optional[str], Dict]],
+        shard_start: float, shard_end: float
+    ) -> List[Tuple[List[str], Optional[str], Dict]]:
+        """
+        Select and retime the composite layers that one time shard renders.
 
-                    cmd = [
-                        'ffmpeg', '-y',
-                        '-f', 'lavfi',
-                        '-i', f'color=c=black:s={width}x{height}:d={duration}:r={fps}',
-                        '-c:v', 'libx264', '-preset', 'ultrafast',
-                        '-pix_fmt', 'yuv420p',
-                        bg_path
-                    ]
-                    subprocess.run(cmd, capture_output=True)
+        Clip starts are shifted by the shard start. A clip decoded straight
+        from its source that began before the shard has its input seeked
+        forward to the shard start, rather than decoding and filtering
+        frames the shard never shows. Its filter chain is then run on
+        clip-local timestamps again, so fades and keyframe scripts line up.
 
-                    # Build complex filter for overlaying all clips
-                    current_output = bg_path
-                    for idx, clip_info in enumerate(processed_video_paths):
-                        overlay_input = clip_info['path']
-                        start_time = clip_info['start_time']
-                        clip_dur = clip_info['duration']
-                        
-                        # Get overlay position (default to 0,0 for full canvas clips)
-                        overlay_x = clip_info.get('overlay_x', 0)
-                        overlay_y = clip_info.get('overlay_y', 0)
-                        is_full_canvas = clip_info.get('is_full_canvas', False)
-                        has_alpha = clip_info.get('has_alpha', False)
-                        
-                        # Get slide transition info
-                        slide_in = clip_info.get('slide_in')
-                        slide_out = clip_info.get('slide_out')
-                        clip_width = clip_info.get('clip_width', width)
-                        clip_height = clip_info.get('clip_height', height)
-                        canvas_w = clip_info.get('canvas_width', width)
-                        canvas_h = clip_info.get('canvas_height', height)
-                        clip_fps = clip_info.get('fps', fps)
-
-                        temp_overlay = str(self.temp_dir / f"overlay_{idx}_{uuid.uuid4()}.mp4")
-                        temp_files.append(temp_overlay)
-
-                        # Use overlay filter with timing handled via setpts
-                        # The overlay input needs to be time-shifted to start at the correct time
-                        # We use setpts to delay the overlay video's timestamps
-                        # and eof_action=pass to continue the background when overlay ends
-                        
-                        # Build overlay filter:
-                        # 1. Use setpts=PTS+{start_time}/TB on overlay input to shift its timeline
-                        # 2. Use eof_action=pass so background continues after overlay ends
-                        # 3. Use shortest=0 to not stop when overlay ends
-                        pts_offset = start_time
-                        
-                        # Calculate animated position expressions for slide transitions
-                        x_expr = str(overlay_x)
-                        y_expr = str(overlay_y)
-                        has_slide = slide_in is not None or slide_out is not None
-                        
-                        if has_slide:
-                            # Build position expression that combines slide_in and slide_out
-                            total_frames = max(1, int(clip_dur * clip_fps))
-                            
-                            if slide_in and slide_out:
-                                # Both slide in and slide out
-                                in_dur = slide_in['duration']
-                                in_dir = slide_in['direction']
-                                out_dur = slide_out['duration']
-                                out_dir = slide_out['direction']
-                                in_frames = max(1, int(in_dur * clip_fps))
-                                out_start = max(0, total_frames - max(1, int(out_dur * clip_fps)))
-                                out_frames = max(1, int(out_dur * clip_fps))
-                                
-                                # X position expression
-                                if in_dir in ('left', 'right') or out_dir in ('left', 'right'):
-                                    in_x_start = canvas_w if in_dir == 'left' else -clip_width if in_dir == 'right' else overlay_x
-                                    out_x_end = -clip_width if out_dir == 'left' else canvas_w if out_dir == 'right' else overlay_x
-                                    
-                                    if in_dir in ('left', 'right'):
-                                        # Slide in x movement
-                                        in_x_progress = f"min(n/{in_frames},1)"
-                                        in_x_expr = f"({in_x_start}+{in_x_progress}*{overlay_x - in_x_start})"
-                                    else:
-                                        in_x_expr = str(overlay_x)
-                                    
-                                    if out_dir in ('left', 'right'):
-                                        # Slide out x movement
-                                        out_x_progress = f"max(0,(n-{out_start})/{out_frames})"
-                                        out_x_expr = f"({overlay_x}+{out_x_progress}*{out_x_end - overlay_x})"
-                                    else:
-                                        out_x_expr = str(overlay_x)
-                                    
-                                    x_expr = f"if(lt(n,{in_frames}),{in_x_expr},if(lt(n,{out_start}),{overlay_x},{out_x_expr}))"
-                                
-                                # Y position expression
-                                if in_dir in ('up', 'down') or out_dir in ('up', 'down'):
-                                    in_y_start = canvas_h if in_dir == 'up' else -clip_height if in_dir == 'down' else overlay_y
-                                    out_y_end = -clip_height if out_dir == 'up' else canvas_h if out_dir == 'down' else overlay_y
-                                    
-                                    if in_dir in ('up', 'down'):
-                                        in_y_progress = f"min(n/{in_frames},1)"
-                                        in_y_expr = f"({in_y_start}+{in_y_progress}*{overlay_y - in_y_start})"
-                                    else:
-                                        in_y_expr = str(overlay_y)
-                                    
-                                    if out_dir in ('up', 'down'):
-                                        out_y_progress = f"max(0,(n-{out_start})/{out_frames})"
-                                        out_y_expr = f"({overlay_y}+{out_y_progress}*{out_y_end - overlay_y})"
-                                    else:
-                                        out_y_expr = str(overlay_y)
-                                    
-                                    y_expr = f"if(lt(n,{in_frames}),{in_y_expr},if(lt(n,{out_start}),{overlay_y},{out_y_expr}))"
-                                    
-                            elif slide_in:
-                                # Only slide in
-                                in_dur = slide_in['duration']
-                                in_dir = slide_in['direction']
-                                in_frames = max(1, int(in_dur * clip_fps))
-                                
-                                if in_dir == 'left':
-                                    # Enter from right
-                                    x_expr = f"if(lt(n,{in_frames}),{canvas_w}-n*{(canvas_w - overlay_x) / in_frames},{overlay_x})"
-                                elif in_dir == 'right':
-                                    # Enter from left
-                                    x_expr = f"if(lt(n,{in_frames}),(0-{clip_width})+n*{clip_width / in_frames},{overlay_x})"
-                                elif in_dir == 'up':
-                                    # Enter from bottom
-                                    y_expr = f"if(lt(n,{in_frames}),{canvas_h}-n*{(canvas_h - overlay_y) / in_frames},{overlay_y})"
-                                elif in_dir == 'down':
-                                    # Enter from top
-                                    y_expr = f"if(lt(n,{in_frames}),(0-{clip_height})+n*{clip_height / in_frames},{overlay_y})"
-                                    
-                            elif slide_out:
-                                # Only slide out
-                                out_dur = slide_out['duration']
-                                out_dir = slide_out['direction']
-                                out_frames = max(1, int(out_dur * clip_fps))
-                                out_start = max(0, total_frames - out_frames)
-                                
-                                if out_dir == 'left':
-                                    # Exit to left
-                                    x_expr = f"if(lt(n,{out_start}),{overlay_x},{overlay_x}-(n-{out_start})*{clip_width / out_frames})"
-                                elif out_dir == 'right':
-                                    # Exit to right
-                                    x_expr = f"if(lt(n,{out_start}),{overlay_x},{overlay_x}+(n-{out_start})*{(canvas_w - overlay_x) / out_frames})"
-                                elif out_dir == 'up':
-                                    # Exit to top
-                                    y_expr = f"if(lt(n,{out_start}),{overlay_y},{overlay_y}-(n-{out_start})*{clip_height / out_frames})"
-                                elif out_dir == 'down':
-                                    # Exit to bottom
-                                    y_expr = f"if(lt(n,{out_start}),{overlay_y},{overlay_y}+(n-{out_start})*{(canvas_h - overlay_y) / out_frames})"
-                        
-                        # Build overlay filter - use format=auto for alpha support
-                        # Add crop filter to ensure output stays within canvas bounds
-                        if is_full_canvas and overlay_x == 0 and overlay_y == 0 and not has_alpha and not has_slide:
-                            overlay_filter = f"[1:v]setpts=PTS+{pts_offset}/TB[ov];[0:v][ov]overlay=0:0:eof_action=pass,crop={width}:{height}:0:0[out]"
-                        elif has_slide:
-                            # Use expression-based overlay for animated positions
-                            overlay_filter = f"[1:v]setpts=PTS+{pts_offset}/TB[ov];[0:v][ov]overlay=x='{x_expr}':y='{y_expr}':format=auto:eof_action=pass,crop={width}:{height}:0:0[out]"
-                        else:
-                            # For clips with alpha or custom position, use format=auto to handle transparency
-                            # Crop to canvas size to handle clips that extend beyond canvas bounds
-                            overlay_filter = f"[1:v]setpts=PTS+{pts_offset}/TB[ov];[0:v][ov]overlay={overlay_x}:{overlay_y}:format=auto:eof_action=pass,crop={width}:{height}:0:0[out]"
-
-                        cmd = [
-                            'ffmpeg', '-y',
-                            '-i', current_output,
-                            '-i', overlay_input,
-                            '-filter_complex', overlay_filter,
-                            '-map', '[out]',
-                            '-c:v', 'libx264', '-preset', 'ultrafast',
-                            '-pix_fmt', 'yuv420p',
-                            '-t', str(duration),
-                            temp_overlay
-                        ]
-
-                        result = subprocess.run(cmd, capture_output=True, text=True)
-                        if result.returncode == 0:
-                            current_output = temp_overlay
-                        else:
-                            logger.warning(f"Overlay error for clip {idx}: {result.stderr}")
-
-                    final_video_path = current_output
-                else:
-                    # No video clips, create black video
-                    final_video_path = str(self.temp_dir / f"black_{uuid.uuid4()}.mp4")
-                    temp_files.append(final_video_path)
+        Args:
+            layers: Composite layers as passed to _build_composite_command
+            shard_start: Timeline time the shard starts at
+            shard_end: Timeline time the shard ends at
 
-                    cmd = [
-                        'ffmpeg', '-y',
-                        '-f', 'lavfi',
-                        '-i', f'color=c=black:s={width}x{height}:d={duration}:r={fps}',
-                        '-c:v', 'libx264', '-preset', 'ultrafast',
-                        '-pix_fmt', 'yuv420p',
-                        final_video_path
-                    ]
-                    subprocess.run(cmd, capture_output=True)
+        Returns:
+            Composite layers of the clips overlapping the shard
+        """
+        shard_layers = []
+        for input_args, filter_chain, clip_info in layers:
+            start_time = clip_info['start_time']
+            if start_time >= shard_end or start_time + clip_info['duration'] <= shard_start:
+                continue
+            skipped = shard_start - start_time
+            source = clip_info.get('source')
+            if (
+                skipped > 0 and source and skipped < source['duration']
+                and input_args == self._source_input_args(
+                    source['decoder_args'], source['path'], source['start'], source['duration']
+                )
+            ):
+                source = dict(source, start=source['start'] + skipped, duration=source['duration'] - skipped)
+                input_args = self._source_input_args(
+                    source['decoder_args'], source['path'], source['start'], source['duration']
+                )
+                restore = f"setpts=PTS+{skipped}/TB"
+                filter_chain = f"{restore},{filter_chain}" if filter_chain else restore
+                filter_chain += f",setpts=PTS-{skipped}/TB"
+                clip_info = dict(
+                    clip_info, start_time=0.0,
+                    duration=clip_info['duration'] - skipped, source=source
+                )
+            else:
+                clip_info = dict(clip_info, start_time=start_time - shard_start)
+            shard_layers.append((input_args, filter_chain, clip_info))
+        return shard_layers
+
+    def _render_shards(
+        self, layers: List[Tuple[List[str], Optional[str], Dict]], shard_count: int,
+        width: int, height: int, fps: int, duration: float,
+        audio_path: Optional[str], output_args: List[str], temp_files: List[str],
+        progress_callback: Optional[Callable[[float], None]] = None,
+        progress_range: Tuple[float, float] = (0.0, 1.0)
+    ) -> bool:
+        """
+        Render the composite as consecutive time shards in parallel ffmpeg runs.
 
-                # Mix audio if present
-                if processed_audio_paths:
-                    # Create mixed audio
-                    mixed_audio_path = str(self.temp_dir / f"mixed_audio_{uuid.uuid4()}.m4a")
-                    temp_files.append(mixed_audio_path)
+        Each shard is split on a frame boundary and runs the same graph over
+        the clips it overlaps, with clip starts shifted by the shard start,
+        so every clip's filter chain still sees its own local time. The
+        video-only shards are then joined with the concat demuxer and stream
+        copy, and the mixed audio is muxed once.
 
-                    if len(processed_audio_paths) > 1:
-                        # Build filter for mixing multiple audio streams with delays
-                        input_args = []
-                        filter_parts = []
+        Args:
+            layers: Composite layers as passed to _build_composite_command
+            shard_count: Number of shards to split the timeline into
+            width: Canvas width
+            height: Canvas height
+            fps: Output frames per second
+            duration: Timeline duration in seconds
+            audio_path: Optional mixed audio file muxed into the output
+            output_args: Further output arguments, ending in the output path
+            temp_files: List that shard paths are appended to for cleanup
+            progress_callback: Optional callback for progress updates
+            progress_range: Progress values reported at the start and end
+                of the render
 
-                        for idx, audio_info in enumerate(processed_audio_paths):
-                            input_args.extend(['-i', audio_info['path']])
-                            delay_ms = int(audio_info['start_time'] * 1000)
-                            filter_parts.append(f"[{idx}:a]adelay={delay_ms}|{delay_ms}[a{idx}]")
+        Returns:
+            True if the output was written, False if a shard or the join failed
+        """
+        frame_count = max(1, int(round(duration * fps)))
+        shard_frames = -(-frame_count // shard_count)
+        shard_id = uuid.uuid4()
+        threads = max(1, (os.cpu_count() or 1) // shard_count)
+
+        shards = []
+        for first_frame in range(0, frame_count, shard_frames):
+            shard_start = first_frame / fps
+            shard_duration = min(shard_frames, frame_count - first_frame) / fps
+            shard_end = shard_start + shard_duration
+            shard_layers = self._shard_layers(layers, shard_start, shard_end)
+            shard_path = str(self.temp_dir / f"shard_{shard_id}_{len(shards)}.mp4")
+            temp_files.append(shard_path)
+            cmd = self._build_composite_command(
+                shard_layers, width, height, fps, shard_duration, None,
+                ['-threads', str(threads), shard_path]
+            )
+            shards.append((cmd, shard_duration, shard_path))
 
-                        mix_inputs = "".join([f"[a{i}]" for i in range(len(processed_audio_paths))])
-                        filter_parts.append(f"{mix_inputs}amix=inputs={len(processed_audio_paths)}:duration=longest[aout]")
+        # Progress is the share of the timeline's shards encoded so far
+        shard_progress = [0.0] * len(shards)
+        range_start, range_end = progress_range
 
-                        cmd = ['ffmpeg', '-y']
-                        cmd.extend(input_args)
-                        cmd.extend(['-filter_complex', ';'.join(filter_parts)])
-                        cmd.extend(['-map', '[aout]', '-c:a', 'aac', '-b:a', '192k'])
-                        cmd.append(mixed_audio_path)
+        def render(index: int) -> bool:
+            cmd, shard_duration, _ = shards[index]
 
-                        subprocess.run(cmd, capture_output=True)
-                    else:
-                        # Single audio, apply delay if needed
-                        audio_info = processed_audio_paths[0]
-                        delay_ms = int(audio_info['start_time'] * 1000)
+            def report(fraction: float) -> None:
+                shard_progress[index] = fraction * shards[index][1]
+                if progress_callback:
+                    progress_callback(range_start + (range_end - range_start) * sum(shard_progress) / duration)
+
+            result = self._run_ffmpeg_with_progress(cmd, shard_duration, report)
+            if result.returncode != 0:
+                logger.warning(f"Shard {index} failed: {result.stderr}")
+            return result.returncode == 0
+
+        with ThreadPoolExecutor(max_workers=len(shards)) as executor:
+            if not all(list(executor.map(render, range(len(shards))))):
+                return False
+
+        concat_list_path = str(self.temp_dir / f"shards_{shard_id}.txt")
+        temp_files.append(concat_list_path)
+        with open(concat_list_path, 'w') as f:
+            for _, _, shard_path in shards:
+                f.write(f"file '{shard_path}'\n")
+
+        cmd = ['ffmpeg', '-y', '-f', 'concat', '-safe', '0', '-i', concat_list_path]
+        audio_args = []
+        if audio_path:
+            cmd.extend(['-i', audio_path])
+            audio_args = ['-map', '1:a', '-c:a', 'aac', '-b:a', '192k']
+        cmd.extend([
+            '-map', '0:v', *audio_args,
+            '-c:v', 'copy',
+            '-t', str(duration),
+            *output_args
+        ])
+        result = subprocess.run(cmd, capture_output=True, text=True)
+        if result.returncode != 0:
+            logger.warning(f"Joining shards failed: {result.stderr}")
+        return result.returncode == 0
+
+    def _run_ffmpeg_with_progress(
+        self, cmd: List[str], duration: float,
+        progress_callback: Optional[Callable[[float], None]] = None,
+        progress_range: Tuple[float, float] = (0.0, 1.0)
+    ) -> subprocess.CompletedProcess:
+        """
+        Run an ffmpeg command, reporting its encode progress as it runs.
 
-                        cmd = ['ffmpeg', '-y', '-i', audio_info['path']]
-                        if delay_ms > 0:
-                            cmd.extend(['-af', f"adelay={delay_ms}|{delay_ms}"])
-                        cmd.extend(['-c:a', 'aac', '-b:a', '192k'])
-                        cmd.append(mixed_audio_path)
+        ffmpeg writes key=value progress blocks to stdout (-progress pipe:1);
+        out_time_us is scaled by the expected duration into progress_range.
+        stderr is drained on a separate thread so neither pipe can fill up.
+        If the callback raises (e.g. on cancellation), ffmpeg is killed.
 
-                        subprocess.run(cmd, capture_output=True)
+        Args:
+            cmd: FFmpeg command starting with the ffmpeg executable
+            duration: Expected output duration in seconds
+            progress_callback: Optional callback for progress updates
+            progress_range: Progress values reported at the start and end
+                of the encode
 
-                    # Combine video and audio
-                    cmd = [
-                        'ffmpeg', '-y',
-                        '-i', final_video_path,
-                        '-i', mixed_audio_path,
-                        '-c:v', 'copy',
-                        '-c:a', 'aac',
-                        '-movflags', '+faststart',
-                        '-shortest',
-                        full_output_path
-                    ]
-                    subprocess.run(cmd, capture_output=True)
-                else:
-                    # No audio, just copy video
-                    shutil.copy(final_video_path, full_output_path)
+        Returns:
+            Completed process with the return code and stderr text
+        """
+        if progress_callback is None or duration <= 0:
+            return subprocess.run(cmd, capture_output=True, text=True)
 
-                if progress_callback:
-                    progress_callback(1.0)
+        cmd = [cmd[0], '-progress', 'pipe:1', '-nostats', *cmd[1:]]
+        process = subprocess.Popen(
+            cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
+        )
+        stderr_chunks: List[str] = []
+        stderr_reader = threading.Thread(
+            target=lambda: stderr_chunks.append(process.stderr.read()), daemon=True
+        )
+        stderr_reader.start()
 
-                logger.info(f"✅ Export completed: {full_output_path}")
-                return full_output_path
+        range_start, range_end = progress_range
+        try:
+            for line in process.stdout:
+                key, _, value = line.strip().partition('=')
+                # out_time_us is "N/A" or negative before the first frame
+                if key == 'out_time_us' and value.isdigit():
+                    fraction = min(int(value) / 1_000_000 / duration, 1.0)
+                    progress_callback(range_start + (range_end - range_start) * fraction)
+            process.wait()
+        except BaseException:
+            process.kill()
+            process.wait()
+            raise
+        finally:
+            stderr_reader.join()
+
+        return subprocess.CompletedProcess(cmd, process.returncode, None, ''.join(stderr_chunks))
+
+    def _output_args(
+        self, output_path: str, fragmented: bool = False,
+        segment: bool = False, segment_duration: float = 2.0
+    ) -> List[str]:
+        """
+        Build the ffmpeg muxer arguments for the final export output.
 
-            finally:
-                # Cleanup temp files
-                for temp_file in temp_files:
-                    try:
-                        if os.path.exists(temp_file):
-                            os.unlink(temp_file)
-                    except OSError:
-                        pass
+        Args:
+            output_path: Path of the MP4 file or HLS playlist to write
+            fragmented: Write a fragmented MP4 instead of a faststart one
+            segment: Write an HLS playlist with fMP4 segments
+            segment_duration: Target HLS segment length in seconds
 
-        except Exception as e:
-            logger.error(f"❌ Export failed: {str(e)}")
-            raise Exception(f"Export failed: {str(e)}")
+        Returns:
+            FFmpeg arguments ending in the output path
+        """
+        if segment:
+            playlist = Path(output_path)
+            return [
+                '-f', 'hls',
+                '-hls_time', str(segment_duration),
+                '-hls_playlist_type', 'event',
+                '-hls_segment_type', 'fmp4',
+                '-hls_flags', 'independent_segments+program_date_time',
+                '-hls_fmp4_init_filename', f"{playlist.stem}_init.mp4",
+                '-hls_segment_filename', str(playlist.with_name(f"{playlist.stem}_%03d.m4s")),
+                str(playlist)
+            ]
+
+        # Fragmented output needs no second pass over the file to
+        # relocate the moov atom, which faststart does after the mux
+        movflags = _FRAGMENTED_MOVFLAGS if fragmented else '+faststart'
+        return ['-movflags', movflags, output_path]
 
     def cleanup_export(self, file_path: str):
         """
         Clean up exported file.
 
+        For an HLS playlist, its init and media segments are removed too.
+
         Args:
             file_path: Path to file to delete
         """
         try:
             path = Path(file_path)
+            if path.suffix == '.m3u8':
+                segments = [path.with_name(f"{path.stem}_init.mp4")]
+                segments.extend(path.parent.glob(f"{path.stem}_[0-9][0-9][0-9]*.m4s"))
+                for segment_path in segments:
+                    if segment_path.exists():
+                        segment_path.unlink()
             if path.exists():
                 path.unlink()
         except Exception as e:
@@ -294,17 +294,20 @@ class MediaService:
             if not ret or frame is None:
                 raise ValueError("Could not extract frame from video")
             
-            # Convert BGR to RGB (OpenCV uses BGR by default)
-            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            # Resize thumbnail to reasonable size (maintain aspect ratio).
+            # Shrinking the decoded frame before it leaves OpenCV means only
+            # the thumbnail-sized array is color converted and copied into PIL
+            max_width = 320
+            frame_height, frame_width = frame.shape[:2]
+            aspect_ratio = frame_height / frame_width
+            new_height = max(int(max_width * aspect_ratio), 1)
+            frame = cv2.resize(frame, (max_width, new_height), interpolation=cv2.INTER_AREA)
             
-            # Convert to PIL Image
-            img = Image.fromarray(frame_rgb)
+            # Convert BGR to RGB (OpenCV uses BGR by default), in place
+            cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=frame)
             
-            # Resize thumbnail to reasonable size (maintain aspect ratio)
-            max_width = 320
-            aspect_ratio = img.height / img.width
-            new_height = int(max_width * aspect_ratio)
-            img = img.resize((max_width, new_height), Image.Resampling.LANCZOS)
+            # Convert to PIL Image
+            img = Image.fromarray(frame)
             
             # Generate thumbnail filename
             if thumbnail_id is None:
@@ -363,46 +366,44 @@ class MediaService:
             )
             
             # Convert bytes to numpy array
-            audio_array = np.frombuffer(out, np.int16).astype(np.float32) / 32768.0
+            samples = np.frombuffer(out, np.int16)
             
             # Downsample to match desired width
-            samples_per_pixel = len(audio_array) // width
+            samples_per_pixel = len(samples) // width
             if samples_per_pixel < 1:
                 samples_per_pixel = 1
             
-            # Calculate RMS (root mean square) for each pixel width
-            waveform_data = []
-            for i in range(0, len(audio_array), samples_per_pixel):
-                chunk = audio_array[i:i + samples_per_pixel]
-                if len(chunk) > 0:
-                    rms = np.sqrt(np.mean(chunk ** 2))
-                    waveform_data.append(rms)
+            # Calculate RMS (root mean square) for each pixel width, on the
+            # integer samples: squares of int16 fit in int32 and sums in
+            # int64, and the 1/32768 full-scale factor cancels in the
+            # normalization below, so no float copy of the audio is made
+            full_chunks = len(samples) // samples_per_pixel
+            squares = np.square(samples, dtype=np.int32)
+            sums = squares[:full_chunks * samples_per_pixel].reshape(
+                full_chunks, samples_per_pixel
+            ).sum(axis=1, dtype=np.int64)
+            waveform_data = np.sqrt(sums / samples_per_pixel)
+            if len(samples) % samples_per_pixel:
+                # Partial last chunk
+                tail = squares[full_chunks * samples_per_pixel:]
+                waveform_data = np.append(waveform_data, np.sqrt(tail.mean(dtype=np.float64)))
             
             # Normalize to 0-1 range
             if len(waveform_data) > 0:
-                max_val = max(waveform_data) if max(waveform_data) > 0 else 1
-                waveform_data = [val / max_val for val in waveform_data]
-            
-            # Create image
-            img = Image.new('RGB', (width, height), color='white')
-            pixels = img.load()
+                max_val = waveform_data.max() if waveform_data.max() > 0 else 1
+                waveform_data = waveform_data / max_val
             
-            if pixels is None:
-                raise ValueError("Failed to load image pixels")
-            
-            # Draw waveform
+            # Draw waveform: a vertical line from the center per pixel column
             center_y = height // 2
-            for x, amplitude in enumerate(waveform_data):
-                if x >= width:
-                    break
-                
-                # Calculate bar height
-                bar_height = int(amplitude * center_y)
-                
-                # Draw vertical line from center
-                for y in range(center_y - bar_height, center_y + bar_height):
-                    if 0 <= y < height:
-                        pixels[x, y] = (59, 130, 246)  # Blue color
+            bar_heights = np.zeros(width, dtype=np.int64)
+            visible = waveform_data[:width]
+            bar_heights[:len(visible)] = (visible * center_y).astype(np.int64)
+            rows = np.arange(height)[:, None]
+            bars = (rows >= center_y - bar_heights) & (rows < center_y + bar_heights)
+            
+            pixels = np.full((height, width, 3), 255, dtype=np.uint8)
+            pixels[bars] = (59, 130, 246)  # Blue color
+            img = Image.fromarray(pixels, 'RGB')
             
             # Convert to base64
             buffer = BytesIO()
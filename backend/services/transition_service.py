@@ -15,6 +15,33 @@ class TransitionService:
         filename = f"{prefix}_{uuid.uuid4()}.mp4"
         return str(self.temp_dir / filename)
     
+    def _output_with_source_audio(self, video, audio, output_path: str) -> None:
+        """
+        Encode filtered video alongside the source audio stream
+        
+        The audio is not filtered, so it is stream copied; sources whose
+        audio codec can't go into MP4 fall back to an AAC encode.
+        
+        Args:
+            video: Filtered ffmpeg-python video stream
+            audio: Source ffmpeg-python audio stream
+            output_path: Path to output video file
+        """
+        try:
+            (
+                ffmpeg
+                .output(video, audio, output_path, vcodec='libx264', acodec='copy')
+                .overwrite_output()
+                .run(capture_stdout=True, capture_stderr=True, quiet=True)
+            )
+        except ffmpeg.Error:
+            (
+                ffmpeg
+                .output(video, audio, output_path, vcodec='libx264', acodec='aac')
+                .overwrite_output()
+                .run(capture_stdout=True, capture_stderr=True, quiet=True)
+            )
+    
     def apply_fade_in(self, video_path: str, duration: float = 1.0) -> str:
         """
         Apply fade in transition from black using FFmpeg
@@ -40,12 +67,7 @@ class TransitionService:
             audio = input_stream.audio
             
             # Output with both video and audio
-            (
-                ffmpeg
-                .output(video, audio, str(output_path), vcodec='libx264', acodec='aac')
-                .overwrite_output()
-                .run(capture_stdout=True, capture_stderr=True, quiet=True)
-            )
+            self._output_with_source_audio(video, audio, str(output_path))
             
             return output_path
             
@@ -84,12 +106,7 @@ class TransitionService:
             audio = input_stream.audio
             
             # Output with both video and audio
-            (
-                ffmpeg
-                .output(video, audio, str(output_path), vcodec='libx264', acodec='aac')
-                .overwrite_output()
-                .run(capture_stdout=True, capture_stderr=True, quiet=True)
-            )
+            self._output_with_source_audio(video, audio, str(output_path))
             
             return output_path
             
@@ -307,6 +307,97 @@ class TestAudioMixer:
         duration = self._get_audio_duration(result_path)
         assert duration >= 1.5  # Should cover both clips
 
+    def test_mix_chained_wav_then_finalize(self, audio_mixer, sample_audio_file, sample_audio_file_2):
+        """Test chaining PCM intermediates and encoding once with finalize."""
+        clip_configs = [
+            AudioClipConfig(audio_path=sample_audio_file, start_time=0.0),
+            AudioClipConfig(audio_path=sample_audio_file_2, start_time=1.0)
+        ]
+
+        mixed_path = audio_mixer.mix_audio_tracks(clip_configs, encode=False)
+        assert mixed_path.endswith('.wav')
+
+        faded_path = audio_mixer.apply_audio_fade(mixed_path, fade_in=0.5, encode=False)
+        assert faded_path.endswith('.wav')
+
+        final_path = audio_mixer.finalize(faded_path)
+        assert final_path.endswith('.mp3')
+        assert os.path.exists(final_path)
+        assert self._get_audio_duration(final_path) >= 2.0
+
+    def test_mix_single_untouched_clip_is_copied(self, audio_mixer, sample_audio_file, temp_dir):
+        """Test that an unmodified single clip is copied byte for byte."""
+        clip_config = AudioClipConfig(audio_path=sample_audio_file, start_time=0.0)
+        output_path = str(temp_dir / "copied.mp3")
+
+        result_path = audio_mixer.mix_audio_tracks([clip_config], output_path=output_path)
+
+        assert result_path == output_path
+        with open(sample_audio_file, 'rb') as src, open(result_path, 'rb') as dst:
+            assert src.read() == dst.read()
+
+    def test_mix_return_bytes(self, audio_mixer, sample_audio_file, sample_audio_file_2):
+        """Test returning the mix in memory instead of writing a file."""
+        clip_configs = [
+            AudioClipConfig(audio_path=sample_audio_file, start_time=0.0),
+            AudioClipConfig(audio_path=sample_audio_file_2, start_time=1.0)
+        ]
+
+        mp3_bytes = audio_mixer.mix_audio_tracks(clip_configs, return_bytes=True)
+        assert isinstance(mp3_bytes, bytes)
+        assert mp3_bytes[:3] == b'ID3' or mp3_bytes[0] == 0xFF
+
+        wav_bytes = audio_mixer.mix_audio_tracks(clip_configs, encode=False, return_bytes=True)
+        assert wav_bytes[:4] == b'RIFF'
+        assert wav_bytes[8:12] == b'WAVE'
+
+    def test_mix_intermediate_quality(self, audio_mixer, sample_audio_file):
+        """Test that the intermediate tier lowers the output sample rate."""
+        clip_configs = [AudioClipConfig(audio_path=sample_audio_file, start_time=0.0)]
+
+        output_path = audio_mixer.mix_audio_tracks(clip_configs, quality='intermediate')
+
+        probe = ffmpeg.probe(output_path)
+        audio_stream = next(s for s in probe['streams'] if s['codec_type'] == 'audio')
+        assert int(audio_stream['sample_rate']) == 22050
+
+    def test_finalize_invalid_quality(self, audio_mixer, sample_audio_file):
+        """Test that an unknown quality tier is rejected."""
+        with pytest.raises(ValueError, match="Unknown quality tier"):
+            audio_mixer.finalize(sample_audio_file, quality='lossless')
+
+    # ==================== Tests for batch_mix ====================
+
+    def test_batch_mix_multiple_jobs(self, audio_mixer, sample_audio_file, sample_audio_file_2, temp_dir):
+        """Test mixing several jobs with a shared source in one call."""
+        output_1 = str(temp_dir / "batch_1.mp3")
+        output_2 = str(temp_dir / "batch_2.mp3")
+
+        jobs = [
+            [
+                AudioClipConfig(audio_path=sample_audio_file, start_time=0.0),
+                AudioClipConfig(audio_path=sample_audio_file_2, start_time=1.0, volume=0.5)
+            ],
+            [
+                AudioClipConfig(audio_path=sample_audio_file, trim_start=0.5, trim_end=1.5, fade_in=0.2)
+            ]
+        ]
+
+        result_paths = audio_mixer.batch_mix(jobs, [output_1, output_2])
+
+        assert result_paths == [output_1, output_2]
+        assert os.path.exists(output_1)
+        assert os.path.exists(output_2)
+        assert self._get_audio_duration(output_1) >= 2.0
+        assert 0.8 <= self._get_audio_duration(output_2) <= 1.3
+
+    def test_batch_mix_mismatched_outputs(self, audio_mixer, sample_audio_file):
+        """Test batch mixing with mismatched jobs and outputs raises ValueError."""
+        jobs = [[AudioClipConfig(audio_path=sample_audio_file)]]
+
+        with pytest.raises(ValueError, match="same length"):
+            audio_mixer.batch_mix(jobs, [])
+
     # ==================== Tests for extract_audio ====================
 
     def test_extract_audio_from_video(self, audio_mixer, sample_video_with_audio):
@@ -462,6 +553,18 @@ class TestAudioMixer:
         with pytest.raises(ValueError, match="Target volume must be positive"):
             audio_mixer.normalize_audio(sample_audio_file, target_volume=-0.5)
 
+    def test_normalize_loudness(self, audio_mixer, sample_audio_file):
+        """Test two-pass loudness normalization to an EBU R128 target."""
+        result_path = audio_mixer.normalize_loudness(sample_audio_file, target_lufs=-23.0)
+
+        assert os.path.exists(result_path)
+        assert self._get_audio_duration(result_path) >= 1.5
+
+    def test_normalize_loudness_invalid_target(self, audio_mixer, sample_audio_file):
+        """Test loudness normalization with out-of-range target raises ValueError."""
+        with pytest.raises(ValueError, match="target_lufs"):
+            audio_mixer.normalize_loudness(sample_audio_file, target_lufs=0.0)
+
     # ==================== Tests for AudioClipConfig ====================
 
     def test_audio_clip_config_default_values(self, sample_audio_file):
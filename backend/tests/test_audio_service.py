@@ -4,12 +4,14 @@ Test suite for AudioService
 import pytest
 import os
 import tempfile
+import subprocess
 import shutil
 import numpy as np
+import ffmpeg
 from pathlib import Path
 from tests.conftest import create_test_video_with_ffmpeg, create_test_audio_with_ffmpeg
 
-from services.audio_service import AudioService
+from services.audio_service import AudioService, read_header_duration
 
 
 class TestAudioService:
@@ -109,6 +111,54 @@ class TestAudioService:
         assert all(-1 <= val <= 1 for val in low_waveform)
         assert all(-1 <= val <= 1 for val in high_waveform)
     
+    def test_pcm_fallback_matches_astats(self):
+        """Test that the PCM streaming fallback agrees with the astats path"""
+        audio_path = self.create_test_audio(duration=2)
+        sample_rate = 8000
+        samples_per_pixel = int(self.service.get_audio_duration(audio_path) * sample_rate) // 100
+        
+        astats_bins = self.service._rms_bins_from_astats(audio_path, 100, sample_rate, samples_per_pixel)
+        pcm_bins = self.service._rms_bins_from_pcm(audio_path, 100, sample_rate, samples_per_pixel)
+        
+        assert astats_bins is not None
+        assert np.allclose(astats_bins, pcm_bins, atol=1e-4)
+    
+    def test_soundfile_bins_match_pcm(self):
+        """Test that the in-process WAV reader agrees with the ffmpeg decode"""
+        audio_path = os.path.join(self.test_dir, "test_audio.wav")
+        subprocess.run([
+            'ffmpeg', '-y', '-f', 'lavfi', '-i', 'sine=frequency=440:duration=2',
+            '-af', 'volume=0.5', '-ar', '8000', '-c:a', 'pcm_s16le', audio_path
+        ], capture_output=True, check=True)
+        
+        soundfile_bins = self.service._rms_bins_from_soundfile(audio_path, 100)
+        if soundfile_bins is None:
+            pytest.skip("soundfile not available")
+        
+        pcm_bins = self.service._rms_bins_from_pcm(audio_path, 100, 8000, 160)
+        assert np.allclose(soundfile_bins, pcm_bins, atol=1e-4)
+    
+    def test_soundfile_bins_skip_compressed(self):
+        """Test that compressed formats are left to ffmpeg"""
+        audio_path = self.create_test_audio(duration=1)
+        
+        assert self.service._rms_bins_from_soundfile(audio_path, 100) is None
+    
+    def test_generate_waveform_data_uses_cache(self):
+        """Test that repeat requests are served from the waveform cache"""
+        audio_path = self.create_test_audio(duration=1)
+        
+        waveform1 = self.service.generate_waveform_data(audio_path, width=100)
+        cache_files = list(Path(self.service.cache_dir).glob("*.npy"))
+        assert len(cache_files) == 1
+        
+        waveform2 = self.service.generate_waveform_data(audio_path, width=100)
+        assert waveform1 == waveform2
+        
+        # A different width is a separate cache entry
+        self.service.generate_waveform_data(audio_path, width=50)
+        assert len(list(Path(self.service.cache_dir).glob("*.npy"))) == 2
+    
     # Test extract_audio_from_video
     def test_extract_audio_from_video_success(self):
         """Test successful audio extraction from video"""
@@ -171,6 +221,17 @@ class TestAudioService:
         with pytest.raises(Exception, match="Failed to get audio duration"):
             self.service.get_audio_duration("nonexistent.mp3")
     
+    def test_read_header_duration_matches_ffprobe(self):
+        """Test that the in-process header read agrees with ffprobe"""
+        audio_path = self.create_test_audio(duration=2)
+        
+        header_duration = read_header_duration(audio_path)
+        if header_duration is None:
+            pytest.skip("no header reader (soundfile/mutagen) available")
+        
+        probed = float(ffmpeg.probe(audio_path)['format']['duration'])
+        assert abs(header_duration - probed) < 0.1
+    
     # Test cleanup_temp_files
     def test_cleanup_temp_files(self):
         """Test cleanup of temporary files"""
@@ -190,6 +251,18 @@ class TestAudioService:
         assert not os.path.exists(audio_path1)
         assert not os.path.exists(audio_path2)
     
+    def test_cleanup_temp_files_keeps_waveform_cache(self):
+        """Test that cleanup removes files but keeps the cache directory"""
+        audio_path = self.service.extract_audio_from_video(
+            self.create_test_video(duration=1, has_audio=True)
+        )
+        self.service.generate_waveform_data(audio_path, width=50)
+        
+        self.service.cleanup_temp_files()
+        
+        assert not os.path.exists(audio_path)
+        assert self.service.cache_dir.is_dir()
+    
     def test_cleanup_temp_files_empty_directory(self):
         """Test cleanup when directory is empty"""
         # Should not raise error
@@ -7,9 +7,14 @@ import tempfile
 import shutil
 import subprocess
 import json
+import wave
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 
-from services.export_service import ExportService
+from services.export_service import (
+    ExportService, _interpolate_keyframe_values, _interpolate_keyframe_values_numpy, _parse_color
+)
 
 
 def get_video_info(video_path: str) -> dict:
@@ -137,6 +142,17 @@ class TestExportService:
         assert self.service.output_dir == Path(self.output_dir)
         assert os.path.exists(self.output_dir)
     
+    def test_max_workers(self):
+        """Test clip preparation concurrency defaults and override"""
+        assert self.service.max_workers >= 1
+        
+        service = ExportService(
+            uploads_dir=self.uploads_dir,
+            output_dir=self.output_dir,
+            max_workers=2
+        )
+        assert service.max_workers == 2
+    
     def test_resolution_presets(self):
         """Test resolution presets are defined"""
         assert "1080p" in self.service.resolutions
@@ -146,6 +162,56 @@ class TestExportService:
         assert self.service.resolutions["720p"] == (1280, 720)
         assert self.service.resolutions["480p"] == (854, 480)
     
+    def test_video_codec_args_software_override(self):
+        """Test that an explicit libx264 encoder skips hardware detection"""
+        service = ExportService(
+            uploads_dir=self.uploads_dir,
+            output_dir=self.output_dir,
+            video_encoder="libx264"
+        )
+        args = service._video_codec_args()
+        assert args[:2] == ['-c:v', 'libx264']
+        assert '-threads' not in args
+        assert service._hwaccel_input_args() == []
+        
+        # An explicit thread count is passed to the encoder
+        assert service._video_codec_args(threads=2)[-2:] == ['-threads', '2']
+    
+    def test_hwaccel_matches_hardware_encoder(self):
+        """Test that hardware decoding uses the encoder's device family"""
+        nvenc = ExportService(
+            uploads_dir=self.uploads_dir, output_dir=self.output_dir,
+            video_encoder="h264_nvenc"
+        )
+        qsv = ExportService(
+            uploads_dir=self.uploads_dir, output_dir=self.output_dir,
+            video_encoder="h264_qsv"
+        )
+        
+        # CUDA is used only when a device can actually be opened
+        cuda_available = subprocess.run(
+            ['ffmpeg', '-hide_banner', '-loglevel', 'error', '-init_hw_device', 'cuda',
+             '-f', 'lavfi', '-i', 'nullsrc=s=64x64:d=0.1', '-frames:v', '1', '-f', 'null', '-'],
+            capture_output=True
+        ).returncode == 0
+        expected = 'cuda' if cuda_available else 'auto'
+        assert nvenc._hwaccel_input_args() == ['-hwaccel', expected]
+        assert nvenc._hwaccel_input_args() == ['-hwaccel', expected]
+        assert qsv._hwaccel_input_args() == ['-hwaccel', 'auto']
+    
+    def test_video_codec_args_auto_detect(self):
+        """Test that auto detection resolves to a usable encoder once"""
+        args = self.service._video_codec_args()
+        assert args[0] == '-c:v'
+        assert args[1] in ('libx264', 'h264_nvenc', 'h264_videotoolbox', 'h264_amf', 'h264_qsv')
+        assert self.service._video_codec_args() == args
+
+        # Other services reuse the process-wide probe
+        import services.export_service as export_service
+        assert export_service._detected_hw_encoder == ('' if args[1] == 'libx264' else args[1])
+        service = ExportService(uploads_dir=self.uploads_dir, output_dir=self.output_dir)
+        assert service._video_codec_args() == args
+
     def test_export_single_video_clip(self):
         """Test exporting timeline with single video clip"""
         # Create test video (file saved with resource_id as name)
@@ -191,6 +257,266 @@ class TestExportService:
         assert width == 854
         assert height == 480
     
+    def test_export_passthrough_clip(self):
+        """Test exporting a clip that already matches the canvas size and fps"""
+        self.create_test_video("test_video.mp4", duration=2)
+        
+        timeline_data = {
+            "duration": 2.0,
+            "layers": [
+                {
+                    "type": "video",
+                    "visible": True,
+                    "clips": [
+                        {
+                            "resourceId": "test_video",
+                            "startTime": 0.0,
+                            "duration": 2.0,
+                            "trimStart": 0.0,
+                            "trimEnd": 0.0,
+                            "transitions": []
+                        }
+                    ]
+                }
+            ]
+        }
+        
+        output_path = self.service.export_timeline(
+            timeline_data=timeline_data,
+            output_path="test_export_passthrough.mp4",
+            fps=24,
+            width=640,
+            height=480
+        )
+        
+        assert os.path.exists(output_path)
+        assert get_video_dimensions(output_path) == (640, 480)
+        assert 1.5 <= get_video_duration(output_path) <= 2.5
+    
+    def test_export_movflags(self):
+        """Test faststart output by default and fragmented output on request"""
+        self.create_test_video("test_video.mp4", duration=2, has_audio=False)
+        
+        timeline_data = {
+            "duration": 2.0,
+            "layers": [
+                {
+                    "type": "video",
+                    "visible": True,
+                    "clips": [
+                        {
+                            "resourceId": "test_video",
+                            "startTime": 0.0,
+                            "duration": 2.0,
+                            "trimStart": 0.0,
+                            "trimEnd": 0.0
+                        }
+                    ]
+                }
+            ]
+        }
+        
+        faststart_path = self.service.export_timeline(
+            timeline_data=timeline_data,
+            output_path="test_export_faststart.mp4",
+            fps=24, width=640, height=480
+        )
+        fragmented_path = self.service.export_timeline(
+            timeline_data=timeline_data,
+            output_path="test_export_fragmented.mp4",
+            fps=24, width=640, height=480,
+            fragmented=True
+        )
+        
+        with open(faststart_path, 'rb') as f:
+            data = f.read()
+        assert data.index(b'moov') < data.index(b'mdat')
+        
+        with open(fragmented_path, 'rb') as f:
+            data = f.read()
+        assert b'moof' in data
+        assert 1.5 <= get_video_duration(fragmented_path) <= 2.5
+    
+    def test_export_sharded(self):
+        """Test rendering consecutive time shards in parallel and joining them"""
+        self.create_test_video("test_video.mp4", duration=8)
+        service = ExportService(
+            uploads_dir=self.uploads_dir,
+            output_dir=self.output_dir,
+            video_encoder="libx264",
+            max_workers=2
+        )
+        clip = {
+            "resourceId": "test_video",
+            "startTime": 2.0,
+            "duration": 8.0,
+            "transitions": {"in": {"type": "fade", "duration": 1.0}}
+        }
+        timeline_data = {"layers": [{"type": "video", "clips": [clip]}]}
+
+        layers = [([], None, {'start_time': 2.0, 'duration': 8.0})]
+        assert service._shard_count(layers, 10.0) == 2
+        assert service._shard_count(layers, 9.0) == 1
+        layers[0][2]['slide_in'] = {'duration': 1.0, 'direction': 'left'}
+        assert service._shard_count(layers, 10.0) == 1
+
+        progress = []
+        output_path = service.export_timeline(
+            timeline_data, "test_export_sharded.mp4", fps=24, width=320, height=240,
+            progress_callback=progress.append
+        )
+
+        assert progress == sorted(progress) and progress[-1] == 1.0
+        assert 9.9 <= get_video_duration(output_path) <= 10.1
+        assert has_audio_stream(output_path)
+
+        # Black before the clip, then the red clip fading in, and still
+        # there after the shard boundary at 5s
+        def red_at(time):
+            frame = subprocess.run(
+                ['ffmpeg', '-v', 'error', '-ss', str(time), '-i', output_path,
+                 '-frames:v', '1', '-f', 'rawvideo', '-pix_fmt', 'rgb24', '-'],
+                capture_output=True, check=True
+            ).stdout
+            return np.frombuffer(frame, dtype=np.uint8).reshape(240, 320, 3)[120, 160, 0]
+        assert red_at(1.0) < 20
+        assert 40 < red_at(2.5) < 180
+        assert red_at(4.5) > 200
+        assert red_at(5.5) > 200
+
+    def test_shard_layers_seek(self):
+        """Test that shards seek clips' inputs to the shard instead of decoding from the clip start"""
+        source = {'path': 'src.mp4', 'decoder_args': [], 'start': 3.0, 'duration': 20.0}
+        input_args = self.service._source_input_args([], 'src.mp4', 3.0, 20.0)
+        layers = [(input_args, "fps=24,format=yuv420p", {'start_time': 0.0, 'duration': 20.0, 'source': source})]
+
+        seeks = []
+        for shard_start in (0.0, 5.0, 10.0, 15.0):
+            (shard_args, filter_chain, clip_info), = self.service._shard_layers(
+                layers, shard_start, shard_start + 5.0
+            )
+            seeks.append((shard_args[shard_args.index('-ss') + 1], shard_args[shard_args.index('-t') + 1]))
+            if shard_start:
+                # Frames reach the clip's filters at clip-local times
+                assert filter_chain == (
+                    f"setpts=PTS+{shard_start}/TB,fps=24,format=yuv420p,setpts=PTS-{shard_start}/TB"
+                )
+                assert clip_info['start_time'] == 0.0
+                assert clip_info['source']['start'] == 3.0 + shard_start
+        assert seeks == [('3.0', '20.0'), ('8.0', '15.0'), ('13.0', '10.0'), ('18.0', '5.0')]
+        assert layers[0][2]['source']['start'] == 3.0
+
+        # Clips starting inside the shard are only shifted
+        (_, filter_chain, clip_info), = self.service._shard_layers(
+            [(input_args, "fps=24", {'start_time': 7.0, 'duration': 20.0, 'source': source})], 5.0, 10.0
+        )
+        assert (filter_chain, clip_info['start_time']) == ("fps=24", 2.0)
+
+    def test_export_segmented(self):
+        """Test exporting an HLS playlist with fMP4 segments"""
+        self.create_test_video("test_video.mp4", duration=3)
+        
+        timeline_data = {
+            "duration": 3.0,
+            "layers": [
+                {
+                    "type": "video",
+                    "visible": True,
+                    "clips": [
+                        {
+                            "resourceId": "test_video",
+                            "startTime": 0.0,
+                            "duration": 3.0,
+                            "trimStart": 0.0,
+                            "trimEnd": 0.0
+                        }
+                    ]
+                },
+                {
+                    "type": "audio",
+                    "visible": True,
+                    "clips": [
+                        {
+                            "resourceId": "test_video",
+                            "startTime": 0.0,
+                            "duration": 3.0
+                        }
+                    ]
+                }
+            ]
+        }
+        
+        playlist_path = self.service.export_timeline(
+            timeline_data=timeline_data,
+            output_path="test_export_hls.mp4",
+            fps=24, width=640, height=480,
+            segment=True, segment_duration=1.0
+        )
+        
+        assert playlist_path.endswith("test_export_hls.m3u8")
+        with open(playlist_path) as f:
+            playlist = f.read()
+        assert "#EXT-X-MAP:URI=\"test_export_hls_init.mp4\"" in playlist
+        assert "#EXT-X-ENDLIST" in playlist
+        
+        segments = sorted(Path(self.output_dir).glob("test_export_hls_*.m4s"))
+        assert len(segments) >= 3
+        assert has_audio_stream(playlist_path)
+        assert 2.5 <= get_video_duration(playlist_path) <= 3.5
+        
+        self.service.cleanup_export(playlist_path)
+        assert not os.path.exists(playlist_path)
+        assert not list(Path(self.output_dir).glob("test_export_hls_*"))
+    
+    def test_export_reports_encode_progress(self):
+        """Test that the composite encode reports progress as it runs"""
+        self.create_test_video("test_video.mp4", duration=2)
+        
+        timeline_data = {
+            "duration": 2.0,
+            "layers": [
+                {
+                    "type": "video",
+                    "visible": True,
+                    "clips": [
+                        {
+                            "resourceId": "test_video",
+                            "startTime": 0.0,
+                            "duration": 2.0,
+                            "trimStart": 0.5,
+                            "trimEnd": 0.0
+                        }
+                    ]
+                }
+            ]
+        }
+        
+        progress_values = []
+        self.service.export_timeline(
+            timeline_data=timeline_data,
+            output_path="test_export_progress.mp4",
+            fps=24, width=640, height=480,
+            progress_callback=progress_values.append
+        )
+        
+        assert progress_values == sorted(progress_values)
+        assert any(0.8 < value < 1.0 for value in progress_values)
+        assert progress_values[-1] == 1.0
+    
+    def test_run_ffmpeg_with_progress_kills_on_callback_error(self):
+        """Test that ffmpeg is stopped when the progress callback raises"""
+        cmd = [
+            'ffmpeg', '-y', '-re',
+            '-f', 'lavfi', '-i', 'color=c=black:s=64x64:d=30:r=24',
+            '-f', 'null', '-'
+        ]
+        
+        def cancel(progress):
+            raise RuntimeError("cancelled")
+        
+        with pytest.raises(RuntimeError, match="cancelled"):
+            self.service._run_ffmpeg_with_progress(cmd, 30, cancel)
+    
     def test_export_with_trimmed_clip(self):
         """Test exporting timeline with trimmed video clip"""
         # Create test video (file saved with resource_id as name)
@@ -334,6 +660,52 @@ class TestExportService:
         duration = get_video_duration(output_path)
         assert 2.8 <= duration <= 3.2  # Allow small margin
 
+    def test_export_with_zoom_transitions(self):
+        """Test exporting video with zoom transitions (dict format)"""
+        self.create_test_video("test_video_zoom.mp4", duration=2)
+        
+        timeline_data = {
+            "duration": 2.0,
+            "layers": [
+                {
+                    "type": "video",
+                    "visible": True,
+                    "clips": [
+                        {
+                            "resourceId": "test_video_zoom",
+                            "startTime": 0.0,
+                            "duration": 2.0,
+                            "trimStart": 0.0,
+                            "trimEnd": 0.0,
+                            "transitions": {
+                                "in": {
+                                    "type": "zoom",
+                                    "duration": 0.5,
+                                    "properties": {"direction": "in"}
+                                },
+                                "out": {
+                                    "type": "zoom",
+                                    "duration": 0.5,
+                                    "properties": {"direction": "out"}
+                                }
+                            }
+                        }
+                    ]
+                }
+            ]
+        }
+        
+        output_path = self.service.export_timeline(
+            timeline_data=timeline_data,
+            output_path="test_export_zoom.mp4",
+            resolution="480p",
+            fps=24
+        )
+        
+        assert os.path.exists(output_path)
+        assert get_video_dimensions(output_path) == (854, 480)
+        assert 1.8 <= get_video_duration(output_path) <= 2.2
+
     def test_export_with_slide_transitions(self):
         """Test exporting video with slide transitions"""
         # Create test video
@@ -593,6 +965,28 @@ class TestExportService:
         # Verify output
         assert os.path.exists(output_path)
     
+    def test_export_empty_text(self):
+        """Test that blank text clips are left out of the composite"""
+        text_clip = {"startTime": 0.0, "duration": 2.0, "data": {"text": "   ", "fontSize": 40}}
+        assert self.service._plan_text_clip(
+            {'clip': text_clip, 'layer_index': 0}, 640, 480, 640, 480, 24, []
+        ) is None
+
+        timeline_data = {
+            "duration": 2.0,
+            "layers": [{"type": "text", "visible": True, "clips": [text_clip]}]
+        }
+        output_path = self.service.export_timeline(
+            timeline_data=timeline_data,
+            output_path="test_export_empty_text.mp4",
+            resolution="480p",
+            fps=24
+        )
+
+        assert os.path.exists(output_path)
+        info = get_video_info(output_path)
+        assert abs(float(info['format']['duration']) - 2.0) < 0.2
+
     def test_export_with_progress_callback(self):
         """Test export with progress callback"""
         # Create test video
@@ -715,6 +1109,474 @@ class TestExportService:
         duration = get_video_duration(output_path)
         assert duration > 0
     
+    def test_composite_sequentially(self):
+        """Test overlaying clips one run at a time, skipping clips that fail"""
+        video_path = self.create_test_video("test_video.mp4", duration=1, has_audio=False)
+        clip_info = {'path': video_path, 'start_time': 0.5, 'duration': 1.0}
+        missing_info = dict(clip_info, path=os.path.join(self.uploads_dir, "missing.mp4"))
+        temp_files = []
+
+        output_path = self.service._composite_sequentially(
+            [missing_info, clip_info], temp_files, 320, 240, 24, 2.0
+        )
+        assert output_path in temp_files
+        assert 1.9 <= get_video_duration(output_path) <= 2.1
+        assert get_video_dimensions(output_path) == (320, 240)
+
+        # Nothing to overlay: the black background alone
+        output_path = self.service._composite_sequentially(
+            [missing_info], temp_files, 320, 240, 24, 2.0
+        )
+        assert Path(output_path).name.startswith("bg_")
+        assert 1.9 <= get_video_duration(output_path) <= 2.1
+
+        for temp_file in temp_files:
+            if os.path.exists(temp_file):
+                os.unlink(temp_file)
+
+    def test_build_overlay_filter_labels(self):
+        """Test that overlay filters chain through the given labels"""
+        clip_info = {
+            'path': 'clip.mov', 'start_time': 1.5, 'duration': 2.0,
+            'overlay_x': 10, 'overlay_y': 20, 'has_alpha': True
+        }
+        
+        overlay_filter = self.service._build_overlay_filter(
+            clip_info, "[v0]", "[2:v]", "[v1]", 1280, 720, 30
+        )
+        
+        assert overlay_filter.startswith("[2:v]setpts=PTS+1.5/TB")
+        assert "[v0][ovv1]overlay=10:20" in overlay_filter
+        assert overlay_filter.endswith("[v1]")
+    
+    def test_plan_video_clip(self):
+        """Test planning a clip as a source input with its filter chain"""
+        self.create_test_video("test_video.mp4", duration=2)
+        video_item = {
+            'clip': {
+                "resourceId": "test_video",
+                "startTime": 1.0,
+                "duration": 1.0,
+                "trimStart": 0.5,
+                "scale": 0.5,
+                "transitions": {"in": {"type": "fade", "duration": 0.5}}
+            },
+            'type': 'video',
+            'layer_index': 0
+        }
+        
+        plan = self.service._plan_video_clip(video_item, 640, 480, 640, 480, 24)
+        
+        assert plan['input_args'][-6:-2] == ['-ss', '0.5', '-i', str(plan['media_path'])]
+        assert plan['input_args'][-2:] == ['-t', '1.0']
+        assert plan['filters'][0] == "scale=320:240"
+        assert "fade=t=in:st=0:d=0.5" in plan['filters']
+        assert plan['needs_alpha'] is True
+        assert plan['clip_info']['start_time'] == 1.0
+        
+        chain = self.service._plan_filter_chain(plan)
+        assert chain.startswith("scale=320:240,")
+        assert chain.endswith(",format=rgba")
+        
+        assert self.service._plan_video_clip(
+            {'clip': {"resourceId": "missing"}, 'type': 'video', 'layer_index': 0},
+            640, 480, 640, 480, 24
+        ) is None
+    
+    def test_plan_rotated_video_clip(self):
+        """Test that a source with a quarter-turn display rotation is still scaled"""
+        video_path = self.create_test_video("source.mp4", duration=2, has_audio=False)
+        rotated_path = os.path.join(self.uploads_dir, "rotated.mp4")
+        subprocess.run(
+            ['ffmpeg', '-y', '-display_rotation', '90', '-i', video_path, '-c', 'copy', rotated_path],
+            capture_output=True, check=True
+        )
+        assert self.service._get_media_info(video_path)['rotation'] == 0
+        assert self.service._get_media_info(rotated_path)['rotation'] == 90
+
+        clip = {"resourceId": "rotated", "startTime": 0.0, "duration": 1.5, "trimStart": 0.5}
+        plan = self.service._plan_video_clip(
+            {'clip': clip, 'type': 'video', 'layer_index': 0}, 640, 480, 640, 480, 24
+        )
+
+        # Decoded upright as 480x640, so it is scaled back to its 640x480 box
+        assert plan['filters'][0] == "scale=640:480"
+
+        output_path = self.service.export_timeline(
+            timeline_data={"duration": 1.5, "layers": [{"type": "video", "clips": [clip]}]},
+            output_path="test_export_rotated.mp4",
+            fps=24,
+            width=640,
+            height=480
+        )
+        assert get_video_dimensions(output_path) == (640, 480)
+
+    def test_plan_video_clip_whole_turns(self):
+        """Test that rotating by whole turns leaves the clip untransformed"""
+        self.create_test_video("test_video.mp4", duration=1, has_audio=False)
+        video_item = {
+            'clip': {"resourceId": "test_video", "startTime": 0, "duration": 1.0, "rotation": -360},
+            'type': 'video',
+            'layer_index': 0
+        }
+
+        plan = self.service._plan_video_clip(video_item, 640, 480, 640, 480, 24)
+        assert not any(f.startswith("rotate") for f in plan['filters'])
+        assert plan['is_passthrough'] is True
+
+        video_item['clip']['rotation'] = 450
+        plan = self.service._plan_video_clip(video_item, 640, 480, 640, 480, 24)
+        assert any(f.startswith("transpose=clock") for f in plan['filters'])
+        assert plan['is_passthrough'] is False
+
+    def test_plan_video_clip_quarter_turns(self):
+        """Test that quarter turns are lossless and framed like rotate"""
+        self.create_test_video("test_video.mp4", duration=1, has_audio=False)
+        video_item = {
+            'clip': {"resourceId": "test_video", "startTime": 0, "duration": 1.0, "rotation": 270},
+            'type': 'video',
+            'layer_index': 0
+        }
+
+        plan = self.service._plan_video_clip(video_item, 1280, 720, 1280, 720, 24)
+        # The turned frame is cropped and padded back to the clip's box
+        assert "transpose=cclock,crop=480:480,format=yuva420p,pad=640:480:80:0:color=black@0" in plan['filters']
+        clip_info = plan['clip_info']
+        assert (clip_info['clip_width'], clip_info['clip_height']) == (640, 480)
+        assert (clip_info['overlay_x'], clip_info['overlay_y']) == (320, 120)
+
+        video_item['clip']['rotation'] = 180
+        plan = self.service._plan_video_clip(video_item, 1280, 720, 1280, 720, 24)
+        assert "hflip,vflip" in plan['filters']
+        assert (plan['clip_info']['clip_width'], plan['clip_info']['clip_height']) == (640, 480)
+
+        # Other angles are still interpolated
+        video_item['clip']['rotation'] = 45
+        plan = self.service._plan_video_clip(video_item, 1280, 720, 1280, 720, 24)
+        assert f"rotate={45 * 3.14159265359 / 180}:c=none" in plan['filters']
+
+    def test_plan_video_clip_constant_keyframes(self):
+        """Test that keyframes holding their values are applied as static transforms"""
+        self.create_test_video("test_video.mp4", duration=1, has_audio=False)
+        properties = {"scale": 0.5, "position": {"x": 10, "y": 20}, "rotation": 90, "opacity": 0.5}
+        clip = {
+            "resourceId": "test_video", "startTime": 0, "duration": 1.0,
+            "keyframes": [
+                {"time": 0, "properties": properties},
+                {"time": 1, "properties": properties}
+            ]
+        }
+        video_item = {'clip': clip, 'type': 'video', 'layer_index': 0}
+
+        plan = self.service._plan_video_clip(video_item, 640, 480, 640, 480, 24, temp_files=[])
+        assert "scale=320:240" in plan['filters']
+        assert any(f.startswith("transpose=clock") for f in plan['filters'])
+        assert "colorchannelmixer=aa=0.5" in plan['alpha_filters']
+        assert (plan['clip_info']['overlay_x'], plan['clip_info']['overlay_y']) == (10, 20)
+        assert not any(f.startswith("sendcmd") for f in plan['filters'])
+
+        # Only the property that changes is animated
+        clip['keyframes'][1]['properties'] = dict(properties, scale=1)
+        plan = self.service._plan_video_clip(video_item, 640, 480, 640, 480, 24, temp_files=[])
+        assert any(f.startswith("sendcmd") for f in plan['filters'])
+        assert "colorchannelmixer=aa=0.5" in plan['alpha_filters']
+
+    def test_plan_video_clip_opacity(self):
+        """Test that translucent clips are blended through their alpha"""
+        self.create_test_video("test_video.mp4", duration=1, has_audio=False)
+        video_item = {
+            'clip': {"resourceId": "test_video", "startTime": 0, "duration": 1.0, "opacity": 0.5},
+            'type': 'video',
+            'layer_index': 0
+        }
+
+        plan = self.service._plan_video_clip(video_item, 640, 480, 640, 480, 24)
+
+        assert plan['needs_alpha'] is True
+        assert plan['is_passthrough'] is False
+        assert self.service._plan_filter_chain(plan).endswith(",format=rgba,colorchannelmixer=aa=0.5")
+
+        # Opaque clips filling the canvas are copied as they are
+        video_item['clip']['opacity'] = 1
+        plan = self.service._plan_video_clip(video_item, 640, 480, 640, 480, 24)
+        assert plan['needs_alpha'] is False
+        assert plan['is_passthrough'] is True
+
+        # Half-transparent red over the black canvas comes out half as bright
+        video_item['clip']['opacity'] = 0.5
+        timeline_data = {
+            "layers": [{"type": "video", "clips": [video_item['clip']]}],
+            "resolution": {"width": 640, "height": 480}
+        }
+        output_path = self.service.export_timeline(timeline_data, "opacity.mp4", fps=24)
+        frame = subprocess.run(
+            ['ffmpeg', '-v', 'error', '-ss', '0.5', '-i', output_path, '-frames:v', '1',
+             '-f', 'rawvideo', '-pix_fmt', 'rgb24', '-'],
+            capture_output=True, check=True
+        ).stdout
+        red = np.frombuffer(frame, dtype=np.uint8).reshape(480, 640, 3)[240, 320, 0]
+        assert 100 < red < 150
+
+    def test_export_keyframed_transform(self):
+        """Test that keyframed scale and position animate the exported clip"""
+        self.create_test_video("test_video.mp4", duration=2, has_audio=False)
+        clip = {
+            "resourceId": "test_video",
+            "startTime": 0,
+            "duration": 2.0,
+            "keyframes": [
+                {"time": 0, "properties": {"scale": 0.25, "position": {"x": 20, "y": 20}}},
+                {"time": 2, "properties": {"scale": 0.5, "position": {"x": 300, "y": 220}}}
+            ]
+        }
+        timeline_data = {
+            "layers": [{"type": "video", "clips": [clip]}],
+            "resolution": {"width": 640, "height": 480}
+        }
+
+        temp_files = []
+        plan = self.service._plan_video_clip(
+            {'clip': clip, 'type': 'video', 'layer_index': 0}, 640, 480, 640, 480, 24,
+            temp_files=temp_files
+        )
+        assert plan['filters'][0].startswith("sendcmd=f=")
+        with open(temp_files[0]) as f:
+            script = f.read()
+        assert script.startswith(f"0.000000 [enter] {plan['clip_info']['filter_id']}_scale w 160,")
+        os.unlink(temp_files[0])
+
+        output_path = self.service.export_timeline(timeline_data, "keyframes.mp4", fps=24)
+        frames = subprocess.run(
+            ['ffmpeg', '-v', 'error', '-i', output_path, '-f', 'rawvideo', '-pix_fmt', 'rgb24', '-'],
+            capture_output=True, check=True
+        ).stdout
+        frames = np.frombuffer(frames, dtype=np.uint8).reshape(-1, 480, 640, 3)
+
+        # Red box bounds at the first frame and halfway through
+        def box(index):
+            ys, xs = np.nonzero(frames[index, :, :, 0] > 128)
+            return xs.min(), ys.min(), xs.max() - xs.min() + 1, ys.max() - ys.min() + 1
+        assert box(0) == (20, 20, 160, 120)
+        assert box(24) == (160, 120, 240, 180)
+
+    def test_export_keyframed_opacity(self):
+        """Test that keyframed opacity fades the exported clip"""
+        self.create_test_video("test_video.mp4", duration=2, has_audio=False)
+        clip = {
+            "resourceId": "test_video",
+            "startTime": 0,
+            "duration": 2.0,
+            "keyframes": [
+                {"time": 0, "properties": {"opacity": 1}},
+                {"time": 2, "properties": {"opacity": 1}}
+            ]
+        }
+        video_item = {'clip': clip, 'type': 'video', 'layer_index': 0}
+
+        # Keyframes that keep the clip opaque leave it on the copy path
+        plan = self.service._plan_video_clip(video_item, 640, 480, 640, 480, 24, temp_files=[])
+        assert plan['is_passthrough'] is True
+
+        clip['keyframes'][0]['properties']['opacity'] = 0
+        timeline_data = {
+            "layers": [{"type": "video", "clips": [clip]}],
+            "resolution": {"width": 640, "height": 480}
+        }
+        output_path = self.service.export_timeline(timeline_data, "opacity_keyframes.mp4", fps=24)
+        frames = subprocess.run(
+            ['ffmpeg', '-v', 'error', '-i', output_path, '-f', 'rawvideo', '-pix_fmt', 'rgb24', '-'],
+            capture_output=True, check=True
+        ).stdout
+        red = np.frombuffer(frames, dtype=np.uint8).reshape(-1, 480, 640, 3)[:, 240, 320, 0]
+
+        assert red[0] < 10
+        assert 110 < red[24] < 145
+        assert red[-1] > 220
+
+    def test_export_keyframed_rotation(self):
+        """Test that keyframed rotation turns the exported clip"""
+        self.create_test_video("test_video.mp4", duration=2, has_audio=False)
+        clip = {
+            "resourceId": "test_video",
+            "startTime": 0,
+            "duration": 2.0,
+            "scale": 0.25,
+            "keyframes": [
+                {"time": 0, "properties": {"rotation": 0}},
+                {"time": 2, "properties": {"rotation": 0}}
+            ]
+        }
+        video_item = {'clip': clip, 'type': 'video', 'layer_index': 0}
+
+        # Keyframes that never turn the clip leave rotation out
+        plan = self.service._plan_video_clip(video_item, 640, 480, 640, 480, 24, temp_files=[])
+        assert not any(f.startswith(("rotate", "sendcmd")) for f in plan['filters'])
+
+        clip['keyframes'][1]['properties']['rotation'] = 90
+        timeline_data = {
+            "layers": [{"type": "video", "clips": [clip]}],
+            "resolution": {"width": 640, "height": 480}
+        }
+        output_path = self.service.export_timeline(timeline_data, "rotation.mp4", fps=24)
+        frames = subprocess.run(
+            ['ffmpeg', '-v', 'error', '-i', output_path, '-f', 'rawvideo', '-pix_fmt', 'rgb24', '-'],
+            capture_output=True, check=True
+        ).stdout
+        red = np.frombuffer(frames, dtype=np.uint8).reshape(-1, 480, 640, 3)[..., 0] > 128
+
+        # The 160x120 clip turns within its own frame: upright at the start,
+        # close to a 120x120 square at the end
+        assert red[0].sum() == 160 * 120
+        assert red[24].sum() < red[0].sum()
+        assert 13000 < red[-1].sum() < 15500
+
+    def test_build_composite_command_filter_chains(self):
+        """Test that per-clip filter chains feed the overlay graph"""
+        clip_info = {'start_time': 0.0, 'duration': 1.0, 'has_alpha': True}
+        
+        cmd = self.service._build_composite_command(
+            [
+                (['-i', 'a.mp4'], "scale=320:240,format=rgba", clip_info),
+                (['-i', 'b.mov'], None, clip_info)
+            ],
+            640, 480, 24, 1.0, "mix.wav", ['out.mp4']
+        )
+        
+        graph = cmd[cmd.index('-filter_complex') + 1]
+        assert "[1:v]scale=320:240,format=rgba[c0]" in graph
+        assert "[c0]setpts" in graph
+        assert "[2:v]setpts" in graph
+        assert cmd[cmd.index('-map') + 1] == "[v1]"
+        assert ['-map', '3:a'] == cmd[cmd.index('-map') + 2:cmd.index('-map') + 4]
+        assert cmd[-1] == 'out.mp4'
+
+    def test_build_composite_command_single_clip(self):
+        """Test that a lone clip covering the whole output skips the canvas"""
+        clip_info = {'start_time': 0.0, 'duration': 2.0, 'is_full_canvas': True, 'has_alpha': False}
+
+        cmd = self.service._build_composite_command(
+            [(['-i', 'a.mp4'], "scale=640:480,format=yuv420p", clip_info)],
+            640, 480, 24, 2.0, "mix.wav", ['out.mp4']
+        )
+        assert cmd.count('-i') == 2 and 'lavfi' not in cmd
+        assert cmd[cmd.index('-filter_complex') + 1] == "[0:v]scale=640:480,format=yuv420p[v0]"
+        assert cmd[cmd.index('-map'):cmd.index('-map') + 4] == ['-map', '[v0]', '-map', '1:a']
+
+        # Starting late, ending early or translucent: composited as usual
+        for changes in ({'start_time': 0.5}, {'duration': 1.0}, {'has_alpha': True}):
+            cmd = self.service._build_composite_command(
+                [(['-i', 'a.mp4'], None, dict(clip_info, **changes))],
+                640, 480, 24, 2.0, None, ['out.mp4']
+            )
+            assert 'lavfi' in cmd
+
+    def test_build_composite_command_shared_source(self):
+        """Test that clips split from one source share a single input"""
+        def layer(start_time, source_start, duration=2.0, path='a.mp4'):
+            source = {'path': path, 'decoder_args': [], 'start': source_start, 'duration': duration}
+            input_args = self.service._source_input_args([], path, source_start, duration)
+            clip_info = {'start_time': start_time, 'duration': duration, 'source': source}
+            return (input_args, "scale=320:240", clip_info)
+
+        layers = [layer(0.0, 1.0), layer(2.0, 3.0), layer(4.0, 5.0, path='b.mp4')]
+        cmd = self.service._build_composite_command(
+            layers, 640, 480, 24, 6.0, "mix.wav", ['out.mp4']
+        )
+
+        assert cmd.count('-i') == 4
+        assert cmd[cmd.index('a.mp4') - 3:cmd.index('a.mp4') + 3] == ['-ss', '1.0', '-i', 'a.mp4', '-t', '4.0']
+        graph = cmd[cmd.index('-filter_complex') + 1]
+        assert "[1:v]split=2[s1_0][s1_1]" in graph
+        assert "[s1_1]trim=start=2.0:duration=2.0,setpts=PTS-STARTPTS,scale=320:240[c1]" in graph
+        assert "[2:v]scale=320:240[c2]" in graph
+        assert ['-map', '3:a'] == cmd[cmd.index('-map') + 2:cmd.index('-map') + 4]
+
+        # Out of step on the timeline, or overlapping in the source: separate inputs
+        assert self.service._shared_source_groups([layer(0.0, 1.0), layer(3.0, 3.0)]) == []
+        assert self.service._shared_source_groups([layer(0.0, 1.0), layer(1.0, 2.0)]) == []
+        assert self.service._shared_source_groups(layers) == [[0, 1]]
+
+    def test_has_clip_below(self):
+        """Test detecting clips composited beneath another clip"""
+        bottom = {'clip': {'startTime': 0, 'duration': 2}, 'layer_index': 0}
+        top = {'clip': {'startTime': 1, 'duration': 2}, 'layer_index': 1}
+        later = {'clip': {'startTime': 3, 'duration': 1}, 'layer_index': 1}
+        items = [bottom, top, later]
+        
+        assert not self.service._has_clip_below(bottom, items)
+        assert self.service._has_clip_below(top, items)
+        assert not self.service._has_clip_below(later, items)
+    
+    def test_export_image_clip(self):
+        """Test that a still image is decoded once and held for its duration"""
+        from PIL import Image
+        Image.new('RGB', (640, 480), (0, 0, 255)).save(os.path.join(self.uploads_dir, "still.jpg"))
+        clip = {"resourceId": "still", "startTime": 0.5, "duration": 1.5}
+
+        plan = self.service._plan_video_clip(
+            {'clip': clip, 'type': 'image', 'layer_index': 0}, 640, 480, 640, 480, 24
+        )
+        assert plan['input_args'] == ['-i', str(plan['media_path'])]
+        # Shown at its own size, so it needs no scale
+        assert plan['filters'][0] == "loop=loop=-1:size=1"
+        assert "trim=duration=1.5" in plan['filters']
+
+        timeline_data = {
+            "layers": [{"type": "image", "clips": [clip]}],
+            "resolution": {"width": 640, "height": 480}
+        }
+        output_path = self.service.export_timeline(timeline_data, "still.mp4", fps=24)
+        frames = subprocess.run(
+            ['ffmpeg', '-v', 'error', '-i', output_path, '-f', 'rawvideo', '-pix_fmt', 'rgb24', '-'],
+            capture_output=True, check=True
+        ).stdout
+        blue = np.frombuffer(frames, dtype=np.uint8).reshape(-1, 480, 640, 3)[:, 240, 320, 2]
+        assert len(blue) == 48
+        assert (blue[:12] < 20).all() and (blue[12:] > 200).all()
+
+    def test_export_letterboxed_clip(self):
+        """Test that a clip smaller than the canvas is padded onto black"""
+        self.create_test_video("test_video.mp4", duration=2)
+        
+        timeline_data = {
+            "duration": 2.0,
+            "layers": [
+                {
+                    "type": "video",
+                    "visible": True,
+                    "clips": [
+                        {
+                            "resourceId": "test_video",
+                            "startTime": 0.0,
+                            "duration": 2.0,
+                            "trimStart": 0.0,
+                            "trimEnd": 0.0,
+                            "scale": 0.5
+                        }
+                    ]
+                }
+            ]
+        }
+        
+        processed = self.service._process_video_clip(
+            0, {'clip': timeline_data["layers"][0]["clips"][0], 'type': 'video', 'layer_index': 0},
+            640, 480, 640, 480, 24, [], letterbox=True
+        )
+        assert processed['is_full_canvas'] is True
+        assert processed['has_alpha'] is False
+        assert get_video_dimensions(processed['path']) == (640, 480)
+        
+        output_path = self.service.export_timeline(
+            timeline_data=timeline_data,
+            output_path="test_export_letterbox.mp4",
+            fps=24,
+            width=640,
+            height=480
+        )
+        
+        assert os.path.exists(output_path)
+        assert get_video_dimensions(output_path) == (640, 480)
+    
     def test_find_media_file(self):
         """Test finding media files by resource ID"""
         # Create test video
@@ -729,6 +1591,389 @@ class TestExportService:
         not_found = self.service._find_media_file("nonexistent")
         assert not_found is None
     
+    def test_find_media_file_cached(self):
+        """Test that resolved paths are cached and dropped once the file is gone"""
+        video_path = self.create_test_video("test_resource.mp4", duration=1)
+        
+        found_path = self.service._find_media_file("test_resource")
+        assert self.service._media_path_cache[("test_resource", "")] == found_path
+        
+        os.remove(video_path)
+        assert self.service._find_media_file("test_resource") is None
+        assert ("test_resource", "") not in self.service._media_path_cache
+    
+    def test_find_media_file_directory_index(self):
+        """Test lookups through the directory index, including new files"""
+        project_dir = os.path.join(self.uploads_dir, "project1")
+        os.makedirs(project_dir)
+        
+        # Prime the index before the file exists
+        assert self.service._find_media_file("clip_a") is None
+        
+        open(os.path.join(project_dir, "clip_a.png"), 'wb').close()
+        open(os.path.join(project_dir, "clip_a.mp4"), 'wb').close()
+        
+        # New entries invalidate the index; .mp4 outranks .png
+        found_path = self.service._find_media_file("clip_a")
+        assert found_path == Path(project_dir) / "clip_a.mp4"
+        
+        # The URL form looks in the named project directory
+        found_path = self.service._find_media_file(
+            "other_id", {"url": "/api/media/project/project1/clip_a/file"}
+        )
+        assert found_path == Path(project_dir) / "clip_a.mp4"
+    
+    def test_get_media_info_cached(self):
+        """Test that media info is probed once per unchanged file"""
+        video_path = self.create_test_video("test_video.mp4", duration=1)
+        
+        info = self.service._get_media_info(video_path)
+        assert info['width'] == 640
+        assert len(self.service._media_info_cache) == 1
+        
+        # Mutating the returned dict must not affect the cache
+        info['width'] = 0
+        assert self.service._get_media_info(video_path)['width'] == 640
+        assert len(self.service._media_info_cache) == 1
+    
+    def test_prefetch_media_info(self):
+        """Test that exported clips' media is probed up front"""
+        self.create_test_video("video_a.mp4", duration=1)
+        self.create_test_video("video_b.mp4", duration=1, has_audio=False)
+        self.create_test_audio("muted_audio.mp3", duration=1)
+
+        resolved = self.service._prefetch_media_info([
+            {"type": "video", "clips": [
+                {"resourceId": "video_a"}, {"resourceId": "video_b"}, {"resourceId": "video_a"}
+            ]},
+            {"type": "video", "visible": False, "clips": [{"resourceId": "video_a"}]},
+            {"type": "audio", "muted": True, "clips": [{"resourceId": "muted_audio"}]},
+            {"type": "text", "clips": [{"resourceId": "text_1"}]},
+        ])
+
+        # Each resource is looked up once and handed on to clip collection
+        assert resolved == {
+            ("video_a", ""): Path(self.uploads_dir) / "video_a.mp4",
+            ("video_b", ""): Path(self.uploads_dir) / "video_b.mp4",
+        }
+
+        cached_paths = {key[0] for key in self.service._media_info_cache}
+        assert cached_paths == {
+            os.path.abspath(os.path.join(self.uploads_dir, name))
+            for name in ("video_a.mp4", "video_b.mp4")
+        }
+
+    def test_clip_media_path(self):
+        """Test that collected clips reuse the media file looked up when collected"""
+        video_path = self.create_test_video("test_video.mp4", duration=1, has_audio=False)
+        clip = {"resourceId": "test_video"}
+        collected = Path(self.uploads_dir) / "collected.mp4"
+
+        assert self.service._clip_media_path({'clip': clip, 'media_path': collected}) == collected
+        assert self.service._clip_media_path({'clip': clip, 'media_path': None}) is None
+        assert self.service._clip_media_path({'clip': clip}) == Path(video_path)
+
+    def test_calculate_content_duration(self):
+        """Test that content duration is the latest clip end across layers"""
+        layers = [
+            {"type": "video", "clips": [{"startTime": 0, "duration": 2}, {"startTime": 3, "duration": 1.5}]},
+            {"type": "text", "clips": [{"startTime": 1, "duration": 2}]},
+            {"type": "audio"}
+        ]
+
+        assert self.service._calculate_content_duration(layers) == 4.5
+        assert self.service._calculate_content_duration([]) == 0.0
+        assert self.service._calculate_content_duration([{"type": "video", "clips": []}]) == 0.0
+
+    def test_process_audio_clip(self):
+        """Test that audio clips are decoded straight to stereo PCM samples"""
+        self.create_test_audio("test_audio.mp3", duration=2)
+
+        processed = self.service._process_audio_clip(0, {
+            'clip': {"resourceId": "test_audio", "startTime": 1.5, "duration": 1.0, "trimStart": 0.5},
+            'type': 'audio',
+            'layer_index': 0
+        })
+
+        assert processed['start_time'] == 1.5
+        assert processed['samples'].dtype == np.int16
+        assert processed['samples'].shape[1] == 2
+        assert abs(len(processed['samples']) - 48000) < 2048
+        assert np.abs(processed['samples']).max() > 1000
+
+    def test_process_audio_clips_shared_source(self):
+        """Test that split audio clips are cut from one decode of their source"""
+        self.create_test_audio("test_audio.mp3", duration=3)
+        audio_clips = [
+            {'clip': {"resourceId": "test_audio", "startTime": 0.0, "duration": 1.0, "trimStart": 0.0},
+             'type': 'audio', 'layer_index': 0},
+            {'clip': {"resourceId": "test_audio", "startTime": 1.0, "duration": 1.0, "trimStart": 1.0,
+                      "volume": 0.5},
+             'type': 'audio', 'layer_index': 0},
+            {'clip': {"resourceId": "test_audio", "startTime": 2.0, "duration": 0.5, "trimStart": 2.5},
+             'type': 'audio', 'layer_index': 1}
+        ]
+
+        assert self.service._shared_audio_groups(audio_clips) == [[0, 1, 2]]
+        assert self.service._shared_audio_groups(audio_clips[:1]) == []
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            processed = self.service._process_audio_clips(audio_clips, executor)
+
+        assert [entry['start_time'] for entry in processed] == [0.0, 1.0, 2.0]
+        assert [len(entry['samples']) for entry in processed] == [48000, 48000, 24000]
+        single = self.service._process_audio_clip(1, audio_clips[1])['samples']
+        assert np.abs(processed[1]['samples'][:len(single)].astype(np.int32) - single).max() < 2048
+
+    def test_mix_audio_clips(self):
+        """Test that audio clips are summed at their offsets and scaled by 1/N"""
+        output_path = os.path.join(self.test_dir, "mixed.wav")
+        self.service._mix_audio_clips([
+            {'samples': np.full((48000, 2), 1000, dtype=np.int16), 'start_time': 0.0},
+            {'samples': np.full((48000, 2), 3000, dtype=np.int16), 'start_time': 0.5}
+        ], output_path)
+        
+        with wave.open(output_path, 'rb') as wav_file:
+            assert wav_file.getframerate() == 48000
+            mixed = np.frombuffer(
+                wav_file.readframes(wav_file.getnframes()), dtype=np.int16
+            ).reshape(-1, 2)
+        
+        assert len(mixed) == 72000
+        assert mixed[0, 0] == 500
+        assert mixed[30000, 0] == 2000
+        assert mixed[60000, 1] == 1500
+
+        # A single clip is written unscaled after silence up to its offset
+        samples = np.arange(-4000, 4000, dtype=np.int16).reshape(-1, 2)
+        self.service._mix_audio_clips([{'samples': samples, 'start_time': 0.25}], output_path)
+        with wave.open(output_path, 'rb') as wav_file:
+            single = np.frombuffer(
+                wav_file.readframes(wav_file.getnframes()), dtype=np.int16
+            ).reshape(-1, 2)
+
+        assert len(single) == 12000 + 4000
+        assert not single[:12000].any()
+        np.testing.assert_array_equal(single[12000:], samples)
+
+    def test_build_keyframe_luts(self):
+        """Test that keyframe LUTs match per-frame interpolation"""
+        keyframes = [
+            {'time': 1.0, 'properties': {'opacity': 0.0, 'position': {'x': 100, 'y': 50}},
+             'easing': 'ease-in'},
+            {'time': 0.0, 'properties': {'opacity': 1.0, 'position': {'x': 0, 'y': 0}}},
+            {'time': 1.5, 'properties': {'opacity': 0.5, 'rotation': 90},
+             'easing': 'ease-in-out'},
+        ]
+
+        luts = self.service._build_keyframe_luts(keyframes, 2.0, 10)
+
+        assert set(luts) == {'opacity', 'position', 'rotation'}
+        assert luts['opacity'].shape == (20,)
+        assert luts['position'].shape == (20, 2)
+        assert all(lut.dtype == np.float32 for lut in luts.values())
+        for frame in range(20):
+            time = frame / 10
+            for name, lut in luts.items():
+                expected = self.service._interpolate_keyframes(keyframes, time, name)
+                if expected is None:
+                    assert np.isnan(lut[frame]).all()
+                elif isinstance(expected, dict):
+                    assert lut[frame] == pytest.approx([expected['x'], expected['y']])
+                else:
+                    assert lut[frame] == pytest.approx(expected)
+
+        assert self.service._build_keyframe_luts([], 2.0, 10) == {}
+
+    def test_compile_keyframes(self):
+        """Test that keyframes compile to sorted parallel arrays"""
+        keyframes = [
+            {'time': 1.0, 'properties': {'position': {'x': 10, 'y': 20}}, 'easing': 'ease-out'},
+            {'time': 0.0, 'properties': {'opacity': 0.5, 'position': {'x': 0, 'y': 0}}},
+        ]
+
+        compiled = self.service._compile_keyframes(keyframes)
+
+        assert compiled['times'].tolist() == [0.0, 1.0]
+        assert compiled['easings'].tolist() == [0, 2]
+        assert compiled['columns'] == {'opacity': (0, 1), 'position': (1, 2)}
+        np.testing.assert_array_equal(
+            compiled['values'], [[0.5, 0, 0], [np.nan, 10, 20]]
+        )
+
+        # Any ascending times can be evaluated, matching the scalar path
+        values = self.service._evaluate_compiled_keyframes(compiled, np.array([0.25]))
+        expected = self.service._interpolate_keyframe_properties(keyframes, 0.25)
+        assert values['position'][0] == pytest.approx(
+            [expected['position']['x'], expected['position']['y']]
+        )
+        assert np.isnan(values['opacity'][0]) and 'opacity' not in expected
+
+        assert self.service._compile_keyframes([]) is None
+        assert self.service._compile_keyframes([{'time': 0, 'properties': {}}]) is None
+
+    def test_keyframe_kernel_warm_up(self):
+        """Test that the compiled keyframe kernel is loaded once the service exists"""
+        import services.export_service as export_service
+
+        if export_service.njit is None:
+            pytest.skip("numba is not installed")
+        assert export_service._kernel_warm_up_started.is_set()
+
+    def test_interpolate_keyframe_values_kernels_agree(self):
+        """Test that the compiled and numpy keyframe kernels match"""
+        kf_times = np.array([0.0, 0.5, 0.5, 1.2, 3.0])
+        kf_easings = np.array([0, 1, 2, 3, 0])
+        kf_values = np.array([
+            [0.0, 1.0], [np.nan, 2.0], [10.0, np.nan], [5.0, 4.0], [1.0, np.nan]
+        ])
+        frame_times = np.arange(-2, 100) / 25
+
+        expected = _interpolate_keyframe_values_numpy(kf_times, kf_easings, kf_values, frame_times)
+        actual = _interpolate_keyframe_values(kf_times, kf_easings, kf_values, frame_times)
+
+        assert actual.shape == (102, 2)
+        np.testing.assert_allclose(actual, expected, equal_nan=True)
+
+        # All-linear keyframes setting every column take the np.interp path
+        kf_times = np.array([0.0, 0.5, 1.2, 3.0])
+        kf_values = np.array([[0.0, 1.0], [3.0, 2.0], [5.0, 4.0], [1.0, 8.0]])
+        kf_easings = np.zeros(4, dtype=np.int64)
+        np.testing.assert_allclose(
+            _interpolate_keyframe_values_numpy(kf_times, kf_easings, kf_values, frame_times),
+            _interpolate_keyframe_values(kf_times, kf_easings, kf_values, frame_times)
+        )
+
+    def test_interpolate_keyframe_properties(self):
+        """Test that all properties are interpolated from one keyframe lookup"""
+        keyframes = [
+            {'time': 2.0, 'properties': {'opacity': 0.0, 'scale': {'x': 2, 'y': 3}},
+             'easing': 'ease-out'},
+            {'time': 0.0, 'properties': {'opacity': 1.0, 'scale': {'x': 1, 'y': 1}, 'rotation': 45}},
+        ]
+
+        values = self.service._interpolate_keyframe_properties(keyframes, 1.0)
+
+        # Rotation has no value on the next keyframe, so it is omitted
+        assert set(values) == {'opacity', 'scale'}
+        assert values['opacity'] == pytest.approx(0.25)
+        assert values['scale'] == pytest.approx({'x': 1.75, 'y': 2.5})
+        assert self.service._interpolate_keyframes(keyframes, 1.0, 'opacity') == values['opacity']
+        assert self.service._interpolate_keyframes(keyframes, 1.0, 'scale') == pytest.approx(values['scale'])
+        assert self.service._interpolate_keyframes(keyframes, 2.0, 'opacity') == 0.0
+        assert self.service._interpolate_keyframes(list(reversed(keyframes)), 2.0, 'rotation') is None
+        assert self.service._interpolate_keyframes(keyframes, 1.0, 'opacity') == pytest.approx(0.25)
+        assert self.service._interpolate_keyframe_properties(keyframes, 3.0) == {
+            'opacity': 0.0, 'scale': {'x': 2, 'y': 3}
+        }
+        assert self.service._interpolate_keyframe_properties([], 1.0) == {}
+
+        # A missing coordinate counts as 0, as when keyframes are compiled
+        partial = [
+            {'time': 0.0, 'properties': {'position': {'x': 10}}},
+            {'time': 1.0, 'properties': {'position': {'x': 30, 'y': 8}}},
+        ]
+        assert self.service._interpolate_keyframes(partial, 0.5, 'position') == {'x': 20, 'y': 4}
+
+        # Keyframes edited in place are read afresh
+        keyframes[0]['properties']['opacity'] = 0.5
+        assert self.service._interpolate_keyframes(keyframes, 2.0, 'opacity') == 0.5
+
+        # ...and so are keyframes retimed or added in place
+        keyframes[0]['time'] = 4.0
+        assert self.service._interpolate_keyframes(keyframes, 2.0, 'opacity') == pytest.approx(0.625)
+        keyframes.append({'time': 2.0, 'properties': {'opacity': 0.0}})
+        assert self.service._interpolate_keyframes(keyframes, 2.0, 'opacity') == 0.0
+
+    def test_create_text_image_cropped(self):
+        """Test that cropped text images keep their placement on the canvas"""
+        from PIL import Image
+        
+        full_path, full_x, full_y = self.service._create_text_image(
+            "Hello", 40, "white", "Arial", 640, 480, 100, 50
+        )
+        crop_path, crop_x, crop_y = self.service._create_text_image(
+            "Hello", 40, "white", "Arial", 640, 480, 100, 50, crop=True
+        )
+        
+        try:
+            full = Image.open(full_path)
+            cropped = Image.open(crop_path)
+            assert (full_x, full_y) == (0, 0)
+            assert full.size == (640, 480)
+            assert cropped.size[0] < 640 and cropped.size[1] < 480
+            assert crop_x >= 100 and crop_y >= 50
+            
+            # The cropped image is the drawn region of the full canvas
+            region = full.crop((crop_x, crop_y, crop_x + cropped.size[0], crop_y + cropped.size[1]))
+            assert region.tobytes() == cropped.tobytes()
+        finally:
+            os.unlink(full_path)
+            os.unlink(crop_path)
+
+    def test_create_text_image_cached(self):
+        """Test that repeated text reuses its render in a file of its own"""
+        first = self.service._create_text_image("Hello", 40, "white", "Arial", 640, 480, 100, 50, crop=True)
+        os.unlink(first[0])
+        second = self.service._create_text_image("Hello", 40, "white", "Arial", 640, 480, 100, 50, crop=True)
+
+        try:
+            assert len(self.service._text_image_cache) == 1
+            assert second[0] != first[0]
+            assert second[1:] == first[1:]
+            with open(second[0], 'rb') as f:
+                assert f.read() == self.service._text_image_cache[
+                    ("Hello", 40, "white", "Arial", 640, 480, 100, 50, True, 0)
+                ][0]
+        finally:
+            os.unlink(second[0])
+
+    def test_create_text_image_rotated(self):
+        """Test that rotated text is turned clockwise about its top-left corner"""
+        from PIL import Image
+
+        path, x, y = self.service._create_text_image(
+            "Hello", 40, "white", "Arial", 640, 480, 100, 50, crop=True, rotation=90
+        )
+
+        try:
+            rotated = Image.open(path)
+            # The line now runs down from the anchor, its glyphs to the left
+            assert rotated.size[1] > rotated.size[0]
+            assert x < 100 and x + rotated.size[0] <= 101
+            assert y >= 49
+        finally:
+            os.unlink(path)
+
+    def test_parse_color(self):
+        """Test that text colors are parsed from hex and names"""
+        assert _parse_color("#ff8000") == (255, 128, 0, 255)
+        assert _parse_color("#FF800080") == (255, 128, 0, 128)
+        assert _parse_color("#f80") == (255, 136, 0, 255)
+        assert _parse_color("Orange") == (255, 165, 0, 255)
+        assert _parse_color("#nothex") == (255, 255, 255, 255)
+        assert _parse_color("unknown") == (255, 255, 255, 255)
+
+    def test_load_font_cached(self):
+        """Test that fonts are loaded once per family and size"""
+        font = self.service._load_font("Arial", 24)
+        
+        assert font is not None
+        assert self.service._load_font("Arial", 24) is font
+        assert self.service._load_font("Arial", 32) is not font
+        assert len(self.service._font_cache) == 2
+
+    def test_get_font_path(self):
+        """Test that font families are looked up in a font directory listing built once"""
+        assert self.service._get_font_path("No Such Font Family") is None
+        font_index = self.service._font_index
+        assert font_index is not None
+
+        for stem, path in list(font_index.items())[:3]:
+            assert self.service._get_font_path(stem.upper()) == path
+            assert os.path.splitext(path)[1].lower() in ('.ttf', '.otf')
+        assert self.service._font_index is font_index
+
     def test_cleanup_export(self):
         """Test cleanup of exported files"""
         # Create a temporary file
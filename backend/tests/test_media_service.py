@@ -166,6 +166,10 @@ class TestMediaService:
         # Verify it's a valid image
         img = Image.open(thumbnail_path)
         assert img.size[0] <= 320  # Width should be resized
+        
+        # The red test video should stay red after the BGR to RGB conversion
+        r, g, b = img.convert('RGB').getpixel((img.size[0] // 2, img.size[1] // 2))
+        assert r > 200 and g < 50 and b < 50
     
     def test_generate_thumbnail_with_custom_id(self):
         """Test thumbnail generation with custom ID"""
@@ -216,6 +220,21 @@ class TestMediaService:
         # Larger waveform should have more data
         assert len(waveform_large) > len(waveform_small)
     
+    def test_generate_waveform_bars(self):
+        """Test that waveform bars are drawn around the center line"""
+        import base64
+        from io import BytesIO
+        audio_path = self.create_test_audio(duration=2)
+
+        waveform_base64 = self.service.generate_waveform(audio_path, width=100, height=50)
+        img = Image.open(BytesIO(base64.b64decode(waveform_base64.split(",", 1)[1])))
+
+        assert img.size == (100, 50)
+        # A steady tone draws close to full-height bars mid-clip
+        assert img.getpixel((50, 25)) == (59, 130, 246)
+        assert img.getpixel((50, 3)) == (59, 130, 246)
+        assert img.getpixel((50, 49)) == (255, 255, 255)
+
     def test_generate_waveform_invalid_audio(self):
         """Test error handling for invalid audio file"""
         with pytest.raises(ValueError, match="Error generating waveform"):
@@ -61,3 +61,24 @@ class TestTimelineService:
         """Test that ThreadPoolExecutor is configured correctly"""
         assert timeline_service.executor is not None
         assert timeline_service.executor._max_workers == 3
+
+    def test_get_duration_cached(self, timeline_service, tmp_path):
+        """Test that a video's duration is probed once per unchanged file"""
+        import subprocess
+        video_path = str(tmp_path / "probe_video.mp4")
+        subprocess.run([
+            'ffmpeg', '-y', '-f', 'lavfi', '-i', 'color=c=red:s=64x64:d=1:r=24',
+            '-c:v', 'libx264', '-preset', 'ultrafast', video_path
+        ], capture_output=True, check=True)
+
+        assert timeline_service._get_duration(video_path) == pytest.approx(1.0, abs=0.1)
+        assert len(timeline_service._duration_cache) == 1
+        timeline_service._get_duration(video_path)
+        assert len(timeline_service._duration_cache) == 1
+
+        # A rewritten file is probed again
+        subprocess.run([
+            'ffmpeg', '-y', '-f', 'lavfi', '-i', 'color=c=red:s=64x64:d=2:r=24',
+            '-c:v', 'libx264', '-preset', 'ultrafast', video_path
+        ], capture_output=True, check=True)
+        assert timeline_service._get_duration(video_path) == pytest.approx(2.0, abs=0.1)
@@ -116,6 +116,21 @@ class TestTransitionService:
         audio_stream = next((s for s in probe['streams'] if s['codec_type'] == 'audio'), None)
         assert audio_stream is not None
     
+    def test_apply_fade_in_copies_audio(self):
+        """Test that fades leave the source audio stream untouched"""
+        import subprocess
+        
+        def audio_md5(path):
+            result = subprocess.run(
+                ['ffmpeg', '-v', 'error', '-i', path, '-map', '0:a', '-c', 'copy', '-f', 'md5', '-'],
+                capture_output=True, text=True, check=True
+            )
+            return result.stdout.strip()
+        
+        output_path = self.service.apply_fade_in(video_path=self.video1_path, duration=0.5)
+        
+        assert audio_md5(output_path) == audio_md5(self.video1_path)
+    
     def test_apply_fade_in_invalid_video(self):
         """Test fade in with invalid video path"""
         with pytest.raises(Exception) as exc_info: